@@ -5,8 +5,9 @@ from typing import Optional, List, Tuple
 
 class AI:
     def __init__(self, color: str, game: Game) -> None:
-        # raise NotImplementedError("implement in subclass")
-        pass
+        # every AI makes its random choices with its own generator from the game,
+        # so games are reproducible from the game's seed
+        self._rng = game.get_rng(f"ai:{color}")
 
     def get_settlement_placement(self, game: Game) -> Vertex:
         raise NotImplementedError("implement in subclass")
@@ -1,5 +1,4 @@
 from game_engine import Game
-import random
 from typing import List, Optional, Tuple
 from catan_types import Vertex, Edge, HexCoord
 import logging
@@ -11,12 +10,13 @@ logger = logging.getLogger(__name__)
 
 class DummyAI(AI):
 	def __init__(self, color: str, game: Game):
+		super().__init__(color, game)
 		self._color = color
 
 	def get_settlement_placement(self, game: Game) -> Vertex:
 		# find all the available
 		possible_vertices = list(game.available_settlement_set)
-		v = random.choice(possible_vertices)
+		v = self._rng.choice(possible_vertices)
 		return v
 
 	def get_road_placement(self, game: Game, settlement_placement: Vertex) -> Edge:
@@ -26,7 +26,7 @@ class DummyAI(AI):
 			if game.can_place_road(road[0], road[1], self._color):
 				l.append(road)
 		assert l != []
-		return random.choice(l)
+		return self._rng.choice(l)
 
 	def do_turn(self, game: Game) -> None:
 		return None
@@ -41,7 +41,7 @@ class DummyAI(AI):
 		target_color = None
 		stop = False
 		while not stop:
-			target_hex = random.choice(hexes)
+			target_hex = self._rng.choice(hexes)
 			colors = game.get_players_on_hex(target_hex)
 			if len(colors) == 0:
 				target_color = None
@@ -49,7 +49,7 @@ class DummyAI(AI):
 			elif len(colors) > 1:
 				if self._color in colors:
 					colors.remove(self._color)
-				target_color = random.choice(colors)
+				target_color = self._rng.choice(colors)
 				stop = True
 
 		return target_color, target_hex.get_coord()
@@ -65,7 +65,7 @@ class DummyAI(AI):
 			r_list = []
 			for r, n in hand.items():
 				r_list.extend([r] * n)
-			discard = random.sample(r_list, num_discard)
-			player.deduct_resources(discard)
+			discard = self._rng.sample(r_list, num_discard)
+			game.discard_resources(self._color, discard)
 		assert player.get_num_resources() <= 7
 		return discard
\ No newline at end of file
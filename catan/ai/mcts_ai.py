@@ -0,0 +1,290 @@
+'''
+AI that picks its moves by Monte Carlo tree search.
+
+Every decision searches from the current game with Game.legal_actions and Game.apply_action.
+Each iteration plays on a clone of the game with its own dice and a reshuffled deck,
+so the search does not know what the dice or the deck will bring.
+The tree is open-loop: a node stands for a sequence of actions, whatever the dice did in between,
+and at each node only the actions that are legal in the current clone are considered.
+Below the tree, the game is played out with a cheap rollout policy until it ends or a turn limit is reached.
+
+The search is stronger the more iterations it gets, given as an iteration budget and optionally a time limit.
+ParallelMCTSAI runs independent searches of the same position in a pool of worker processes
+and adds up how often each move was visited at the root.
+The worker pools are shared by all ParallelMCTSAIs and stopped at exit, or earlier with shutdown_pools.
+'''
+
+from .ai import AI
+from game_engine import Game, GameState, Action, ActionType
+from catan_types import Vertex, Edge, HexCoord
+from serialization import dump_game, load_game
+from topology import get_default_lattice, get_topology
+from collections import Counter
+from multiprocessing import Pool, current_process
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import atexit
+import math
+import random
+import time
+
+
+# how much the rollout policy "weighted" favours each kind of action,
+# so that rollouts build like a player would instead of laying roads at random
+ROLLOUT_WEIGHTS = {
+	ActionType.CITY: 100.0,
+	ActionType.SETTLEMENT: 100.0,
+	ActionType.BUY_DEVELOPMENT_CARD: 10.0,
+	ActionType.PLAY_DEVELOPMENT_CARD: 5.0,
+	ActionType.ROAD: 3.0,
+	ActionType.END_TURN: 5.0,
+}  # type: Dict[ActionType, float]
+
+# picks one of the legal actions
+RolloutPolicy = Callable[[List[Action], random.Random], Action]
+
+
+def random_policy(actions: List[Action], rng: random.Random) -> Action:
+	'''Rollout policy that picks any legal action with the same chance.'''
+
+	return rng.choice(actions)
+
+
+def weighted_policy(actions: List[Action], rng: random.Random) -> Action:
+	'''Rollout policy that first picks the kind of action by ROLLOUT_WEIGHTS, then an action of that kind at random.'''
+
+	by_kind = {}  # type: Dict[ActionType, List[Action]]
+	for action in actions:
+		by_kind.setdefault(action.kind, []).append(action)
+	if len(by_kind) == 1:
+		return rng.choice(actions)
+	kinds = list(by_kind.keys())
+	kind = rng.choices(kinds, [ROLLOUT_WEIGHTS.get(kind, 1.0) for kind in kinds])[0]
+	return rng.choice(by_kind[kind])
+
+
+ROLLOUT_POLICIES = {
+	"random": random_policy,
+	"weighted": weighted_policy,
+}  # type: Dict[str, RolloutPolicy]
+
+
+class _Node:
+	'''Statistics of one sequence of actions from the root.'''
+
+	__slots__ = ("children", "visits", "rewards")
+
+	def __init__(self, num_colors: int) -> None:
+		self.children = {}  # type: Dict[Action, _Node]
+		self.visits = 0
+		# summed rewards of each color, in the order of Game.get_colors
+		self.rewards = [0.0] * num_colors
+
+
+class MCTSAI(AI):
+	def __init__(self, color: str, game: Game, iterations: int = 200, time_limit: Optional[float] = None,
+				 exploration: float = 1.0, rollout_policy: str = "weighted", max_rollout_turns: int = 100) -> None:
+		'''Search for iterations iterations per decision, or until time_limit seconds have passed if that comes first.
+		A time limit makes the moves depend on the speed of the machine, so games are no longer reproducible from the seed.
+		Rollouts use the policy of the given name from ROLLOUT_POLICIES,
+		and are scored by the points of each player after max_rollout_turns turns if nobody has won by then.'''
+
+		super().__init__(color, game)
+		self._color = color
+		self._iterations = iterations
+		self._time_limit = time_limit
+		self._exploration = exploration
+		self._rollout_policy = ROLLOUT_POLICIES[rollout_policy]
+		self._max_rollout_turns = max_rollout_turns
+
+	def get_settlement_placement(self, game: Game) -> Vertex:
+		return self.search(game).args[0]
+
+	def get_road_placement(self, game: Game, settlement_placement: Vertex) -> Edge:
+		return self.search(game).args
+
+	def do_turn(self, game: Game) -> None:
+		'''Make moves until the search would rather end the turn. Ending it is up to the caller.'''
+
+		while not game.is_game_over:
+			action = self.search(game)
+			if action.kind == ActionType.END_TURN:
+				return
+			game.apply_action(self._color, action)
+
+	def robber_discard(self, game: Game) -> List[str]:
+		'''Discard down to 7 cards, always from the resource there is most of.'''
+
+		player = game.get_player(self._color)
+		discard = []  # type: List[str]
+		hand = player.get_hand()
+		for _ in range(max(0, player.get_num_resources() - 7)):
+			r = max(sorted(hand.keys()), key=lambda r: hand[r])
+			hand[r] -= 1
+			discard.append(r)
+		if discard:
+			game.discard_resources(self._color, discard)
+		return discard
+
+	def get_robber_placement(self, game: Game) -> Tuple[Optional[str], HexCoord]:
+		hex_coord, target_color = self.search(game).args
+		return target_color, hex_coord
+
+	def search(self, game: Game) -> Action:
+		'''Return the best move for this AI in the current state of the game.'''
+
+		actions = list(game.legal_actions(self._color))
+		assert actions, f"{self._color} has no legal moves"
+		if len(actions) == 1:
+			return actions[0]
+
+		visits = self.get_root_visits(game)
+		return max(actions, key=lambda action: visits.get(action, -1))
+
+	def get_root_visits(self, game: Game) -> Dict[Action, int]:
+		'''Search from the current state of the game and return how often each first move was visited.'''
+
+		colors = game.get_colors()
+		root = _Node(len(colors))
+		deadline = None if self._time_limit is None else time.perf_counter() + self._time_limit
+		for _ in range(self._iterations):
+			if deadline is not None and time.perf_counter() > deadline:
+				break
+			self._run_iteration(game, root, colors)
+		return {action: child.visits for action, child in root.children.items()}
+
+	def _run_iteration(self, root_game: Game, root: _Node, colors: List[str]) -> None:
+		'''Walk down the tree on a fresh clone, add one node, play out the rest of the game and record the result.'''
+
+		rng = self._rng
+		game = root_game.clone(seed=rng.getrandbits(64))
+		node = root
+		path = [node]
+		while not game.is_game_over:
+			color = game.get_current_color()
+			actions = list(game.legal_actions(color))
+			untried = [action for action in actions if action not in node.children]
+			if untried:
+				action = rng.choice(untried)
+				child = _Node(len(colors))
+				node.children[action] = child
+				self._apply(game, color, action)
+				path.append(child)
+				break
+			node, action = self._select(node, actions, colors.index(color))
+			self._apply(game, color, action)
+			path.append(node)
+
+		rewards = self._rollout(game, colors)
+		for node in path:
+			node.visits += 1
+			for i, reward in enumerate(rewards):
+				node.rewards[i] += reward
+
+	def _select(self, node: _Node, actions: List[Action], color_i: int) -> Tuple[_Node, Action]:
+		'''Pick the child with the best upper confidence bound for the player to move.'''
+
+		log_visits = math.log(sum([node.children[action].visits for action in actions]))
+		best = None  # type: Optional[Tuple[_Node, Action]]
+		best_value = -1.0
+		for action in actions:
+			child = node.children[action]
+			value = child.rewards[color_i] / child.visits + self._exploration * math.sqrt(log_visits / child.visits)
+			if value > best_value:
+				best = (child, action)
+				best_value = value
+		assert best is not None
+		return best
+
+	def _apply(self, game: Game, color: str, action: Action) -> None:
+		game.apply_action(color, action)
+		if action.kind == ActionType.ROLL_DICE and game.get_state() == GameState.ROBBER_PLACEMENT:
+			self._discard_randomly(game)
+
+	def _discard_randomly(self, game: Game) -> None:
+		'''After a 7 in a simulated game, every player with more than 7 cards discards at random.'''
+
+		for color in game.get_colors():
+			player = game.get_player(color)
+			n = player.get_num_resources()
+			if n > 7:
+				cards = [r for r, count in player.get_hand().items() for _ in range(count)]
+				game.discard_resources(color, self._rng.sample(cards, n - 7))
+
+	def _rollout(self, game: Game, colors: List[str]) -> List[float]:
+		'''Play the game out with the rollout policy and return the reward of each color.
+		A win is worth 1. If nobody has won by the turn limit, the players share 1 in proportion to their points.'''
+
+		rng = self._rng
+		policy = self._rollout_policy
+		turns = 0
+		while not game.is_game_over and turns < self._max_rollout_turns:
+			color = game.get_current_color()
+			action = policy(list(game.legal_actions(color)), rng)
+			self._apply(game, color, action)
+			if action.kind == ActionType.END_TURN:
+				turns += 1
+
+		if game.is_game_over:
+			winner = game.get_winning_player()
+			return [1.0 if color == winner else 0.0 for color in colors]
+		vp = [game.get_player_vp(color) for color in colors]
+		total = sum(vp)
+		return [points / total for points in vp]
+
+
+# worker pools shared by all ParallelMCTSAIs in this process, by number of workers
+_pools = {}  # type: Dict[int, Any]
+
+
+def shutdown_pools() -> None:
+	'''Stop the worker processes of all pools. This runs at exit, and searches after it start new pools.'''
+
+	for pool in _pools.values():
+		pool.terminate()
+		pool.join()
+	_pools.clear()
+
+
+atexit.register(shutdown_pools)
+
+
+def _init_worker() -> None:
+	'''Build the topology up front, so that the first search in each worker does not pay for it.'''
+
+	get_topology(get_default_lattice())
+
+
+def _search_in_worker(task: Tuple[bytes, str, int, dict]) -> Dict[Action, int]:
+	'''Search the encoded game for the given color with a seeded MCTSAI and return the root visits.
+	load_game keeps an empty game for each board it has seen, so only the state is decoded for each search.'''
+
+	data, color, seed, options = task
+	game = load_game(data, seed=seed)
+	return MCTSAI(color, game, **options).get_root_visits(game)
+
+
+class ParallelMCTSAI(MCTSAI):
+	'''MCTSAI that searches in num_workers processes at once, each with the full budget and its own seed.
+	The visits of the first moves are added up over the searches, and the most visited move is played.
+	Searches run in this process instead when the board is not on the default lattice,
+	or when this process is itself a pool worker (say, in batch_runner), which cannot start workers of its own.'''
+
+	def __init__(self, color: str, game: Game, num_workers: int = 4, **options: Any) -> None:
+		super().__init__(color, game, **options)
+		self._num_workers = num_workers
+		self._options = options
+
+	def get_root_visits(self, game: Game) -> Dict[Action, int]:
+		if current_process().daemon or game.get_topology() is not get_topology(get_default_lattice()):
+			return super().get_root_visits(game)
+
+		pool = _pools.get(self._num_workers)
+		if pool is None:
+			pool = Pool(self._num_workers, initializer=_init_worker)
+			_pools[self._num_workers] = pool
+		data = dump_game(game)
+		tasks = [(data, self._color, self._rng.getrandbits(64), self._options) for _ in range(self._num_workers)]
+		visits = Counter()  # type: Counter
+		for worker_visits in pool.map(_search_in_worker, tasks, chunksize=1):
+			visits.update(worker_visits)
+		return dict(visits)
@@ -1,11 +1,12 @@
 from .ai import AI
 from game_engine import Game
 from typing import Tuple, Dict, List, Optional, Set, Iterator
-import random
 from hex import Hex
 from catan_types import Vertex, Edge, HexCoord
 import logging
 from catan_gen import CatanConstants
+from topology import iter_bits
+from production import ProductionModel
 
 
 logger = logging.getLogger(__name__)
@@ -20,31 +21,23 @@ class SmartPlacementAI(AI):
 		self._prepare(game)
 
 	def _prepare(self, game: Game) -> None:
-		'''Prepare the AI by letting it calculate most probable settlements.'''
+		'''Prepare the AI by letting it calculate most probable settlements.
+		The value of a vertex is the number of dots on the adjacent hexes,
+		a rough measure of how many resources it produces.'''
 
+		vertex_dots = ProductionModel(game).vertex_dots
+		vertex_ids = game.get_topology().vertex_ids
 		for v in game.get_nodes():
-			n = self._eval_vertex_value(game, v)
+			n = int(vertex_dots[vertex_ids[v]])
 			if n not in self._vertex_probs:
 				self._vertex_probs[n] = []
 			self._vertex_probs[n].append(v)
 
-	def _eval_vertex_value(self, game: Game, v: Tuple[int, int]) -> int:
-		'''Evaluate the value of the given vertex.
-		This is done by adding all the dots of the adjacent hexes.
-		This is a rough measure of probability.'''
-
-		n = 0
-
-		for hex in game._vertex_map[v]:
-			n += hex.get_num_dots()
-
-		return n
-
 	def get_road_placement(self, game: Game, settlement_vertex: Vertex) -> Edge:
 		'''Return a random road stemming from settlement located at v.'''
 
 		adjacent_v_set = game.get_adjacent_vertices(settlement_vertex)
-		random.shuffle(list(adjacent_v_set))
+		self._rng.shuffle(list(adjacent_v_set))
 
 		for v2 in adjacent_v_set:
 			if not game.has_road(settlement_vertex, v2):
@@ -64,8 +57,8 @@ class SmartPlacementAI(AI):
 			return 0
 
 		for v in hex.get_vertices():
-			if v in game._settlements:
-				s = game._settlements[v]
+			s = game.get_settlement_at_vertex(v)
+			if s is not None:
 
 				if s.color() == color:
 					score += -100 # negative points for hexes with same color as choosing player
@@ -135,18 +128,15 @@ class SmartPlacementAI(AI):
 			l = []
 			for r, count in player.get_hand().items():
 				l.extend([r] * count)
-			r = random.choice(l)
-			player.deduct_resources([r])
+			r = self._rng.choice(l)
+			game.discard_resources(self._color, [r])
 			gone_list.append(r)
 			n -= 1
 		return gone_list
 
 	def __get_available_settlement_vertices(self, game: Game) -> Set[Vertex]:
-		player = game.get_player(self._color)
-		# the simplest way is probably to get all the vertices from the roads
-		potential_vs = player.get_road_vertices()
-		good_vs = potential_vs.intersection(game.available_settlement_set)
-		return good_vs
+		vertices = game.get_topology().vertices
+		return set([vertices[vid] for vid in iter_bits(game.get_settlement_frontier_bits(self._color))])
 
 	def __get_upgradable_settlements(self, game: Game) -> List[Vertex]:
 		l = []
@@ -157,11 +147,9 @@ class SmartPlacementAI(AI):
 		return l
 
 	def __get_available_road_placements(self, game: Game) -> Iterator[Edge]:
-		player = game.get_player(self._color)
-		for vertex in player.get_road_vertices():
-			for v2 in game.get_adjacent_vertices(vertex):
-				if game.can_place_road(vertex, v2, self._color):
-					yield (vertex, v2)
+		edges = game.get_topology().edges
+		for edge_id in iter_bits(game.get_road_frontier_bits(self._color)):
+			yield edges[edge_id]
 
 	def __get_playable_cards(self, game: Game) -> List[str]:
 		player = game.get_player(self._color)
@@ -174,7 +162,7 @@ class SmartPlacementAI(AI):
 	def __get_random_resource(self) -> str:
 		l = list(CatanConstants.resource_distribution.keys())
 		l.remove("desert")
-		return random.choice(l)
+		return self._rng.choice(l)
 
 	def do_turn(self, game: Game) -> None:
 		player = game.get_player(self._color)
@@ -215,7 +203,7 @@ class SmartPlacementAI(AI):
 				if len(places) < 2:
 					logger.warning("Too few available road placement sites left for AI. Not playing road building card.")
 				else:
-					roads = random.sample(places, 2)
+					roads = self._rng.sample(places, 2)
 					game.play_development_card(
 						self._color,
 						card,
@@ -227,39 +215,38 @@ class SmartPlacementAI(AI):
 			actions.append("played development card")
 
 		# preference for development cards
-		cost = CatanConstants.development_card_cost
-		if player.can_deduct_resources(cost):
+		cost = CatanConstants.development_card_cost_vector
+		if game.has_development_cards() and player.can_deduct_resource_vector(cost):
 			game.buy_development_card(self._color)
 			actions.append("bought development card")
 
 		# next try to build a settlement
-		available_settlement_vertices = self.__get_available_settlement_vertices(game)
-		if len(available_settlement_vertices) > 0:
-			cost = CatanConstants.building_costs["settlement"]
-			if player.can_deduct_resources(cost):
-				v = random.choice(list(available_settlement_vertices))
+		if game.get_settlement_frontier_bits(self._color):
+			cost = CatanConstants.building_cost_vectors["settlement"]
+			if player.can_deduct_resource_vector(cost):
+				v = self._rng.choice(list(self.__get_available_settlement_vertices(game)))
 				game.add_settlement(v, self._color)
 				actions.append("bought settlement")
 
 		# city
 		upgradable_settlements = self.__get_upgradable_settlements(game)
 		if len(upgradable_settlements) > 0:
-			cost = CatanConstants.building_costs["city"]
-			if player.can_deduct_resources(cost):
-				v = random.choice(list(upgradable_settlements))
+			cost = CatanConstants.building_cost_vectors["city"]
+			if player.can_deduct_resource_vector(cost):
+				v = self._rng.choice(list(upgradable_settlements))
 				game.add_city(v, self._color)
 				actions.append("upgraded settlement to city")
 
 		# road
-		cost = CatanConstants.building_costs["road"]
-		if player.can_deduct_resources(cost):
+		cost = CatanConstants.building_cost_vectors["road"]
+		if player.can_deduct_resource_vector(cost):
 			# find a spare place to build it
 			places = [edge for edge in self.__get_available_road_placements(game)]
 			if places == []:
 				# logging.debug(f"nowhere to place a new road for player {self.color}")
 				pass
 			else:
-				road = random.choice(places)
+				road = self._rng.choice(places)
 				game.add_road(road[0], road[1], self._color)
 				actions.append("bought road")
 
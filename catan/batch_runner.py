@@ -0,0 +1,241 @@
+'''
+Play many seeded games between AIs across a pool of processes and collect the results.
+Used to evaluate AIs against each other.
+
+Each game is played silently by CatanCLI, and one result per game is streamed to a CSV or JSONL file.
+Games can also be recorded, one file per seed, to replay them later with game_record.GameReplay.
+A summary (wins per AI and per seat, game length, points) is printed at the end.
+'''
+
+from ai.ai import AI
+from ai.smart_placement_ai import SmartPlacementAI
+from ai.dummy_ai import DummyAI
+from ai.mcts_ai import MCTSAI, ParallelMCTSAI
+from argparse import ArgumentParser
+from catan_cli import CatanCLI
+from collections import Counter
+from game_record import GameRecorder, RECORD_SUFFIX
+from multiprocessing import Pool
+from typing import Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Type
+import csv
+import json
+import logging
+import os
+import sys
+
+
+AI_CLASSES = {
+	"dummy": DummyAI,
+	"smart": SmartPlacementAI,
+	"mcts": MCTSAI,
+	"parallel-mcts": ParallelMCTSAI,
+}  # type: Dict[str, Type[AI]]
+
+COLORS = ["red", "orange", "blue", "green"]
+
+# vp breakdown fields as returned by CatanCLI.get_vp_breakdown
+VP_FIELDS = ["settlements", "cities", "development_card_vp", "longest_road", "largest_army", "vp"]
+
+
+class GameJob(NamedTuple):
+	'''One game to play: the seed and the AI class for each color, in turn order.'''
+	seed: int
+	ai_classes: Dict[str, Type[AI]]
+	# directory to record the game in, if any
+	record_dir: Optional[str] = None
+
+
+class GameResult(NamedTuple):
+	seed: int
+	# name of the AI class for each color, in turn order
+	ais: Dict[str, str]
+	# None if nobody won within the turn limit or the game failed
+	winner: Optional[str]
+	num_turns: int
+	# for each color, the breakdown of its victory points
+	vp: Dict[str, Dict[str, int]]
+	# the exception that ended the game, if any
+	error: Optional[str]
+
+
+def play_game(job: GameJob) -> GameResult:
+	'''Play one game silently and return its result.
+	An exception in the game is recorded in the result, so one bad game does not stop a batch.'''
+
+	colors = list(job.ai_classes.keys())
+	ais = {color: cls.__name__ for color, cls in job.ai_classes.items()}
+	cli = None  # type: Optional[CatanCLI]
+	error = None  # type: Optional[str]
+	record = None  # type: Optional[IO[bytes]]
+	try:
+		cli = CatanCLI(colors, job.ai_classes, job.seed, silent=True)
+		if job.record_dir is not None:
+			record = open(os.path.join(job.record_dir, f"{job.seed}{RECORD_SUFFIX}"), "wb")
+			cli.get_game().subscribe(GameRecorder(cli.get_game(), record))
+		cli.initial_placement()
+		cli.play_game()
+	except Exception as e:
+		error = f"{type(e).__name__}: {e}"
+	finally:
+		if record is not None:
+			record.close()
+	if cli is None:
+		return GameResult(job.seed, ais, None, 0, {}, error)
+
+	game = cli.get_game()
+	winner = game.get_winning_player() if game.is_game_over else None
+	vp = {color: cli.get_vp_breakdown(color) for color in colors}
+	return GameResult(job.seed, ais, winner, cli.get_num_turns(), vp, error)
+
+
+def make_jobs(ai_classes: List[Type[AI]], num_games: int, first_seed: int = 0,
+			  colors: List[str] = COLORS, rotate: bool = False, record_dir: Optional[str] = None) -> Iterator[GameJob]:
+	'''Games with consecutive seeds, giving the i-th color the i-th AI class.
+	With rotate set, the AIs move one seat along every game, so that no AI always goes first.
+	With record_dir set, every game is recorded to <seed>.ctr in that directory.'''
+
+	assert len(ai_classes) == len(colors)
+	for i in range(num_games):
+		shift = i % len(ai_classes) if rotate else 0
+		seats = ai_classes[shift:] + ai_classes[:shift]
+		yield GameJob(first_seed + i, dict(zip(colors, seats)), record_dir)
+
+
+def run_batch(jobs: Iterable[GameJob], num_workers: int = 1, chunksize: int = 4) -> Iterator[GameResult]:
+	'''Play the games across num_workers processes and yield their results in the order of the jobs.'''
+
+	if num_workers <= 1:
+		for job in jobs:
+			yield play_game(job)
+		return
+	with Pool(num_workers) as pool:
+		yield from pool.imap(play_game, jobs, chunksize)
+
+
+def to_csv_row(result: GameResult) -> Dict[str, object]:
+	'''Flatten the result into one CSV row, with the seats numbered in turn order.'''
+
+	row = {
+		"seed": result.seed,
+		"winner": result.winner,
+		"winner_ai": result.ais[result.winner] if result.winner is not None else None,
+		"num_turns": result.num_turns,
+		"error": result.error,
+	}  # type: Dict[str, object]
+	for seat, (color, ai) in enumerate(result.ais.items()):
+		row[f"seat{seat}_color"] = color
+		row[f"seat{seat}_ai"] = ai
+		vp = result.vp.get(color, {})
+		for field in VP_FIELDS:
+			row[f"seat{seat}_{field}"] = vp.get(field)
+	return row
+
+
+def get_csv_fields(num_seats: int) -> List[str]:
+	fields = ["seed", "winner", "winner_ai", "num_turns", "error"]
+	for seat in range(num_seats):
+		fields.extend([f"seat{seat}_color", f"seat{seat}_ai"])
+		fields.extend([f"seat{seat}_{field}" for field in VP_FIELDS])
+	return fields
+
+
+def write_results(results: Iterable[GameResult], out: IO[str], fmt: str, num_seats: int) -> Iterator[GameResult]:
+	'''Write each result to out as it arrives (fmt is "csv" or "jsonl") and pass it on.'''
+
+	if fmt == "csv":
+		writer = csv.DictWriter(out, fieldnames=get_csv_fields(num_seats))
+		writer.writeheader()
+		for result in results:
+			writer.writerow(to_csv_row(result))
+			yield result
+	elif fmt == "jsonl":
+		for result in results:
+			out.write(json.dumps(result._asdict()) + "\n")
+			yield result
+	else:
+		raise ValueError(f"unknown format {fmt}")
+
+
+class BatchSummary:
+	'''Aggregates game results: wins per AI and per seat, game length and average points per AI.'''
+
+	def __init__(self) -> None:
+		self.num_games = 0
+		self.num_unfinished = 0
+		self.num_errors = 0
+		self.total_turns = 0
+		self.wins_by_ai = Counter()  # type: Counter
+		self.wins_by_seat = Counter()  # type: Counter
+		self.games_by_ai = Counter()  # type: Counter
+		self.vp_by_ai = {}  # type: Dict[str, Counter]
+
+	def add(self, result: GameResult) -> None:
+		self.num_games += 1
+		if result.error is not None:
+			self.num_errors += 1
+			return
+		self.total_turns += result.num_turns
+		if result.winner is None:
+			self.num_unfinished += 1
+		for seat, (color, ai) in enumerate(result.ais.items()):
+			self.games_by_ai[ai] += 1
+			self.vp_by_ai.setdefault(ai, Counter()).update(result.vp[color])
+			if color == result.winner:
+				self.wins_by_ai[ai] += 1
+				self.wins_by_seat[seat] += 1
+
+	def get_mean_turns(self) -> float:
+		num_played = self.num_games - self.num_errors
+		return self.total_turns / num_played if num_played else 0.0
+
+	def print(self, out: IO[str] = sys.stdout) -> None:
+		print(f"{self.num_games} games, {self.num_unfinished} unfinished, {self.num_errors} failed", file=out)
+		print(f"mean game length: {self.get_mean_turns():.1f} turns", file=out)
+		print("wins by AI (seats played, mean points breakdown):", file=out)
+		for ai, n in sorted(self.games_by_ai.items()):
+			vp = self.vp_by_ai[ai]
+			breakdown = ", ".join([f"{field} {vp[field] / n:.2f}" for field in VP_FIELDS])
+			print(f"  {ai}: {self.wins_by_ai[ai]} / {n} ({breakdown})", file=out)
+		print("wins by seat:", file=out)
+		for seat, n in sorted(self.wins_by_seat.items()):
+			print(f"  {seat}: {n}", file=out)
+
+
+if __name__ == "__main__":
+	parser = ArgumentParser(description=__doc__)
+	parser.add_argument("-n", "--num-games", type=int, default=100)
+	parser.add_argument("-j", "--workers", type=int, default=1,
+		help="number of processes to play games in")
+	parser.add_argument("--seed", type=int, default=0,
+		help="seed of the first game, the others use the following seeds")
+	parser.add_argument("--ais", nargs="+", choices=sorted(AI_CLASSES.keys()),
+		default=["smart", "dummy", "dummy", "dummy"],
+		help="AI for each seat, in turn order")
+	parser.add_argument("--rotate", action="store_true",
+		help="move the AIs one seat along every game")
+	parser.add_argument("-o", "--output", default="-",
+		help="file to write a result per game to, - for stdout")
+	parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+	parser.add_argument("--record-dir",
+		help="directory to record every game in, to replay them with game_record")
+	args = parser.parse_args()
+	if len(args.ais) > len(COLORS):
+		parser.error(f"at most {len(COLORS)} AIs")
+	# play silently: the AIs warn about ordinary situations such as running out of road spots
+	logging.basicConfig(level=logging.ERROR)
+
+	colors = COLORS[:len(args.ais)]
+	if args.record_dir is not None:
+		os.makedirs(args.record_dir, exist_ok=True)
+	jobs = make_jobs([AI_CLASSES[name] for name in args.ais], args.num_games, args.seed, colors, args.rotate,
+		args.record_dir)
+	out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+	summary = BatchSummary()
+	try:
+		for result in write_results(run_batch(jobs, args.workers), out, args.format, len(colors)):
+			summary.add(result)
+			out.flush()
+	finally:
+		if out is not sys.stdout:
+			out.close()
+	summary.print(sys.stderr)
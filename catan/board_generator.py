@@ -0,0 +1,113 @@
+'''
+Generate random boards in bulk as NumPy arrays, for studies that need millions of layouts.
+
+The boards follow the same rules as Game._generate_board: the tiles and the ports are shuffled,
+and the tokens go down in letter order along the spiral of Game.get_token_spiral, skipping the desert.
+Hexes are in topology order (row by row) and ports in the order of Game.get_port_locations,
+as in BoardLayout. Values are indices into catan_gen.TILE_TYPES, TOKENS and PORT_TYPES.
+'''
+
+from game_engine import Game, BoardLayout
+from catan_gen import CatanConstants, TILE_TYPES, TOKENS, PORT_TYPES
+from catan_types import Lattice
+from game_random import Seed
+from typing import Iterator, List, NamedTuple, Optional, Union
+import numpy as np
+
+
+# token value for the desert, which has no token
+NO_TOKEN = 255
+DESERT = TILE_TYPES.index("desert")
+
+# the number on each token in TOKENS, with 0 for NO_TOKEN
+TOKEN_NUMBERS = np.zeros(NO_TOKEN + 1, dtype=np.uint8)
+TOKEN_NUMBERS[:len(TOKENS)] = [CatanConstants.token_map[t] for t in TOKENS]
+
+
+def _get_hex_id(row: int, col: int) -> int:
+	return sum(CatanConstants.tile_layout[:row]) + col
+
+
+# hex IDs in the order the tokens are placed
+SPIRAL = np.array([_get_hex_id(row, col) for row, col in Game.get_token_spiral()])
+
+_TILE_POOL = np.array(
+	[TILE_TYPES.index(r) for r, n in CatanConstants.resource_distribution.items() for _ in range(n)], dtype=np.uint8)
+_PORT_POOL = np.array(
+	[PORT_TYPES.index(p) for p, n in CatanConstants.port_distribution.items() for _ in range(n)], dtype=np.uint8)
+
+
+class BoardBatch(NamedTuple):
+	'''Many boards, one per row.'''
+	# (n, 19) tile type of each hex
+	resources: np.ndarray
+	# (n, 19) token of each hex, NO_TOKEN for the desert
+	tokens: np.ndarray
+	# (n, 9) port type of each port location
+	ports: np.ndarray
+
+
+def generate_boards(n: int, rng: Union[np.random.Generator, Seed, None] = None) -> BoardBatch:
+	'''Generate n random boards. rng is a NumPy generator or a seed for one.'''
+
+	if not isinstance(rng, np.random.Generator):
+		rng = np.random.default_rng(rng)
+	resources = rng.permuted(np.tile(_TILE_POOL, (n, 1)), axis=1)
+	ports = rng.permuted(np.tile(_PORT_POOL, (n, 1)), axis=1)
+	return BoardBatch(resources, assign_tokens(resources), ports)
+
+
+def iter_boards(n: int, batch_size: int = 100000,
+				rng: Union[np.random.Generator, Seed, None] = None) -> Iterator[BoardBatch]:
+	'''Generate n random boards in batches of at most batch_size, to keep memory bounded.'''
+
+	if not isinstance(rng, np.random.Generator):
+		rng = np.random.default_rng(rng)
+	while n > 0:
+		size = min(n, batch_size)
+		yield generate_boards(size, rng)
+		n -= size
+
+
+def assign_tokens(resources: np.ndarray) -> np.ndarray:
+	'''Place the tokens on each board of resources, in letter order along the spiral and skipping the desert.'''
+
+	land = resources[:, SPIRAL] != DESERT
+	letters = np.cumsum(land, axis=1) - 1
+	tokens = np.empty(resources.shape, dtype=np.uint8)
+	tokens[:, SPIRAL] = np.where(land, letters, NO_TOKEN)
+	return tokens
+
+
+def get_token_numbers(tokens: np.ndarray) -> np.ndarray:
+	'''The number on each token, with 0 for the desert.'''
+
+	return TOKEN_NUMBERS[tokens]
+
+
+def get_board_layout(batch: BoardBatch, i: int) -> BoardLayout:
+	'''Return board i of the batch as a BoardLayout.'''
+
+	return BoardLayout(
+		resources=tuple([TILE_TYPES[r] for r in batch.resources[i].tolist()]),
+		tokens=tuple([None if t == NO_TOKEN else TOKENS[t] for t in batch.tokens[i].tolist()]),
+		ports=tuple([PORT_TYPES[p] for p in batch.ports[i].tolist()])
+	)
+
+
+def to_batch(layouts: List[BoardLayout]) -> BoardBatch:
+	'''Encode the layouts as a batch, the inverse of get_board_layout.'''
+
+	return BoardBatch(
+		np.array([[TILE_TYPES.index(r) for r in layout.resources] for layout in layouts], dtype=np.uint8),
+		np.array([[NO_TOKEN if t is None else TOKENS.index(t) for t in layout.tokens] for layout in layouts],
+			dtype=np.uint8),
+		np.array([[PORT_TYPES.index(p) for p in layout.ports] for layout in layouts], dtype=np.uint8)
+	)
+
+
+def make_game(batch: BoardBatch, i: int, starting_color: str, colors: List[str],
+			  hex_coord_lattice: Lattice, seed: Optional[Seed] = None) -> Game:
+	'''Create a game on board i of the batch.'''
+
+	return Game(starting_color, colors, hex_coord_lattice, board=get_board_layout(batch, i), seed=seed)
@@ -0,0 +1,194 @@
+'''
+Balance metrics of boards, computed for whole batches of boards at once.
+Used to filter and rank generated boards, for example for tournaments.
+
+Boards come as a board_generator.BoardBatch; score_game scores the board of a single Game.
+Token probabilities are counted in dots (the number of ways to roll the number out of 36).
+'''
+
+from game_engine import Game, BoardLayout, PORT_LOCATIONS
+from board_search import BoardConstraint, PartialBoard
+from board_generator import BoardBatch, TOKEN_NUMBERS, to_batch
+from catan_gen import CatanConstants, RESOURCES
+from topology import get_default_lattice, get_topology
+from typing import Dict, NamedTuple
+import numpy as np
+
+
+# dots of each token, 0 for the desert
+TOKEN_DOTS = np.where(TOKEN_NUMBERS > 0, 6 - np.abs(7 - TOKEN_NUMBERS.astype(int)), 0)
+# tokens with at least this many dots (5, 6, 8 and 9) count as high-probability
+HIGH_DOTS = 4
+# 6 and 8
+RED_DOTS = 5
+# seats in the order they place their initial settlements
+DRAFT_ORDER = [0, 1, 2, 3, 3, 2, 1, 0]
+
+# how much each metric counts towards the penalty in get_balance_penalty
+DEFAULT_WEIGHTS = {
+	"resource_imbalance": 10.0,
+	"high_adjacencies": 0.5,
+	"red_adjacencies": 2.0,
+	"port_synergy": 0.1,
+	"opening_spread": 0.5,
+}  # type: Dict[str, float]
+
+
+def _make_tables() -> tuple:
+	topology = get_topology(get_default_lattice())
+	num_hexes = len(topology.hex_coords)
+	hex_vertices = np.zeros((num_hexes, topology.num_vertices))
+	for hex_id, vids in enumerate(topology.hex_vertices):
+		hex_vertices[hex_id, list(vids)] = 1
+	# neighbouring hexes share an edge, so two corners
+	hex_pairs = np.array([
+		(a, b) for a in range(num_hexes) for b in range(a + 1, num_hexes)
+		if len(set(topology.hex_vertices[a]) & set(topology.hex_vertices[b])) == 2
+	])
+	# the hexes touching each port location
+	port_hexes = np.zeros((len(PORT_LOCATIONS), num_hexes))
+	for port_i, location in enumerate(PORT_LOCATIONS):
+		for row, col, i in location:
+			hex_id = topology.hex_ids[(row, col % CatanConstants.tile_layout[row])]
+			for other in topology.vertex_hexes[topology.hex_vertices[hex_id][i]]:
+				port_hexes[port_i, other] = 1
+	closed = np.array([
+		[(mask >> vid) & 1 for vid in range(topology.num_vertices)] for mask in topology.vertex_closed_masks
+	], dtype=bool)
+	return hex_vertices, hex_pairs, port_hexes, closed
+
+
+# (hexes, vertices) corners of each hex, (pairs, 2) neighbouring hexes, (ports, hexes) hexes at each port,
+# (vertices, vertices) each vertex and its neighbours, which the distance rule takes out of play
+HEX_VERTICES, HEX_PAIRS, PORT_HEXES, CLOSED_VERTICES = _make_tables()
+
+
+class BoardMetrics(NamedTuple):
+	'''Balance metrics, one row per board.'''
+	# (n, 5) total dots on the hexes of each resource
+	resource_dots: np.ndarray
+	# (n,) largest difference between the share of dots and the share of tiles of any resource
+	resource_imbalance: np.ndarray
+	# (n,) neighbouring hexes that both have high-probability tokens (5, 6, 8 or 9)
+	high_adjacencies: np.ndarray
+	# (n,) neighbouring hexes that both have a 6 or an 8
+	red_adjacencies: np.ndarray
+	# (n,) for every 2:1 port, the dots of its resource on the hexes at the port
+	port_synergy: np.ndarray
+	# (n, 4) dots of the two initial settlements of each seat, when every seat greedily takes the best vertex left
+	opening_values: np.ndarray
+	# (n,) best minus worst of opening_values
+	opening_spread: np.ndarray
+
+
+def score_boards(batch: BoardBatch) -> BoardMetrics:
+	'''Compute the balance metrics of every board in the batch, with one row per board.'''
+
+	dots = TOKEN_DOTS[batch.tokens]
+	resources = batch.resources
+	n = len(resources)
+
+	resource_dots = np.stack([((resources == i) * dots).sum(axis=1) for i in range(len(RESOURCES))], axis=1)
+	tiles = np.array([CatanConstants.resource_distribution[r] for r in RESOURCES])
+	dot_share = resource_dots / resource_dots.sum(axis=1, keepdims=True)
+	resource_imbalance = np.abs(dot_share - tiles / tiles.sum()).max(axis=1)
+
+	a = dots[:, HEX_PAIRS[:, 0]]
+	b = dots[:, HEX_PAIRS[:, 1]]
+	high_adjacencies = ((a >= HIGH_DOTS) & (b >= HIGH_DOTS)).sum(axis=1)
+	red_adjacencies = ((a == RED_DOTS) & (b == RED_DOTS)).sum(axis=1)
+
+	# resource ports are PORT_TYPES[1:], in the same order as RESOURCES and TILE_TYPES
+	port_synergy = np.zeros(n, dtype=int)
+	for port_i in range(len(PORT_LOCATIONS)):
+		port_type = batch.ports[:, port_i].astype(int)
+		at_port = PORT_HEXES[port_i] > 0
+		matching = resources[:, at_port] == (port_type - 1)[:, np.newaxis]
+		port_synergy += np.where(port_type > 0, (matching * dots[:, at_port]).sum(axis=1), 0)
+
+	opening_values = _draft_openings(dots @ HEX_VERTICES)
+	opening_spread = opening_values.max(axis=1) - opening_values.min(axis=1)
+	return BoardMetrics(resource_dots, resource_imbalance, high_adjacencies, red_adjacencies,
+		port_synergy, opening_values, opening_spread)
+
+
+def _draft_openings(vertex_dots: np.ndarray) -> np.ndarray:
+	'''Every seat in turn (in draft order) takes the vertex with the most dots that the distance rule allows.
+	Return the total dots of each seat.'''
+
+	n = len(vertex_dots)
+	rows = np.arange(n)
+	available = np.ones(vertex_dots.shape, dtype=bool)
+	totals = np.zeros((n, max(DRAFT_ORDER) + 1))
+	for seat in DRAFT_ORDER:
+		values = np.where(available, vertex_dots, -1)
+		picks = values.argmax(axis=1)
+		totals[:, seat] += values[rows, picks]
+		available &= ~CLOSED_VERTICES[picks]
+	return totals
+
+
+def score_game(game: Game) -> BoardMetrics:
+	'''Score the board of the game, as a batch of one.'''
+
+	return score_boards(to_batch([game.get_board_layout()]))
+
+
+def get_balance_penalty(metrics: BoardMetrics, weights: Dict[str, float] = DEFAULT_WEIGHTS) -> np.ndarray:
+	'''Weighted sum of the metrics, lower for better balanced boards.'''
+
+	penalty = np.zeros(len(metrics.resource_dots))
+	for name, weight in weights.items():
+		penalty += weight * getattr(metrics, name)
+	return penalty
+
+
+def rank_boards(metrics: BoardMetrics, weights: Dict[str, float] = DEFAULT_WEIGHTS) -> np.ndarray:
+	'''Board indices from the best balanced to the worst.'''
+
+	return np.argsort(get_balance_penalty(metrics, weights), kind="stable")
+
+
+_HEX_PAIR_LIST = HEX_PAIRS.tolist()
+_LETTER_DOTS = {letter: 6 - abs(7 - n) for letter, n in CatanConstants.token_map.items()}
+
+
+class BalanceScoreConstraint(BoardConstraint):
+	'''Board constraint for Game: the balance penalty of the finished board is between low and high.
+	Partial boards are cut off early when a lower bound on the final penalty is already above high.
+	The bound assumes the weights are not negative, since every metric is at least 0.
+	While tokens are being placed, it is the penalty of the high and red adjacencies among the tokens so far,
+	which placing more tokens can only add to. Once all tokens are placed, it is the penalty of the board
+	with generic ports, since the ports only change port_synergy and that can only go up.
+	The other metrics, such as resource_imbalance and opening_spread, can go down as hexes are added,
+	so they are left out of the bound until they are final.'''
+
+	def __init__(self, low: float, high: float, weights: Dict[str, float] = DEFAULT_WEIGHTS) -> None:
+		self._low = low
+		self._high = high
+		self._weights = weights
+
+	def allows_token(self, board: PartialBoard, hex_id: int) -> bool:
+		if any([token is None and resource != "desert" for resource, token in zip(board.resources, board.tokens)]):
+			# only the neighbouring numbers placed so far are known, and only high numbers add to them
+			dots = [0 if token is None else _LETTER_DOTS[token] for token in board.tokens]
+			if dots[hex_id] < HIGH_DOTS:
+				return True
+			high = 0
+			red = 0
+			for a, b in _HEX_PAIR_LIST:
+				if dots[a] >= HIGH_DOTS and dots[b] >= HIGH_DOTS:
+					high += 1
+					red += dots[a] == RED_DOTS and dots[b] == RED_DOTS
+			lower_bound = self._weights.get("high_adjacencies", 0) * high + self._weights.get("red_adjacencies", 0) * red
+		else:
+			# everything but the ports is known, and generic ports add nothing
+			lower_bound = self._get_penalty(board.resources, board.tokens, ["generic"] * len(board.ports))
+		return lower_bound <= self._high
+
+	def allows_board(self, board: PartialBoard) -> bool:
+		return self._low <= self._get_penalty(board.resources, board.tokens, board.ports) <= self._high
+
+	def _get_penalty(self, resources: list, tokens: list, ports: list) -> float:
+		layout = BoardLayout(tuple(resources), tuple(tokens), tuple(ports))
+		return get_balance_penalty(score_boards(to_batch([layout])), self._weights)[0]
@@ -0,0 +1,210 @@
+'''
+Generate boards that satisfy constraints, by backtracking search.
+Instead of generating whole random boards and throwing away those that break a rule,
+every tile, token and port is checked against the constraints as soon as it is placed.
+Used by Game when it is given constraints.
+
+Hexes are in topology order (row by row) and ports in the order of Game.get_port_locations, as in BoardLayout.
+'''
+
+import random
+from catan_gen import CatanConstants
+from topology import BoardTopology
+from typing import Dict, List, Optional, Tuple
+
+
+class BoardGenerationError(Exception):
+	pass
+
+
+class PartialBoard:
+	'''A board being filled in. Entries that are not placed yet are None, and the desert has no token.'''
+
+	def __init__(self, topology: BoardTopology, num_ports: int) -> None:
+		num_hexes = len(topology.hex_coords)
+		self.resources = [None] * num_hexes  # type: List[Optional[str]]
+		self.tokens = [None] * num_hexes  # type: List[Optional[str]]
+		self.ports = [None] * num_ports  # type: List[Optional[str]]
+		# indexed by hex ID, the hexes that share an edge with it
+		self.neighbours = get_hex_neighbours(topology)
+
+	def get_number(self, hex_id: int) -> Optional[int]:
+		'''Return the number on the hex, or None if it has no token (yet).'''
+
+		token = self.tokens[hex_id]
+		return None if token is None else CatanConstants.token_map[token]
+
+
+class BoardConstraint:
+	'''A rule that generated boards have to follow.
+	Each check is made right after something is placed, with the board as far as it is filled in,
+	so a check should only look at what is already placed. Subclasses override the checks they need.'''
+
+	def allows_tile(self, board: PartialBoard, hex_id: int) -> bool:
+		'''Whether the resource just placed on hex_id is allowed.'''
+		return True
+
+	def allows_token(self, board: PartialBoard, hex_id: int) -> bool:
+		'''Whether the token just placed on hex_id is allowed. All resources are placed by then.'''
+		return True
+
+	def allows_board(self, board: PartialBoard) -> bool:
+		'''Whether the finished board is allowed.'''
+		return True
+
+
+class NoNeighbouringNumbers(BoardConstraint):
+	'''No two neighbouring hexes both have one of the given numbers, by default 6 and 8.'''
+
+	def __init__(self, numbers: Tuple[int, ...] = (6, 8)) -> None:
+		self._numbers = set(numbers)
+
+	def allows_token(self, board: PartialBoard, hex_id: int) -> bool:
+		if board.get_number(hex_id) not in self._numbers:
+			return True
+		return all([board.get_number(other) not in self._numbers for other in board.neighbours[hex_id]])
+
+
+class NoSameNumberNeighbours(BoardConstraint):
+	'''No two neighbouring hexes have the same number.'''
+
+	def allows_token(self, board: PartialBoard, hex_id: int) -> bool:
+		number = board.get_number(hex_id)
+		return all([board.get_number(other) != number for other in board.neighbours[hex_id]])
+
+
+class NoSameResourceNeighbours(BoardConstraint):
+	'''No two neighbouring hexes have the same resource.'''
+
+	def allows_tile(self, board: PartialBoard, hex_id: int) -> bool:
+		resource = board.resources[hex_id]
+		return all([board.resources[other] != resource for other in board.neighbours[hex_id]])
+
+
+_hex_neighbours = {}  # type: Dict[int, List[Tuple[int, ...]]]
+
+
+def get_hex_neighbours(topology: BoardTopology) -> List[Tuple[int, ...]]:
+	'''For each hex ID, the hexes that share an edge (two corners) with it.'''
+
+	neighbours = _hex_neighbours.get(id(topology))
+	if neighbours is None:
+		corners = [set(vids) for vids in topology.hex_vertices]
+		neighbours = [
+			tuple([other for other in range(len(corners)) if other != hex_id and len(corners[hex_id] & corners[other]) == 2])
+			for hex_id in range(len(corners))
+		]
+		# topologies are shared and never go away, so the id stays valid
+		_hex_neighbours[id(topology)] = neighbours
+	return neighbours
+
+
+class _Restart(Exception):
+	pass
+
+
+class _Search:
+	'''Depth-first search over the tiles, then the tokens, then the ports, in a random order.'''
+
+	def __init__(self, topology: BoardTopology, constraints: List[BoardConstraint], rng: random.Random,
+				 max_steps: int, steps_per_restart: int) -> None:
+		self._constraints = constraints
+		self._rng = rng
+		self._steps_left = max_steps
+		self._steps_per_restart = steps_per_restart
+		self._board = PartialBoard(topology, sum(CatanConstants.port_distribution.values()))
+
+	def run(self) -> PartialBoard:
+		'''Search until a board is found. A search that takes too long has usually got stuck
+		deep in the tree, below an early choice that cannot work out, so it starts again from scratch.'''
+
+		while True:
+			board = self._board
+			board.resources = [None] * len(board.resources)
+			board.tokens = [None] * len(board.tokens)
+			board.ports = [None] * len(board.ports)
+			self._restart_steps_left = self._steps_per_restart
+			try:
+				if self._place_tile(0, dict(CatanConstants.resource_distribution)):
+					return board
+			except _Restart:
+				continue
+			raise BoardGenerationError("no board satisfies the constraints")
+
+	def _take_step(self) -> None:
+		self._steps_left -= 1
+		if self._steps_left < 0:
+			raise BoardGenerationError("no board that satisfies the constraints was found")
+		self._restart_steps_left -= 1
+		if self._restart_steps_left < 0:
+			raise _Restart()
+
+	def _get_choices(self, remaining: Dict[str, int]) -> List[str]:
+		choices = [value for value, n in remaining.items() if n > 0]
+		self._rng.shuffle(choices)
+		return choices
+
+	def _place_tile(self, hex_id: int, remaining: Dict[str, int]) -> bool:
+		board = self._board
+		if hex_id == len(board.resources):
+			letters = sorted(CatanConstants.token_map.keys())
+			return self._place_token(0, letters)
+		for resource in self._get_choices(remaining):
+			self._take_step()
+			board.resources[hex_id] = resource
+			if all([c.allows_tile(board, hex_id) for c in self._constraints]):
+				remaining[resource] -= 1
+				found = self._place_tile(hex_id + 1, remaining)
+				remaining[resource] += 1
+				if found:
+					return True
+		board.resources[hex_id] = None
+		return False
+
+	def _place_token(self, hex_id: int, letters: List[str]) -> bool:
+		board = self._board
+		if hex_id == len(board.tokens):
+			return self._place_port(0, dict(CatanConstants.port_distribution))
+		if board.resources[hex_id] == "desert":
+			return self._place_token(hex_id + 1, letters)
+		# tokens with the same number are interchangeable, so only try one of each
+		by_number = {}  # type: Dict[int, str]
+		for letter in letters:
+			by_number.setdefault(CatanConstants.token_map[letter], letter)
+		choices = list(by_number.values())
+		self._rng.shuffle(choices)
+		for letter in choices:
+			self._take_step()
+			board.tokens[hex_id] = letter
+			if all([c.allows_token(board, hex_id) for c in self._constraints]):
+				i = letters.index(letter)
+				del letters[i]
+				found = self._place_token(hex_id + 1, letters)
+				letters.insert(i, letter)
+				if found:
+					return True
+		board.tokens[hex_id] = None
+		return False
+
+	def _place_port(self, port_i: int, remaining: Dict[str, int]) -> bool:
+		board = self._board
+		if port_i == len(board.ports):
+			return all([c.allows_board(board) for c in self._constraints])
+		for port_type in self._get_choices(remaining):
+			self._take_step()
+			board.ports[port_i] = port_type
+			remaining[port_type] -= 1
+			found = self._place_port(port_i + 1, remaining)
+			remaining[port_type] += 1
+			if found:
+				return True
+		board.ports[port_i] = None
+		return False
+
+
+def search_board(topology: BoardTopology, constraints: List[BoardConstraint], rng: random.Random,
+				 max_steps: int = 200000, steps_per_restart: int = 2000) -> PartialBoard:
+	'''Return a random complete board that satisfies all the constraints.
+	Raise BoardGenerationError if none is found within max_steps placements.'''
+
+	return _Search(topology, constraints, rng, max_steps, steps_per_restart).run()
@@ -7,23 +7,28 @@ from ai.smart_placement_ai import SmartPlacementAI
 from typing import Dict, List, Type
 from argparse import ArgumentParser
 import logging
-from catan_tk import CatanApp
-import random
+import topology
 from game_engine import Game, GameState
+from game_events import log_event
 from ai.dummy_ai import DummyAI
-import coloredlogs
 
 
 class CatanCLI:
-	def __init__(self, colors: List[str], ai_classes: Dict[str, Type[AI]], random_seed: int):
-		random.seed(random_seed)
-		lattice = CatanApp.get_hex_coord_lattice()
+	def __init__(self, colors: List[str], ai_classes: Dict[str, Type[AI]], random_seed: int, silent: bool = False):
+		'''With silent set, nothing is printed or logged while playing.'''
+
+		self._silent = silent
+		self._num_turns = 0
+		lattice = topology.get_default_lattice()
 		self._colors = colors
 		self._game = Game(
 			starting_color=colors[0],
 			colors=colors,
-			hex_coord_lattice=lattice
+			hex_coord_lattice=lattice,
+			seed=random_seed
 		)
+		if not silent:
+			self._game.subscribe(log_event)
 		self._ais = {}  # type: Dict[str, AI]
 		for color in colors:
 			self._ais[color] = ai_classes[color](color, self._game)
@@ -38,20 +43,42 @@ class CatanCLI:
 			self._game.add_road(road[0], road[1], color, initial_placement=True)
 			self._game.next_turn()
 
+	def get_game(self) -> Game:
+		return self._game
+
+	def get_num_turns(self) -> int:
+		'''Return the number of turns played by play_game.'''
+
+		return self._num_turns
+
+	def get_vp_breakdown(self, color: str) -> Dict[str, int]:
+		'''Return where the victory points of the given player come from, as printed by print_game_winner_status.'''
+
+		player = self._game.get_player(color)
+		return {
+			"settlements": player.get_num_settlements(),
+			"cities": player.get_num_cities(),
+			"development_card_vp": player.get_development_card_vp(),
+			"longest_road": int(player.has_special_card("longest road")),
+			"largest_army": int(player.has_special_card("largest army")),
+			"vp": player.get_num_vp(),
+		}
+
 	def print_game_winner_status(self, winning_color: str) -> None:
 		print(f"Winning player: {winning_color}")
 		player = self._game.get_player(winning_color)
-		ns = player.get_num_settlements()
+		vp = self.get_vp_breakdown(winning_color)
+		ns = vp["settlements"]
 		print(f"# settlements: {ns} ({ns} points)")
-		nc = player.get_num_cities()
+		nc = vp["cities"]
 		print(f"# cities: {nc} ({nc * 2} points)")
-		print(f"# development card VPs: {player.get_development_card_vp()} points")
-		if player.has_special_card("longest road"):
+		print(f"# development card VPs: {vp['development_card_vp']} points")
+		if vp["longest_road"]:
 			print("+ longest road (2 points)")
-		if player.has_special_card("largest army"):
+		if vp["largest_army"]:
 			print("+ largest army (2 points)")
 
-		print(f"total points: {player.get_num_vp()}")
+		print(f"total points: {vp['vp']}")
 
 		print("")
 		print(" ---- development cards ------")
@@ -60,13 +87,15 @@ class CatanCLI:
 	def play_game(self) -> None:
 		assert self._game.get_state() == GameState.ROLL_DICE
 		turn = 1
-		print("-" * 40)
+		if not self._silent:
+			print("-" * 40)
 		while not self._game.is_game_over and turn < 1000:
 			color = self._game.get_current_color()
-			print(f"Turn {turn} - {color}")
-			player = self._game.get_player(color)
-			print(f"{player.get_num_vp()} points")
-			print(player.get_printable_hand())
+			if not self._silent:
+				print(f"Turn {turn} - {color}")
+				player = self._game.get_player(color)
+				print(f"{player.get_num_vp()} points")
+				print(player.get_printable_hand())
 			# player = self._game.get_player(color
 			n = self._game.roll_dice()
 			if n == 7:
@@ -75,7 +104,9 @@ class CatanCLI:
 			ai.do_turn(self._game)
 			self._game.next_turn()
 			turn += 1
-		self.print_game_winner_status(self._game.get_winning_player())
+		self._num_turns = turn - 1
+		if not self._silent:
+			self.print_game_winner_status(self._game.get_winning_player())
 
 	def _process_robber(self, current_color: str):
 		for color in self._colors:
@@ -89,13 +120,14 @@ class CatanCLI:
 def setup_logging(verbose: bool):
 	log_level = (logging.DEBUG if verbose else logging.INFO)
 	logging.basicConfig(level=log_level)
+	import coloredlogs
 	coloredlogs.install(level=log_level)
 
 
 if __name__ == "__main__":
 	parser = ArgumentParser()
 	parser.add_argument("-v", "--verbose", action="store_true")
-	parser.add_argument("--seed", default=42,
+	parser.add_argument("--seed", type=int, default=42,
 		help="random seed to use for random number generator")
 	args = parser.parse_args()
 	setup_logging(args.verbose)
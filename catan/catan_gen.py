@@ -101,12 +101,27 @@ d) Be able to add robber
 
 
 from typing import List
+from catan_types import ResourceVector
+
+
+# the fixed order of resources in a resource vector
+RESOURCES = ("brick", "ore", "sheep", "wood", "wheat")
+RESOURCE_INDEX = {r: i for i, r in enumerate(RESOURCES)}
 
 
 def flatten_list(l: List[List[str]]) -> List[str]:
 	return [item for sublist in l for item in sublist]
 
 
+def to_resource_vector(r_list: List[str]) -> ResourceVector:
+	'''Count the resources in r_list into a vector ordered like RESOURCES.'''
+
+	v = [0] * len(RESOURCES)
+	for r in r_list:
+		v[RESOURCE_INDEX[r]] += 1
+	return tuple(v)  # type: ignore
+
+
 class CatanConstants():
 	'''Keep constants under one namespace.'''
 
@@ -133,6 +148,10 @@ class CatanConstants():
 		"road" : ["brick", "wood"]
 	}
 
+	# the same costs as resource vectors
+	development_card_cost_vector = to_resource_vector(development_card_cost)
+	building_cost_vectors = {k: to_resource_vector(v) for k, v in building_costs.items()}
+
 	# The number of tiles each resource has on a standard Catan board
 	resource_distribution = {
 		"brick" : 3,
@@ -210,6 +229,12 @@ class CatanConstants():
 		return flatten_list(l_start)
 
 
+# fixed numbering of tile types, token letters and port types, for storing boards compactly
+TILE_TYPES = RESOURCES + ("desert",)
+TOKENS = tuple(sorted(CatanConstants.token_map.keys()))
+PORT_TYPES = ("generic",) + RESOURCES
+
+
 class CatanRenderConstants():
 	resource_color_map = {
 		"brick" : "firebrick",
@@ -18,8 +18,11 @@ TODO break up the view and control portions
 from tkinter import RIGHT, DISABLED, W, HIDDEN, NORMAL, Tk, Frame, Button, StringVar, S, Label, Canvas
 from catan_gen import CatanConstants, CatanRenderConstants
 from game_engine import Game, DevelopmentCardError, SettlementPlacementError, CityUpgradeError, RoadPlacementError, GameState
+from game_events import log_event
 from utils import CatanUtils
-from catan_types import Vertex, Lattice, Vertices
+from catan_types import Vertex, Lattice
+import topology
+from topology import get_hex_coords, get_hex_row, get_hex_lattice
 import math
 import logging
 from ai.smart_placement_ai import SmartPlacementAI
@@ -29,65 +32,6 @@ from typing import Dict, List
 logger = logging.getLogger(__name__)
 
 
-def get_hex_coords(x_0: int, y_0: int,
-                   minor_horiz_dist: int, major_horiz_dist: int, minor_vert_dist: int) -> Vertices:
-	'''Given certain parameters for the hexagon, return tuple of vertices for hexagon.'''
-
-	# TODO move under class
-
-	# hex coordinates are always in the same order
-	# starting with middle-left and going counter-clockwise
-	# assume that +y == down and -y == up
-	return (
-		(x_0, y_0),
-		(x_0 + minor_horiz_dist, y_0 + minor_vert_dist),
-		(x_0 + minor_horiz_dist + major_horiz_dist, y_0 + minor_vert_dist),
-		(x_0 + 2 * minor_horiz_dist + major_horiz_dist, y_0),
-		(x_0 + minor_horiz_dist + major_horiz_dist, y_0 - minor_vert_dist),
-		(x_0 + minor_horiz_dist, y_0 - minor_vert_dist),
-	)
-
-
-def get_hex_row(x_0, y_0, minor_horiz_dist, major_horiz_dist, minor_vert_dist, num) -> List[Vertices]:
-	'''Return list of hex row coordinates. num is the number of hexes in this row.'''
-
-	# TODO move under class
-
-	hexes = []  # type: List[Vertices]
-
-	for i in range(num):
-		if len(hexes) > 0:
-			x_0, y_0 = hexes[-1][3]
-			x_0 += major_horiz_dist
-		hexes.append(get_hex_coords(x_0, y_0, minor_horiz_dist, major_horiz_dist, minor_vert_dist))
-	return hexes
-
-
-def get_hex_lattice(x_0: int, y_0: int,
-                    minor_horiz_dist: int, major_horiz_dist: int, minor_vert_dist: int) -> Lattice:
-	'''Return a list of lists of hex coords.'''
-
-	# TODO move under class
-
-	rows = []  # type: Lattice
-	decr_set = set([1, 2, 4, 6])
-	incr = minor_horiz_dist + major_horiz_dist
-
-	for row_num, num_cols in enumerate(CatanConstants.tile_layout):
-		if len(rows) > 0:
-			x_0, y_0 = rows[-1][0][0]
-			y_0 += minor_vert_dist
-
-			if row_num in decr_set:
-				x_0 -= incr
-			else:
-				x_0 += incr
-
-		rows.append(get_hex_row(x_0, y_0, minor_horiz_dist, major_horiz_dist, minor_vert_dist, num_cols))
-
-	return rows
-
-
 def draw_hex(canvas, hex, row, col):
 	'''Draw this hexagon object.'''
 
@@ -184,10 +128,10 @@ class CatanApp():
 
 	height = 550
 	width = 900
-	minor_horiz_dist = 30
-	major_horiz_dist = 60
-	minor_vert_dist = 50
-	render_start = (200, minor_vert_dist + 20)
+	minor_horiz_dist = topology.MINOR_HORIZ_DIST
+	major_horiz_dist = topology.MAJOR_HORIZ_DIST
+	minor_vert_dist = topology.MINOR_VERT_DIST
+	render_start = topology.RENDER_START
 
 	settlement_radius = 20
 	city_radius = 22
@@ -354,6 +298,7 @@ class CatanApp():
 			colors=self.players,
 			hex_coord_lattice=hex_coord_lattice
 		)
+		self._map.subscribe(log_event)
 		self.set_vertices(self._map.get_map())
 
 		self.draw_board(w)
@@ -1028,15 +973,8 @@ class CatanApp():
 			self.post_status_note(str(e), error=True)
 
 	@staticmethod
-	def get_hex_coord_lattice():
-		hex_coord_lattice = get_hex_lattice(
-			CatanApp.render_start[0],
-			CatanApp.render_start[1],
-			CatanApp.minor_horiz_dist,
-			CatanApp.major_horiz_dist,
-			CatanApp.minor_vert_dist
-		)
-		return hex_coord_lattice
+	def get_hex_coord_lattice() -> Lattice:
+		return topology.get_default_lattice()
 
 	@staticmethod
 	def set_vertices(map):
@@ -1044,14 +982,7 @@ class CatanApp():
 		'''
 
 		# lattice AKA board
-		# TODO maybe calculate vertices rather than generating them all at once
-		hex_coord_lattice = get_hex_lattice(
-			CatanApp.render_start[0],
-			CatanApp.render_start[1],
-			CatanApp.minor_horiz_dist,
-			CatanApp.major_horiz_dist,
-			CatanApp.minor_vert_dist
-		)
+		hex_coord_lattice = topology.get_default_lattice()
 
 		for row_i, row in enumerate(map):
 			for col_i, col in enumerate(row):
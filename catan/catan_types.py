@@ -6,4 +6,7 @@ Edge = Tuple[Vertex, Vertex]
 HexCoord = Tuple[int, int]
 Vertices = Tuple[Vertex, Vertex, Vertex, Vertex, Vertex, Vertex]
 LatticeRow = List[Vertices]
-Lattice = List[LatticeRow]
\ No newline at end of file
+Lattice = List[LatticeRow]
+
+# counts of brick, ore, sheep, wood and wheat, in that order
+ResourceVector = Tuple[int, int, int, int, int]
@@ -4,12 +4,20 @@ This file maintains the state of the overall gameplay
 
 import random
 from collections import deque
-from catan_gen import CatanConstants
+from catan_gen import CatanConstants, RESOURCES, RESOURCE_INDEX
 from hex import Hex
 from player import Player
 from settlement import Settlement
-from typing import Dict, List, Set, Optional, Tuple
-from catan_types import Vertex, Edge, Lattice, HexCoord
+from typing import Dict, Iterator, List, NamedTuple, Set, Optional, Tuple
+from catan_types import Vertex, Edge, Lattice, HexCoord, ResourceVector
+from topology import BoardTopology, get_topology, iter_bits, count_bits
+from game_random import GameRandom, Seed
+from board_search import BoardConstraint, search_board
+from zobrist import get_keys
+from game_events import (Subscriber, DiceRolled, ResourcesProduced, InitialResourcesProduced, SettlementBuilt,
+                         CityBuilt, RoadBuilt, RobberMoved, ResourceStolen, DevelopmentCardBought,
+                         DevelopmentCardPlayed, MonopolyTaken, LongestRoadChanged, LargestArmyChanged,
+                         ResourcesDiscarded, TurnEnded, InitialPlacementEnded, GameOver)
 import logging
 from enum import Enum, auto
 
@@ -33,6 +41,10 @@ class RoadPlacementError(Exception):
     pass
 
 
+class RobberPlacementError(Exception):
+    pass
+
+
 class GameState(Enum):
     # FIRST_SETTLEMENT_PLACEMENT = auto()
     # SECOND_SETTLEMENT_PLACEMENT = auto()
@@ -44,33 +56,160 @@ class GameState(Enum):
     ROBBER_PLACEMENT = auto()
 
 
+class BoardLayout(NamedTuple):
+    '''Everything about a board that is decided when the game is set up.
+    Hexes are in topology order (row by row) and ports in the order of Game.get_port_locations().'''
+    resources: Tuple[str, ...]
+    # the token letter on each hex, None for the desert
+    tokens: Tuple[Optional[str], ...]
+    ports: Tuple[str, ...]
+
+
+# the two corners of each port location as (row, column, vertex index on the hex), where column -1 is the last
+PORT_LOCATIONS = (
+    ((1, 0, 4), (1, 0, 5)),
+    ((2, 0, 5), (2, 0, 0)),
+    ((4, 0, 0), (4, 0, 1)),
+    ((7, 0, 0), (7, 0, 1)),
+    ((8, 0, 1), (8, 0, 2)),
+    ((7, -1, 2), (7, -1, 3)),
+    ((4, -1, 2), (4, -1, 3)),
+    ((2, -1, 3), (2, -1, 4)),
+    ((1, -1, 4), (1, -1, 5)),
+)
+
+
+class ActionType(Enum):
+    SETTLEMENT = auto()
+    CITY = auto()
+    ROAD = auto()
+    BUY_DEVELOPMENT_CARD = auto()
+    PLAY_DEVELOPMENT_CARD = auto()
+    MOVE_ROBBER = auto()
+    ROLL_DICE = auto()
+    END_TURN = auto()
+
+
+class Action(NamedTuple):
+    '''A move that a player can make. What args holds depends on the kind of action:
+    SETTLEMENT, CITY: (vertex,)
+    ROAD: (v1, v2)
+    MOVE_ROBBER: (hex coord, color to steal from or None)
+    PLAY_DEVELOPMENT_CARD: the card followed by what it is played on, see get_development_card_params
+    everything else: ()'''
+    kind: ActionType
+    args: tuple = ()
+
+
+def get_development_card_params(args: tuple) -> dict:
+    '''Turn the args of a PLAY_DEVELOPMENT_CARD action into the params for Game.play_development_card.'''
+
+    card = args[0]
+    if card == "knight":
+        return {"target_hex": args[1], "target_color": args[2]}
+    elif card == "monopoly":
+        return {"target_resource": args[1]}
+    elif card == "year of plenty":
+        return {"resources": [args[1], args[2]]}
+    elif card == "road building":
+        return {"roads": [args[1], args[2]]}
+    else:
+        raise NotImplementedError(card)
+
+
+# the state saved by Game to undo moves (see move_log)
+# special cards: longest road holder and length, largest army holder and size
+SpecialCardState = Tuple[Optional[str], int, Optional[str], int]
+# turn, state, placement count, whether a development card was played, whether the game is over
+TurnState = Tuple[int, GameState, int, bool, bool]
+# available settlement bits, settlement and road frontiers of all players, road components of all players
+SettlementState = Tuple[int, Dict[str, int], Dict[str, int], Dict[str, List[Tuple[int, int]]]]
+# the roads of one player: road bits, all road bits, road vertex bits, road frontiers of all players,
+# settlement frontier, number of roads, road components
+RoadState = Tuple[int, int, int, Dict[str, int], int, int, List[Tuple[int, int]]]
+# state and robber hex
+RobberState = Tuple[GameState, HexCoord]
+# development cards in hand, knights played, whether a card was played this turn, state, robber hex
+DevelopmentCardState = Tuple[Dict[str, int], int, bool, GameState, HexCoord]
+
+
+# the order of the board positions in which tokens are placed, see Game.get_token_spiral
+_token_spiral = None  # type: Optional[List[HexCoord]]
+
+
 class Game():
     '''Engine for generating Catan maps.'''
 
     def __init__(self, starting_color: str,
                  colors: List[str],
-                 hex_coord_lattice: Lattice) -> None:
+                 hex_coord_lattice: Lattice,
+                 board: Optional[BoardLayout] = None,
+                 seed: Optional[Seed] = None,
+                 board_constraints: Optional[List[BoardConstraint]] = None) -> None:
+        '''Create a new game. If board is given, use that layout instead of generating a random board.
+        If board_constraints are given, generate a random board that satisfies them (see board_search).
+        Such a board does not use the usual token spiral, since the constraints may not allow it.
+        All randomness in the game (board, dice, deck, steals) comes from generators derived from seed,
+        so games with the same seed play out the same. Without a seed, one is drawn from the random module.'''
+
+        self._random = GameRandom(seed)
+        # called with every event of the game (see game_events)
+        # events are only created while this is not empty
+        self._subscribers = []  # type: List[Subscriber]
+
         self._decr_set = set([1, 2, 4, 6])
         self._players = {}  # type: Dict[str, Player]
         self._dev_card_deck = []  # type: List[str]
         # list of rows, where each row is a list of Hex tiles
         self._board = []  # type: List[List[Hex]]
-        self._settlements = {}  # type: Dict[Vertex, Settlement]
-        self._roads = set([])  # type: Set[Edge]
+
+        # vertex, edge and hex IDs along with the adjacency tables between them
+        # this never changes after board setup and is shared with other games on the same lattice
+        self._topology = get_topology(hex_coord_lattice)
+
+        # settlement on each vertex, indexed by vertex ID
+        self._settlements = [None] * self._topology.num_vertices  # type: List[Optional[Settlement]]
+
+        # bitboards for each player: bit i is set iff that player has built on vertex / edge i
+        # settlements upgraded to cities move from the settlement bitboard to the city bitboard
+        self._settlement_bits = {color: 0 for color in colors}  # type: Dict[str, int]
+        self._city_bits = {color: 0 for color in colors}  # type: Dict[str, int]
+        self._road_bits = {color: 0 for color in colors}  # type: Dict[str, int]
+        # union of the above over all players
+        self._building_bits = 0
+        self._all_road_bits = 0
+        # for each player, the vertices at the ends of their roads
+        self._road_vertex_bits = {color: 0 for color in colors}  # type: Dict[str, int]
+        # for each player, the edges on which they may build a road next
+        # kept up to date by add_road and add_settlement
+        self._road_frontier_bits = {color: 0 for color in colors}  # type: Dict[str, int]
+        # for each player, the vertices at the ends of their roads on which a settlement may still be built
+        # kept up to date by add_road and cull_bad_settlement_vertices
+        self._settlement_frontier_bits = {color: 0 for color in colors}  # type: Dict[str, int]
 
         # used in longest road calculation
-        # adjacency list
-        self._road_graph = {}  # type: Dict[str, Dict[Vertex, List[Vertex]]]
+        # for each player, the connected pieces of their road network as (edge bitboard, longest trail length)
+        # two roads are only connected through a vertex without another player's building on it
+        self._road_components = {color: [] for color in colors}  # type: Dict[str, List[Tuple[int, int]]]
 
-        # map from vertices to adjacent hexes
+        # map from vertex IDs to adjacent hexes
         # used for resource and robber calculations
-        self._vertex_map = {}  # type: Dict[Vertex, List[Hex]]
+        self._vertex_map = []  # type: List[List[Hex]]
+        self._hex_list = []  # type: List[Hex]
 
         # this is a set of *all* game vertices. this set never changes after board setup.
         self._vertex_set = set([])  # type: Set[Vertex]
         self._road_set = set([])  # type: Set[Edge]
         self._resource_map = {}  # type: Dict[int, List[Hex]]
 
+        # what each roll pays out: map from roll to each player's resource vector
+        # kept up to date as buildings are added and the robber moves, so a roll is a single lookup
+        self._payout_table = {}  # type: Dict[int, Dict[str, List[int]]]
+        # for each hex ID, how many resources each player collects when that hex produces, ignoring the robber
+        self._hex_yields = []  # type: List[Dict[str, int]]
+        # for each hex ID, its number and the index of its resource in a resource vector (None for the desert)
+        self._hex_payout_slots = []  # type: List[Optional[Tuple[int, int]]]
+
         self._is_game_over = False
         # index into self.colors
         self._turn = colors.index(starting_color)
@@ -83,6 +222,9 @@ class Game():
         self._placement_count = 0
         self._robber_hex = (0, 0)  # type: Tuple[int, int]
         self._desert_pos = (0, 0)  # type: Tuple[int, int]
+        self._create_hash_keys()
+        # Zobrist hash of the buildings, roads and robber on the board, updated as they change (see get_hash)
+        self._position_hash = 0
 
         # ports map location to the type of port
         # generic ports have type "generic"
@@ -90,6 +232,9 @@ class Game():
 
         self._player_played_development_card = False
 
+        # scratch space for the longest road search
+        self._longest_trail = 0
+
         # where do the special cards reside?
         self._longest_road_player = None  # type: Optional[Player]
         self._largest_army_player = None  # type: Optional[Player]
@@ -97,90 +242,194 @@ class Game():
         self._largest_army_num_knights = 0
 
         self._create_players(self._colors)
-        self._generate_board()
+        if board_constraints is not None:
+            assert board is None
+            board = self._generate_constrained_layout(board_constraints)
+        self._generate_board(board)
         self._make_dev_card_deck()
         self._prepare_data_structures()
 
+    def clone(self, seed: Optional[Seed] = None) -> 'Game':
+        '''Return an independent copy of this game, for example to try out moves in a search.
+        The board, topology and the other data that never change after setup are shared with the copy.
+        Only the game state (players, buildings, roads, robber, deck, turn) is copied.
+        The copy starts without subscribers.
+        If seed is given, the copy gets new random number generators from it and its deck is shuffled,
+        so that it does not know the dice or the cards coming up in this game.'''
+
+        game = Game.__new__(Game)
+        game.__dict__.update(self.__dict__)
+        game._copy_state_from(self, copy_random=seed is None)
+        game._subscribers = []
+        if seed is not None:
+            game._random = GameRandom(seed)
+            game.get_rng("deck").shuffle(game._dev_card_deck)
+        return game
+
+    def restore(self, snapshot: 'Game') -> None:
+        '''Put this game back into the state of the given snapshot, which was made with clone().
+        The snapshot is not changed and can be restored again. This game keeps its subscribers.
+        NOTE: Player objects obtained from this game before the call are no longer used by it.'''
+
+        assert snapshot._topology is self._topology
+        subscribers = self._subscribers
+        self.__dict__.update(snapshot.__dict__)
+        self._copy_state_from(snapshot)
+        self._subscribers = subscribers
+
+    def _copy_state_from(self, other: 'Game', copy_random: bool = True) -> None:
+        '''Replace the mutable state that this game shares with other by copies.
+        Without copy_random, the random number generators are left shared, for the caller to replace.'''
+
+        settlements = [None if s is None else s.clone() for s in other._settlements]
+        self._settlements = settlements
+        by_vertex = {s.vertex(): s for s in settlements if s is not None}
+        self._players = {color: p.clone(by_vertex) for color, p in other._players.items()}
+        self._dev_card_deck = other._dev_card_deck.copy()
+        if copy_random:
+            self._random = other._random.clone()
+        self._settlement_bits = other._settlement_bits.copy()
+        self._city_bits = other._city_bits.copy()
+        self._road_bits = other._road_bits.copy()
+        self._road_vertex_bits = other._road_vertex_bits.copy()
+        self._road_frontier_bits = other._road_frontier_bits.copy()
+        self._settlement_frontier_bits = other._settlement_frontier_bits.copy()
+        # the components themselves are immutable tuples
+        self._road_components = {color: l.copy() for color, l in other._road_components.items()}
+        self._payout_table = {
+            roll: {color: payout.copy() for color, payout in payouts.items()}
+            for roll, payouts in other._payout_table.items()
+        }
+        self._hex_yields = [hex_yield.copy() for hex_yield in other._hex_yields]
+        if other._longest_road_player is not None:
+            self._longest_road_player = self._players[other._longest_road_player.get_color()]
+        if other._largest_army_player is not None:
+            self._largest_army_player = self._players[other._largest_army_player.get_color()]
+
+    def _set_special_card_holders(self, longest_road_color: Optional[str], longest_road_length: int,
+                                  largest_army_color: Optional[str], largest_army_num_knights: int) -> None:
+        '''Hand out the longest road and largest army cards as given, taking them from anybody else.'''
+
+        self._longest_road_player = None if longest_road_color is None else self._players[longest_road_color]
+        self._longest_road_length = longest_road_length
+        self._largest_army_player = None if largest_army_color is None else self._players[largest_army_color]
+        self._largest_army_num_knights = largest_army_num_knights
+        for card, holder in [("longest road", self._longest_road_player), ("largest army", self._largest_army_player)]:
+            for player in self._players.values():
+                if player.has_special_card(card) and player is not holder:
+                    player.remove_special_card(card)
+            if holder is not None and not holder.has_special_card(card):
+                holder.add_special_card(card)
+
+    def _get_special_card_holders(self) -> SpecialCardState:
+        '''Return the arguments to _set_special_card_holders that hand out the special cards as they are now.'''
+
+        road, army = self._longest_road_player, self._largest_army_player
+        return (road and road.get_color(), self._longest_road_length,
+                army and army.get_color(), self._largest_army_num_knights)
+
     def _make_dev_card_deck(self) -> None:
         '''Create a shuffled deck of development cards.'''
 
         self._dev_card_deck = []
         for card, num in CatanConstants.development_cards.items():
             self._dev_card_deck.extend([card] * num)
-        random.shuffle(self._dev_card_deck)
-
-    def _generate_ports(self) -> None:
-        '''Place ports on the board'''
-
-        port_locations = [
-            [
-                self._board[1][0].get_vertex(4),
-                self._board[1][0].get_vertex(5)
-            ],
-            [
-                self._board[2][0].get_vertex(5),
-                self._board[2][0].get_vertex(0)
-            ],
-            [
-                self._board[4][0].get_vertex(0),
-                self._board[4][0].get_vertex(1)
-            ],
-            [
-                self._board[7][0].get_vertex(0),
-                self._board[7][0].get_vertex(1)
-            ],
-            [
-                self._board[8][0].get_vertex(1),
-                self._board[8][0].get_vertex(2)
-            ],
-            [
-                self._board[7][-1].get_vertex(2),
-                self._board[7][-1].get_vertex(3)
-            ],
-            [
-                self._board[4][-1].get_vertex(2),
-                self._board[4][-1].get_vertex(3)
-            ],
-            [
-                self._board[2][-1].get_vertex(3),
-                self._board[2][-1].get_vertex(4)
-            ],
-            [
-                self._board[1][-1].get_vertex(4),
-                self._board[1][-1].get_vertex(5)
-            ]
+        self.get_rng("deck").shuffle(self._dev_card_deck)
+
+    def get_port_locations(self) -> List[List[Vertex]]:
+        '''Return the pair of vertices of each port location, in a fixed order.'''
+
+        return [
+            [self._board[row][col].get_vertex(i) for row, col, i in location]
+            for location in PORT_LOCATIONS
         ]
 
-        ports = []
-        for port_type, n in CatanConstants.port_distribution.items():
-            ports.extend([port_type] * n)
-        random.shuffle(ports)
+    def _generate_ports(self, ports: Optional[Tuple[str, ...]] = None) -> None:
+        '''Place ports on the board, randomly unless the port type at each location is given'''
+
+        port_locations = self.get_port_locations()
+        if ports is None:
+            port_list = []
+            for port_type, n in CatanConstants.port_distribution.items():
+                port_list.extend([port_type] * n)
+            self.get_rng("board").shuffle(port_list)
+            ports = tuple(port_list)
         assert len(ports) == len(port_locations)
 
         for port_type, location in zip(ports, port_locations):
             for vertex in location:
                 self._ports[vertex] = port_type
 
-    def _generate_board(self) -> None:
-        '''Generate the board randomly
+    def _generate_board(self, layout: Optional[BoardLayout] = None) -> None:
+        '''Generate the board randomly, or from the given layout
         Includes generating port positions'''
-        # create hexes with resources, shuffle
-        tile_deck = self._get_random_tile_deck()
-        # arrange deck on the board (so create placement)
-        self._place_tiles(tile_deck)
-        # assign tokens
-        self._assign_tokens()
+        if layout is None:
+            # create hexes with resources, shuffle
+            tile_deck = self._get_random_tile_deck()
+            # arrange deck on the board (so create placement)
+            self._place_tiles(tile_deck)
+            # assign tokens
+            self._assign_tokens()
+        else:
+            self._place_layout(layout)
         # once the board is set, have to set vertices for the hexes
         for row_i, row in enumerate(self._board):
             for col_i, hex in enumerate(row):
                 hex.set_vertices(self._hex_coord_lattice[row_i][col_i])
                 hex.set_coord((row_i, col_i))
                 self._hexes[(row_i, col_i)] = hex
-        self._generate_ports()
+        self._generate_ports(None if layout is None else layout.ports)
+
+    def _generate_constrained_layout(self, constraints: List[BoardConstraint]) -> BoardLayout:
+        '''Search for a random board layout that satisfies the constraints.
+        Raise board_search.BoardGenerationError if none is found.'''
+
+        board = search_board(self._topology, constraints, self.get_rng("board"))
+        return BoardLayout(tuple(board.resources), tuple(board.tokens), tuple(board.ports))
+
+    def _place_layout(self, layout: BoardLayout) -> None:
+        '''Place the tiles and tokens of the given layout on the board.'''
+
+        i = 0
+        for num_cols in CatanConstants.tile_layout:
+            row = []  # type: List[Hex]
+            self._board.append(row)
+            for col in range(num_cols):
+                hex = Hex(layout.resources[i])
+                if layout.tokens[i] is not None:
+                    hex.set_token(layout.tokens[i])
+                row.append(hex)
+                i += 1
+        assert i == len(layout.resources)
+
+    def get_board_layout(self) -> BoardLayout:
+        '''Return the layout of this board, from which the same board can be created again.'''
+
+        hexes = [self._board[row][col] for row, col in self._topology.hex_coords]
+        return BoardLayout(
+            resources=tuple([hex.get_resource() for hex in hexes]),
+            tokens=tuple([None if hex.get_resource() == "desert" else hex.get_token() for hex in hexes]),
+            ports=tuple([self._ports[location[0]] for location in self.get_port_locations()])
+        )
 
     def get_board(self) -> Dict[HexCoord, Hex]:
         return self._hexes
 
+    def subscribe(self, subscriber: Subscriber) -> None:
+        '''Call subscriber with every event of this game from now on (see game_events).'''
+
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.remove(subscriber)
+
+    def _emit(self, event: NamedTuple) -> None:
+        '''Pass the event to the subscribers.
+        Callers check self._subscribers first, so that no event is created when nobody listens.'''
+
+        for subscriber in self._subscribers:
+            subscriber(event)
+
     @property
     def is_game_over(self) -> bool:
         return self._is_game_over
@@ -190,11 +439,12 @@ class Game():
         Roll the dice and distribute resources based on the outcome
         It is up to the caller to handle a 7 (robber and discard events)'''
         assert self._state == GameState.ROLL_DICE, f"Current state is {str(self._state)}"
-        r1 = random.randint(1, 6)
-        r2 = random.randint(1, 6)
+        dice = self.get_rng("dice")
+        r1 = dice.randint(1, 6)
+        r2 = dice.randint(1, 6)
         roll = r1 + r2
-        color = self.get_current_color()
-        logger.debug("%s rolled %d", color, roll)
+        if self._subscribers:
+            self._emit(DiceRolled(self.get_current_color(), roll))
         self._produce_resources_from_roll(roll)
         if roll == 7:
             self._state = GameState.ROBBER_PLACEMENT
@@ -207,7 +457,8 @@ class Game():
         for color, player in self._players.items():
             if player.get_num_vp() >= 10:
                 self._is_game_over = True
-                logger.warning("Game is over - %s has over 10 points", color)
+                if self._subscribers:
+                    self._emit(GameOver(color, player.get_num_vp()))
                 break
 
     def next_turn(self) -> None:
@@ -217,6 +468,7 @@ class Game():
         Check game-end conditions here'''
 
         assert self._state != GameState.ROLL_DICE, "Cannot end turn before rollling dice"
+        color = self.get_current_color()
         if self._state == GameState.GAMEPLAY:
             self.check_game_over()
             self._turn = (self._turn + 1) % len(self._colors)
@@ -237,10 +489,20 @@ class Game():
             else:
                 self._turn = (self._turn - 1 + len(self._colors)) % len(self._colors)
             self._placement_count += 1
-            logger.debug("placement count=%d, next turn = %s" % (self._placement_count, self._colors[self._turn]))
-
             if self._placement_count == 2 * len(self._colors):
                 self.__end_initial_placement()
+        if self._subscribers:
+            self._emit(TurnEnded(color, self.get_current_color()))
+
+    def _save_turn_state(self) -> TurnState:
+        '''Save everything that next_turn and roll_dice change, apart from the hands, for _restore_turn_state.'''
+
+        return (self._turn, self._state, self._placement_count,
+                self._player_played_development_card, self._is_game_over)
+
+    def _restore_turn_state(self, saved: TurnState) -> None:
+        (self._turn, self._state, self._placement_count,
+         self._player_played_development_card, self._is_game_over) = saved
 
     def get_current_color(self) -> str:
         return self._colors[self._turn]
@@ -252,16 +514,11 @@ class Game():
         for color, player in self._players.items():
             if color == player_color:
                 continue
-            hand = player.get_hand()
-            if hand.get(target_resource, 0) > 0:
-                n = hand[target_resource]
-                assert n > 0
-                resource_list = [target_resource] * n
-                player.deduct_resources(resource_list)
-                logger.debug("Took %d x %s from %s using monopoly", n, target_resource, color)
-                receiving_player.add_resources(resource_list)
-            else:
-                logger.debug("Tried to take %s from %s using monopoly but that player does not have any", target_resource, color)
+            n = player.take_all_of_resource(target_resource)
+            if n > 0:
+                receiving_player.add_resource(target_resource, n)
+            if self._subscribers:
+                self._emit(MonopolyTaken(player_color, color, target_resource, n))
 
     def __play_knight_card(self, player_color: str, target_color: Optional[str], target_hex: HexCoord) -> None:
         assert isinstance(target_hex, tuple)
@@ -277,14 +534,15 @@ class Game():
         player = self._players[player_color]
         n = player.get_num_knights_played()
         if n >= 3 and n > self._largest_army_num_knights:
-            if self._largest_army_player and self._largest_army_player != player:
-                logger.info("%s lost largest army", self._largest_army_player.get_color())
-                self._largest_army_player.remove_special_card("largest army")
+            previous = self._largest_army_player
+            if previous and previous != player:
+                previous.remove_special_card("largest army")
             self._largest_army_num_knights = n
-            if self._largest_army_player != player:
+            if previous != player:
                 self._largest_army_player = player
                 player.add_special_card("largest army")
-                logger.info("%s now has the largest army (%d)", player_color, n)
+            if self._subscribers:
+                self._emit(LargestArmyChanged(player_color, previous and previous.get_color(), n))
 
     def __play_year_of_plenty_card(self, player_color: str, resources: List[str]) -> None:
         assert self._state == GameState.GAMEPLAY
@@ -292,6 +550,35 @@ class Game():
         player = self.get_player(player_color)
         player.add_resources(resources)
 
+    def __check_development_card_play(self, color: str, card: str, params: dict) -> None:
+        '''Raise the exception that playing the card would raise part of the way through, if any,
+        so that a card that cannot be played changes nothing and emits no events.'''
+
+        if card not in ("monopoly", "knight", "year of plenty", "road building"):
+            raise NotImplementedError(card)
+        if self.get_player(color).get_development_cards().get(card, 0) == 0:
+            raise DevelopmentCardError(f"This player does not have development card {card}")
+        if card == "knight" and not self.can_move_robber(params["target_hex"]):
+            raise RobberPlacementError(f"Cannot move the robber to {params['target_hex']}")
+        if card == "road building" and not self.__can_place_road_building_roads(color, params["roads"]):
+            raise RoadPlacementError(f"Cannot place roads {params['roads']} for player {color}")
+
+    def __can_place_road_building_roads(self, color: str, roads: List[Edge]) -> bool:
+        '''Return whether both roads of a road building card can be placed, the second one possibly from the first.'''
+
+        (a1, b1), (a2, b2) = [self._normalize_road(v1, v2) for v1, v2 in roads]
+        if not self.can_place_road(a1, b1, color) or (a1, b1) == (a2, b2):
+            return False
+        if self.can_place_road(a2, b2, color):
+            return True
+        edge_id = self._topology.edge_ids.get((a2, b2))
+        if edge_id is None or (self._all_road_bits >> edge_id) & 1:
+            return False
+        # the second road builds on from the first, unless another player's building is on the vertex between them
+        topology = self._topology
+        shared = topology.edge_vertex_masks[topology.edge_ids[(a1, b1)]] & topology.edge_vertex_masks[edge_id]
+        return (shared & ~self._get_blocking_bits(color)) != 0
+
     def __play_road_building_card(self, player_color: str, roads: List[Edge]) -> None:
         assert self._state == GameState.GAMEPLAY
         assert len(roads) == 2
@@ -300,12 +587,15 @@ class Game():
             self.add_road(road[0], road[1], player_color, initial_placement=True)
 
     def play_development_card(self, color: str, card: str, params: dict):
-        '''Player with given color plays given card. Process effects.'''
+        '''Player with given color plays given card. Process effects.
+        A card that cannot be played as given raises an exception before anything changes.'''
 
         assert not self._player_played_development_card
-        logger.info("%s played development card %s", color, card)
+        self.__check_development_card_play(color, card, params)
         player = self.get_player(color)
         player.play_development_card(card)
+        if self._subscribers:
+            self._emit(DevelopmentCardPlayed(color, card, params))
         if card == "monopoly":
             self.__play_monopoly_card(color, **params)
         elif card == "knight":
@@ -318,6 +608,20 @@ class Game():
             raise NotImplementedError(card)
         self._player_played_development_card = True
 
+    def _save_development_card_state(self, color: str) -> DevelopmentCardState:
+        '''Save what playing a development card changes besides hands, roads and special cards,
+        for _restore_development_card_state.'''
+
+        player = self._players[color]
+        return (player.get_development_cards().copy(), player.get_num_knights_played(),
+                self._player_played_development_card, self._state, self._robber_hex)
+
+    def _restore_development_card_state(self, color: str, saved: DevelopmentCardState) -> None:
+        dev_cards, num_knights_played, played_development_card, state, robber_hex = saved
+        self._players[color].restore_played_development_cards(dev_cards, num_knights_played)
+        self._player_played_development_card = played_development_card
+        self._restore_robber_state((state, robber_hex))
+
     def get_player_played_development_card(self) -> bool:
         return self._player_played_development_card
 
@@ -330,25 +634,42 @@ class Game():
     def has_development_cards(self) -> bool:
         return len(self._dev_card_deck) > 0
 
+    def get_development_card_deck(self) -> List[str]:
+        '''Return the development cards left in the deck. The last one is drawn next.'''
+
+        return self._dev_card_deck
+
+    def set_development_card_deck(self, deck: List[str]) -> None:
+        '''Replace the development cards left in the deck, say when loading a saved game.'''
+
+        self._dev_card_deck = list(deck)
+
     def buy_development_card(self, color: str) -> str:
         '''Give out a development card to the player if they can afford it.
         Return the development card, or None if none given.'''
 
         p = self.get_player(color)
-        cost = CatanConstants.development_card_cost
+        cost = CatanConstants.development_card_cost_vector
 
-        if p.can_deduct_resources(cost) and len(self._dev_card_deck) > 0:
-            logger.info("%s bought a development card", color)
-            p.deduct_resources(cost)
+        if p.can_deduct_resource_vector(cost) and len(self._dev_card_deck) > 0:
+            p.deduct_resource_vector(cost)
             card = self._dev_card_deck.pop()
             p.add_development_card(card)
-            logger.debug("development card was %s", card)
+            if self._subscribers:
+                self._emit(DevelopmentCardBought(color, card))
             return card
         elif len(self._dev_card_deck) == 0:
             raise DevelopmentCardError(f"There are no more development cards left")
         else:
             raise DevelopmentCardError(f"Player {color} cannot afford to buy a development card")
 
+    def _unbuy_development_card(self, color: str, card: str) -> None:
+        '''Take back the last development card bought by the player, putting it back on the deck.
+        The player's hand is left alone.'''
+
+        self._dev_card_deck.append(card)
+        self._players[color].remove_development_card(card)
+
     def _create_players(self, colors: List[str]) -> None:
         '''Create brand new players. For now, they are just placeholders.'''
 
@@ -363,34 +684,36 @@ class Game():
     def _assign_tokens(self) -> None:
         '''Assign tokens to the tiles on the board.'''
 
-        # a reversed list of letters (so pop operation works)
-        # so higher numbers go first
-        letters = deque(sorted(CatanConstants.token_map.keys(), reverse=True))
-        unplaced_layout = { row : col for row, col in enumerate(CatanConstants.tile_layout) }
-
-        row = 2
-        col = 0
-
-        # do this for all the letters
-        while len(letters) > 0:
-
+        # letters in order, so lower letters (higher numbers) go first
+        letters = deque(sorted(CatanConstants.token_map.keys()))
+        for row, col in Game.get_token_spiral():
             # withdraw a letter from the map
             if self._board[row][col].get_resource() != "desert":
-                l = letters.pop()
-                #print "{} ==> {}".format((row, col), l)
-                self._board[row][col].set_token(l)
-            #else:
-            #print "desert at {}".format((row, col))
-
-            unplaced_layout[row] -= 1
-
-            if unplaced_layout[row] == 0:
-                del(unplaced_layout[row])
-
-            if len(unplaced_layout) > 0:
-                row, col = self._get_next_tile(row, col, unplaced_layout)
-
-    def _get_next_tile(self, row: int, col: int, unplaced_layout: Dict[int, int]) -> Vertex:
+                self._board[row][col].set_token(letters.popleft())
+
+    @staticmethod
+    def get_token_spiral() -> List[HexCoord]:
+        '''Return the board positions (row, column from the left) in the order that tokens are placed on them.
+        This is a spiral starting at [2][0]; the desert is skipped wherever it lands.'''
+
+        global _token_spiral
+        if _token_spiral is None:
+            unplaced_layout = { row : col for row, col in enumerate(CatanConstants.tile_layout) }
+            row = 2
+            col = 0
+            spiral = []  # type: List[HexCoord]
+            while len(unplaced_layout) > 0:
+                spiral.append((row, col % CatanConstants.tile_layout[row]))
+                unplaced_layout[row] -= 1
+                if unplaced_layout[row] == 0:
+                    del(unplaced_layout[row])
+                if len(unplaced_layout) > 0:
+                    row, col = Game._get_next_tile(row, col, unplaced_layout)
+            _token_spiral = spiral
+        return _token_spiral
+
+    @staticmethod
+    def _get_next_tile(row: int, col: int, unplaced_layout: Dict[int, int]) -> Vertex:
         '''Calculate next tile position from this tile position when placing tokens.'''
 
         if row == 4 and col == 0:
@@ -444,7 +767,7 @@ class Game():
     def _get_random_tile_deck(self) -> List[str]:
         '''Return a shuffled deck of unplaced resources.'''
         deck = CatanConstants.get_resource_distribution_pool()
-        random.shuffle(deck)
+        self.get_rng("board").shuffle(deck)
         return deck
 
     def _prepare_data_structures(self) -> None:
@@ -454,14 +777,16 @@ class Game():
         self._create_vertex_set()
         self._create_road_set()
 
-        # this is the available set of nodes on which settlements can be built
-        self.available_settlement_set = self._vertex_set.copy()
-        assert len(self.available_settlement_set) > 0
+        # bitboard of the vertices on which settlements can be built
+        self._available_settlement_bits = (1 << self._topology.num_vertices) - 1
+        assert self._available_settlement_bits > 0
 
         # place the robber on the desert hex
         self._find_desert_hex()
         self._robber_hex = self._desert_pos
+        self._position_hash = self._robber_keys[self._topology.hex_ids[self._robber_hex]]
         #self._robber_hex = self._resource_map["desert"][0]
+        self._create_payout_table()
 
     def _find_desert_hex(self) -> None:
         '''Find the desert hex and set self._desert_pos to its position in the form (row, col).'''
@@ -472,28 +797,74 @@ class Game():
                     self._desert_pos = (row_i, col)
                     return
 
+    @property
+    def available_settlement_set(self) -> Set[Vertex]:
+        '''Vertices on which a settlement can still be built.'''
+
+        vertices = self._topology.vertices
+        return set([vertices[vid] for vid in iter_bits(self._available_settlement_bits)])
+
+    def get_available_settlement_bits(self) -> int:
+        '''Bitboard (over vertex IDs) of the vertices on which a settlement can still be built.'''
+
+        return self._available_settlement_bits
+
+    def get_settlement_bits(self, color: str) -> int:
+        '''Bitboard of the vertices with a settlement (not a city) of the given color.'''
+
+        return self._settlement_bits[color]
+
+    def get_city_bits(self, color: str) -> int:
+        return self._city_bits[color]
+
+    def get_road_bits(self, color: str) -> int:
+        '''Bitboard (over edge IDs) of the roads of the given color.'''
+
+        return self._road_bits[color]
+
     def cull_bad_settlement_vertices(self, v: Vertex) -> None:
         '''Given that a settlement was built on vertex v, remove adjacent vertices from the
         set of viable building nodes for settlements. Also remove that vertex.'''
 
-        adjacent_v_set = set(self.get_adjacent_vertices(v))
-        self.available_settlement_set.difference_update(adjacent_v_set)
-        self.available_settlement_set.discard(v)
+        vid = self._topology.vertex_ids[v]
+        culled = self._topology.vertex_closed_masks[vid]
+        self._available_settlement_bits &= ~culled
+        for color in self._colors:
+            self._settlement_frontier_bits[color] &= ~culled
 
     def get_nodes(self) -> Set[Vertex]:
         """Return a collection of all vertices on the board"""
         return self._vertex_set
 
+    def get_seed(self) -> Seed:
+        return self._random.get_seed()
+
+    def get_rng(self, name: str) -> random.Random:
+        '''Return this game's random number generator for the given stream.
+        The game uses "board", "dice", "deck" and "steal", and the AI playing a color uses "ai:<color>".'''
+
+        return self._random.get(name)
+
+    def get_topology(self) -> BoardTopology:
+        '''Return the vertex and edge numbering for this board.'''
+        return self._topology
+
+    def get_vertex_id(self, v: Vertex) -> int:
+        return self._topology.vertex_ids[v]
+
+    def get_edge_id(self, v1: Vertex, v2: Vertex) -> int:
+        return self._topology.edge_ids[(v1, v2)]
+
     def _has_road(self, v1: Vertex, v2: Vertex) -> bool:
         '''True iff the road from v1 to v2 has been built.'''
 
-        return (v1, v2) in self._roads
+        return (self._all_road_bits >> self._topology.edge_ids[(v1, v2)]) & 1 == 1
 
     def _road_connects_same_color_settlement(self, v1: Vertex, v2: Vertex, color: str) -> bool:
         '''True iff this road connects to a settlement of the same color.'''
 
-        return (v1 in self._settlements and self._settlements[v1].color() == color) or \
-            (v2 in self._settlements and self._settlements[v2].color() == color)
+        mask = (1 << self._topology.vertex_ids[v1]) | (1 << self._topology.vertex_ids[v2])
+        return (self._settlement_bits[color] | self._city_bits[color]) & mask != 0
 
     def _road_connects_same_color_road(self, v1: Vertex, v2: Vertex, color: str) -> bool:
         '''True iff this road connects to another road of the same color.'''
@@ -521,97 +892,317 @@ class Game():
             raise RoadPlacementError(f"Cannot place road for player {color}")
 
         p = self.get_player(color)
-        cost = CatanConstants.building_costs["road"]
+        cost = CatanConstants.building_cost_vectors["road"]
 
-        if not initial_placement and not p.can_deduct_resources(cost):
+        if not initial_placement and not p.can_deduct_resource_vector(cost):
             raise RoadPlacementError("cannot afford road")
 
-        self._roads.add((v1, v2))
-
-        self._road_graph.setdefault(color, {})
-        self._road_graph[color].setdefault(v1, [])
-        self._road_graph[color][v1].append(v2)
-        self._road_graph[color].setdefault(v2, [])
-        self._road_graph[color][v2].append(v1)
-
         if not initial_placement:
-            p.deduct_resources(cost)
-        p.add_road(v1, v2)
-        # now figure out whether this makes this road the longest road
-
-        road_length = self.get_road_length(v1, color)
+            p.deduct_resource_vector(cost)
+        road_length = self._build_road(self._topology.edge_ids[(v1, v2)], color)
         assert road_length <= p.get_num_roads()
-        if not initial_placement:
-            logger.debug(f"{color}'s new road has length {road_length}")
-        if ((self._longest_road_player is None and road_length >= 5) or
+        if self._subscribers:
+            self._emit(RoadBuilt(color, v1, v2, initial_placement, road_length))
+        if ((self._longest_road_player is None and road_length >= 5 and road_length > self._longest_road_length) or
                 (self._longest_road_player is not None and road_length > self._longest_road_length)):
-            if self._longest_road_player:
-                self._longest_road_player.remove_special_card("longest road")
-                if self._longest_road_player != p:
-                    logger.info(f"{self._longest_road_player} lost longest road card")
+            previous = self._longest_road_player
+            if previous:
+                previous.remove_special_card("longest road")
             p.add_special_card("longest road")
-            logger.info(f"{color} now has longest road with a road length of {road_length}")
             self._longest_road_length = road_length
             self._longest_road_player = p
-            logger.info(f"{p.get_color()} now has longest road card")
-        if initial_placement:
-            logger.info(f"{color} placed a road from {v1} to {v2}")
+            if self._subscribers:
+                self._emit(LongestRoadChanged(color, previous and previous.get_color(), road_length))
+
+    def _build_road(self, edge_id: int, color: str) -> int:
+        '''Put a road of the given color on the board, without checking or charging for it.
+        Return the length of the longest trail through the road network that the road is part of.'''
+
+        road_bit = 1 << edge_id
+        self._road_bits[color] |= road_bit
+        self._all_road_bits |= road_bit
+        self._position_hash ^= self._road_keys[color][edge_id]
+        self._update_road_frontier_for_road(edge_id, color)
+        self._players[color].add_road(*self._topology.edges[edge_id])
+        return self._add_road_to_components(edge_id, color)
+
+    def _save_road_state(self, color: str) -> RoadState:
+        '''Save everything that building roads of the given color changes, for _restore_road_state.
+        The list of road components is never changed in place, so keeping a reference is enough.'''
+
+        return (
+            self._road_bits[color], self._all_road_bits, self._road_vertex_bits[color], self._road_frontier_bits.copy(),
+            self._settlement_frontier_bits[color], self._players[color].get_num_roads(), self._road_components[color]
+        )
+
+    def _restore_road_state(self, color: str, saved: RoadState) -> None:
+        '''Take back the roads built by the given color since the state was saved with _save_road_state.'''
+
+        (road_bits, all_road_bits, road_vertex_bits, road_frontier_bits,
+            settlement_frontier_bits, num_roads, components) = saved
+        for edge_id in iter_bits(self._road_bits[color] & ~road_bits):
+            self._position_hash ^= self._road_keys[color][edge_id]
+        self._road_bits[color] = road_bits
+        self._all_road_bits = all_road_bits
+        self._road_vertex_bits[color] = road_vertex_bits
+        self._road_frontier_bits = road_frontier_bits
+        self._settlement_frontier_bits[color] = settlement_frontier_bits
+        self._road_components[color] = components
+        player = self._players[color]
+        while player.get_num_roads() > num_roads:
+            player.remove_last_road()
+
+
+    def _get_blocking_bits(self, color: str) -> int:
+        '''Bitboard of vertices with another player's building, which break the roads of the given color.'''
+
+        return self._building_bits & ~(self._settlement_bits[color] | self._city_bits[color])
+
+    def _add_road_to_components(self, edge_id: int, color: str) -> int:
+        '''Merge the new road with the road components it touches and
+        return the longest trail of the resulting component.
+        Other components of this player are untouched and keep their cached length.'''
+
+        topology = self._topology
+        blocked = self._get_blocking_bits(color)
+        a, b = topology.edge_vertices[edge_id]
+
+        # the component (if any) on each side of the new road
+        component_a = None  # type: Optional[Tuple[int, int]]
+        component_b = None  # type: Optional[Tuple[int, int]]
+        components = []
+        for component in self._road_components[color]:
+            touches_a = not (blocked >> a) & 1 and component[0] & topology.vertex_edge_masks[a]
+            touches_b = not (blocked >> b) & 1 and component[0] & topology.vertex_edge_masks[b]
+            if touches_a:
+                component_a = component
+            if touches_b:
+                component_b = component
+            if not (touches_a or touches_b):
+                components.append(component)
+
+        merged = 1 << edge_id
+        if component_a is not None and component_a is component_b:
+            # the road closes a cycle inside one component, so search that component again
+            # the old longest trail is still there, so only longer trails are of interest
+            merged |= component_a[0]
+            length = self._get_longest_trail_through(edge_id, component_a[0], blocked, component_a[1])
         else:
-            logger.info(f"{color} built a road from {v1} to {v2}")
-
-
-    def _get_farthest_vertex(self, v: Vertex, color: str) -> Tuple[Vertex, int]:
-        """
-        """
-        # modified DFS
-        # this helps find the longest path
-        open = deque()  # type: deque
-        open.append(([v], 0))
-
-        farthest_vertex = None
-        farthest_vertex_dist = -1
-
-        while len(open) > 0:
-            path, length = open.pop()
-            v1 = path[-1]
-            if length > farthest_vertex_dist:
-                farthest_vertex_dist = length
-                farthest_vertex = v1
-
-            # at this point, we check if v1 - <anything> represents a broken road
-            # NOTE: v1 was previously a destination, which is totally fine
-            # but now it's a source, so we have to check
-            s = self.get_settlement_at_vertex(v1)
-            if s and s.color() != color:
-                logger.debug("There is a settlement of color %s at %s so cannot transit via this vertex for longest road",
-                              s.color(), v1)
+            # a trail that uses the new road is a trail ending at a, then the road, then a trail starting at b
+            # and those two trails come from different components
+            length = 1
+            for vid, component in [(a, component_a), (b, component_b)]:
+                if component is not None:
+                    merged |= component[0]
+                    length += self._get_longest_trail_from(vid, component[0], blocked)
+            for component in [component_a, component_b]:
+                if component is not None and component[1] > length:
+                    length = component[1]
+
+        components.append((merged, length))
+        self._road_components[color] = components
+        return length
+
+    def _get_longest_trail(self, edge_bits: int, blocked: int, at_least: int = 0) -> int:
+        '''Exact length of the longest trail (a walk that uses no edge twice) over the given edges.
+        A trail may start or end on a blocked vertex but may not pass through it.
+        at_least is a known lower bound on the answer, which speeds up the search.'''
+
+        topology = self._topology
+        total = count_bits(edge_bits)
+
+        # a longest trail can always be extended unless each end is blocked or has all its edges used,
+        # so it starts either on a blocked vertex or on a vertex touching an odd number of these edges
+        starts = 0
+        for edge_id in iter_bits(edge_bits):
+            for vid in topology.edge_vertices[edge_id]:
+                if (blocked >> vid) & 1 or count_bits(edge_bits & topology.vertex_edge_masks[vid]) % 2 == 1:
+                    starts |= 1 << vid
+        if starts == 0:
+            # every vertex has even degree, so the whole component is one closed trail
+            return total
+
+        self._longest_trail = at_least
+        odd = self._get_odd_vertex_bits(edge_bits)
+        for vid in iter_bits(starts):
+            if self._longest_trail == total:
+                # cannot do better than using every edge
+                break
+            self._extend_trail(vid, edge_bits, odd, total, blocked, 0)
+        return self._longest_trail
+
+    def _get_longest_trail_through(self, edge_id: int, edge_bits: int, blocked: int, at_least: int) -> int:
+        '''Length of the longest trail over edge_bits plus the edge edge_id,
+        given that the longest trail over edge_bits alone has length at_least.'''
+
+        a, b = self._topology.edge_vertices[edge_id]
+        self._longest_trail = at_least
+        odd = self._get_odd_vertex_bits(edge_bits)
+        self._extend_trail_through(b, a, edge_bits, odd, count_bits(edge_bits), blocked, 1)
+        return self._longest_trail
+
+    def _extend_trail_through(self, vid: int, other_end: int, free_edges: int, odd: int, num_free: int,
+                              blocked: int, length: int) -> None:
+        '''Like _extend_trail, but the trail also has a second end at other_end from which it can grow
+        once this end is done.'''
+
+        if length > self._longest_trail:
+            self._longest_trail = length
+        # same bound as in _extend_trail, except the rest of the trail is now two pieces with four ends
+        if length + num_free - max(0, (count_bits(odd) - 3) // 2) <= self._longest_trail:
+            return
+        if not (blocked >> other_end) & 1:
+            self._extend_trail(other_end, free_edges, odd, num_free, blocked, length)
+        for edge_bit, other in self._topology.vertex_neighbours[vid]:
+            if not free_edges & edge_bit:
+                continue
+            if (blocked >> other) & 1:
+                if not (blocked >> other_end) & 1:
+                    self._extend_trail(other_end, free_edges & ~edge_bit, odd ^ (1 << vid) ^ (1 << other),
+                                       num_free - 1, blocked, length + 1)
+                elif length + 1 > self._longest_trail:
+                    self._longest_trail = length + 1
+            else:
+                self._extend_trail_through(other, other_end, free_edges & ~edge_bit, odd ^ (1 << vid) ^ (1 << other),
+                                           num_free - 1, blocked, length + 1)
+
+    def _get_longest_trail_from(self, vid: int, edge_bits: int, blocked: int) -> int:
+        '''Exact length of the longest trail over the given edges that starts at vid.'''
+
+        self._longest_trail = 0
+        odd = self._get_odd_vertex_bits(edge_bits)
+        self._extend_trail(vid, edge_bits, odd, count_bits(edge_bits), blocked, 0)
+        return self._longest_trail
+
+    def _get_reachable_edges(self, vid: int, edge_bits: int, blocked: int) -> int:
+        '''Bitboard of the edges in edge_bits that can be walked to from vid without passing a blocked vertex.'''
+
+        neighbours = self._topology.vertex_neighbours
+        reachable = 0
+        stack = [vid]
+        while stack:
+            u = stack.pop()
+            for edge_bit, other in neighbours[u]:
+                if edge_bits & edge_bit and not reachable & edge_bit:
+                    reachable |= edge_bit
+                    if not (blocked >> other) & 1:
+                        stack.append(other)
+        return reachable
+
+    def _cut_roads(self, vid: int, color: str) -> None:
+        '''A building of the given color was just placed on vid.
+        Split the road network of any other player that ran through vid and re-evaluate the longest road.
+        Only the one component of each player that touches vid is searched again.'''
+
+        edge_mask = self._topology.vertex_edge_masks[vid]
+        cut = False
+        for other_color in self._colors:
+            # a road that merely ends at vid is not cut
+            if other_color != color and count_bits(self._road_bits[other_color] & edge_mask) >= 2:
+                self._split_road_component(vid, other_color)
+                cut = True
+        if cut:
+            self._reassign_longest_road()
+
+    def _split_road_component(self, vid: int, color: str) -> None:
+        '''Split the road component of the given color that ran through vid, now that vid is blocked.'''
+
+        topology = self._topology
+        blocked = self._get_blocking_bits(color)
+        edge_mask = topology.vertex_edge_masks[vid]
+        components = []
+        for component in self._road_components[color]:
+            if not component[0] & edge_mask:
+                components.append(component)
+                continue
+            # every piece of the old component contains at least one of the roads at vid
+            assigned = 0
+            for edge_bit, other in topology.vertex_neighbours[vid]:
+                if not component[0] & edge_bit & ~assigned:
+                    continue
+                piece = edge_bit
+                if not (blocked >> other) & 1:
+                    piece |= self._get_reachable_edges(other, component[0], blocked)
+                assigned |= piece
+                components.append((piece, self._get_longest_trail(piece, blocked)))
+        self._road_components[color] = components
+
+    def _reassign_longest_road(self) -> None:
+        '''Re-evaluate who holds the longest road after some road got shorter.
+        The holder keeps the card as long as nobody has a longer road.
+        Otherwise the card goes to the single player with the longest road of at least 5,
+        or is set aside if there is a tie or nobody qualifies.'''
+
+        lengths = {color: self.get_longest_road_length(color) for color in self._colors}
+        max_length = max(lengths.values())
+        holder = self._longest_road_player
+        if holder is not None and lengths[holder.get_color()] == max_length and max_length >= 5:
+            self._longest_road_length = max_length
+            return
+
+        if holder is not None:
+            holder.remove_special_card("longest road")
+        leaders = [color for color in self._colors if lengths[color] == max_length]
+        if max_length >= 5 and len(leaders) == 1:
+            self._longest_road_player = self.get_player(leaders[0])
+            self._longest_road_player.add_special_card("longest road")
+        else:
+            self._longest_road_player = None
+        # while the card is set aside, this is the length that has to be beaten to claim it
+        self._longest_road_length = max_length
+        if self._subscribers and (holder is not None or self._longest_road_player is not None):
+            self._emit(LongestRoadChanged(self._longest_road_player and self._longest_road_player.get_color(),
+                                          holder and holder.get_color(), max_length))
+
+    def _get_odd_vertex_bits(self, edge_bits: int) -> int:
+        '''Bitboard of the vertices touching an odd number of the given edges.'''
+
+        odd = 0
+        for edge_id in iter_bits(edge_bits):
+            odd ^= self._topology.edge_vertex_masks[edge_id]
+        return odd
+
+    def _extend_trail(self, vid: int, free_edges: int, odd: int, num_free: int, blocked: int, length: int) -> None:
+        '''Depth-first search over trails that have walked `length` edges, are now at vid
+        and may continue using only free_edges, of which there are num_free.
+        odd is the bitboard of vertices touching an odd number of free edges.
+        The best length found is kept in self._longest_trail.'''
+
+        if length > self._longest_trail:
+            self._longest_trail = length
+        # the rest of the trail leaves every odd vertex but its two ends with an unused edge,
+        # and one unused edge can only take care of two of them
+        if length + num_free - (count_bits(odd) - 1) // 2 <= self._longest_trail:
+            return
+        for edge_bit, other in self._topology.vertex_neighbours[vid]:
+            if not free_edges & edge_bit:
                 continue
+            if (blocked >> other) & 1:
+                if length + 1 > self._longest_trail:
+                    self._longest_trail = length + 1
+            else:
+                self._extend_trail(other, free_edges & ~edge_bit, odd ^ (1 << vid) ^ (1 << other),
+                                   num_free - 1, blocked, length + 1)
 
-            for v2 in self._road_graph[color][v1]:
-                if v2 not in path:
-                    path2 = path.copy()
-                    path2.append(v2)
-                    open.append((path2, length + 1))
+    def get_longest_road_length(self, color: str) -> int:
+        '''Return the length of the longest road of the given player.'''
 
-        assert farthest_vertex is not None
-        return (farthest_vertex, farthest_vertex_dist)
+        return max([length for _, length in self._road_components[color]], default=0)
 
     def get_road_length(self, starting_vertex: Vertex, color: str) -> int:
-        '''Get the longest portion of this road starting from the given vertex'''
+        '''Get the length of the longest road in the road network that contains the given vertex'''
 
-        far_1, _ = self._get_farthest_vertex(starting_vertex, color)
-        logger.debug("Farthest vertex from %s for color %s is %s", starting_vertex, color, far_1)
-        _, dist_2 = self._get_farthest_vertex(far_1, color)
-        return dist_2
+        edge_mask = self._topology.vertex_edge_masks[self._topology.vertex_ids[starting_vertex]]
+        for component, length in self._road_components[color]:
+            if component & edge_mask:
+                return length
+        return 0
 
     def has_road(self, v1: Vertex, v2: Vertex) -> bool:
         '''Return true iff a road from v1 to v2 has already been built.
         Also allows for a road from v2 to v1'''
 
-        if v1[0] > v2[0]:
-            v1, v2 = v2, v1 # switch places
-
-        return (v1, v2) in self._roads
+        return (self._all_road_bits >> self._topology.edge_ids[(v1, v2)]) & 1 == 1
 
     def __end_initial_placement(self):
         '''Verify that everything has been placed and transition to another state'''
@@ -622,44 +1213,42 @@ class Game():
                 raise Exception(f"{color} has fewer than 2 settlements")
             if p.get_num_roads() < 2:
                 raise Exception(f"{color} has fewer than 2 roads")
-        logger.debug("Initial placement succeeded, moving to new state")
         self._state = GameState.ROLL_DICE
+        if self._subscribers:
+            self._emit(InitialPlacementEnded())
 
     def can_place_settlement(self, v: Vertex) -> bool:
         assert v in self._vertex_set
-        return v in self.available_settlement_set
+        return (self._available_settlement_bits >> self._topology.vertex_ids[v]) & 1 == 1
 
-    def __can_place_road_from_direction(self, v1: Vertex, v2: Vertex, color: str) -> bool:
+    def __can_place_road_from_direction(self, vid1: int, color: str) -> bool:
         '''Only check the direction v1 -> v2'''
 
-        if self._has_road(v1, v2):
-            # logger.debug("HAS ROAD")
-            return False
+        v_bit = 1 << vid1
+        if (self._settlement_bits[color] | self._city_bits[color]) & v_bit:
+            # can always build from your own settlement
+            return True
 
-        player = self.get_player(color)
-        if not (player.has_road_to(v1) or player.has_settlement_at(v1)):
+        if not self._road_bits[color] & self._topology.vertex_edge_masks[vid1]:
             # have to build a road from either a settlement or another road
             # logger.debug("road from nowhere?")
             return False
 
-        if player.has_settlement_at(v1):
-            # can always build from your own settlement
-            return True
-
         # now deal with concerning case - building from road
         # and there is a settlement of another color at v1
-        return not(v1 in self._settlements and self._settlements[v1].color() != color)
+        return not self._building_bits & v_bit
 
     def can_place_road(self, v1: Vertex, v2: Vertex, color: str) -> bool:
         '''Note the rule here:
         https://www.catan.com/faq/6508-roads-may-i-extend-interrupted-continuous-road
         '''
-        v1, v2 = self._normalize_road(v1, v2)
-        if (v1, v2) in self._roads:
+        edge_id = self._topology.edge_ids.get((v1, v2))
+        if edge_id is None or (self._all_road_bits >> edge_id) & 1:
             # logger.debug(f"road exists: {v1} - {v2}")
             return False
-        return self.__can_place_road_from_direction(v1, v2, color) or \
-            self.__can_place_road_from_direction(v2, v1, color)
+        vid1, vid2 = self._topology.edge_vertices[edge_id]
+        return self.__can_place_road_from_direction(vid1, color) or \
+            self.__can_place_road_from_direction(vid2, color)
 
     def add_settlement(self, v: Vertex, color: str, initial_placement: bool = False) -> None:
         '''Add a settlement of the given color to the map.
@@ -670,36 +1259,71 @@ class Game():
            raise SettlementPlacementError(f"vertex {v} is not a valid spot to build a settlement")
 
         p = self.get_player(color)
-        cost = CatanConstants.building_costs["settlement"]
+        cost = CatanConstants.building_cost_vectors["settlement"]
 
         # cannot build settlements in the middle of nowhere
         if not initial_placement and not p.has_road_to(v):
             raise SettlementPlacementError(f"no road for player {color} to vertex {v}")
 
-        if not initial_placement and not p.can_deduct_resources(cost):
+        if not initial_placement and not p.can_deduct_resource_vector(cost):
             raise SettlementPlacementError(f"player {color} cannot afford settlement")
 
         if not initial_placement:
-            p.deduct_resources(cost)
+            p.deduct_resource_vector(cost)
+
+        s = self._build_settlement(self._topology.vertex_ids[v], color)
+        if self._subscribers:
+            self._emit(SettlementBuilt(color, v, initial_placement))
+        if initial_placement and p.get_num_settlements() == 2:
+            resources = self.produce_resources_from_settlement(s)
+            if self._subscribers:
+                self._emit(InitialResourcesProduced(color, resources))
 
+    def _build_settlement(self, vid: int, color: str) -> Settlement:
+        '''Put a settlement of the given color on the board, without checking or charging for it.'''
+
+        v = self._topology.vertices[vid]
         s = Settlement(v, color)
-        self._settlements[v] = s # add to the game board
-        p.add_settlement(v, s) # add to player for record-keeping
+        self._settlements[vid] = s # add to the game board
+        self._settlement_bits[color] |= 1 << vid
+        self._building_bits |= 1 << vid
+        self._position_hash ^= self._settlement_keys[color][vid]
+        self._update_road_frontier_for_settlement(vid, color)
+        self._cut_roads(vid, color)
+        self._add_vertex_yield(vid, color)
+        self._players[color].add_settlement(v, s) # add to player for record-keeping
         self.cull_bad_settlement_vertices(v) # make sure nothing can be built around it
-        if initial_placement:
-            logger.info(f"{color} placed a settlement at {v}")
-        else:
-            logger.info(f"{color} built a settlement at {v}")
-        if initial_placement and p.get_num_settlements() == 2:
-            logger.info("Producing resources from second settlement...")
-            self.produce_resources_from_settlement(s)
+        return s
+
+    def _save_settlement_state(self) -> SettlementState:
+        '''Save what building a settlement changes besides the settlement itself, for _unbuild_settlement.
+        The lists of road components are never changed in place, so copying the dict is enough.'''
+
+        return (self._available_settlement_bits, self._settlement_frontier_bits.copy(),
+                self._road_frontier_bits.copy(), self._road_components.copy())
+
+    def _unbuild_settlement(self, vid: int, color: str, saved: SettlementState) -> None:
+        '''Take back _build_settlement, given the state saved with _save_settlement_state before it.
+        The special cards are left alone, see _set_special_card_holders.'''
+
+        self._settlements[vid] = None
+        self._settlement_bits[color] &= ~(1 << vid)
+        self._building_bits &= ~(1 << vid)
+        self._position_hash ^= self._settlement_keys[color][vid]
+        self._add_vertex_yield(vid, color, -1)
+        # the settlement may have cut the roads of other players
+        (self._available_settlement_bits, self._settlement_frontier_bits,
+         self._road_frontier_bits, self._road_components) = saved
+        self._players[color].remove_settlement(self._topology.vertices[vid])
 
     def get_players_on_hex(self, hex: Hex) -> List[str]:
-        players = set([])
-        for v in hex.get_vertices():
-            if v in self._settlements:
-                players.add(self._settlements[v].color())
-        return list(players)
+        # a list rather than a set, so that the order (and any random choice among them) does not depend on string hashing
+        players = []  # type: List[str]
+        for vid in self._topology.hex_vertices[self._topology.hex_ids[hex.get_coord()]]:
+            s = self._settlements[vid]
+            if s is not None and s.color() not in players:
+                players.append(s.color())
+        return players
 
     def get_players_on_robber_hex(self) -> List[str]:
         '''Return a list of player colors on the hex with the robber.'''
@@ -713,46 +1337,65 @@ class Game():
         Throw exception if cannot build the city'''
 
         p = self.get_player(color)
+        s = self.get_settlement_at_vertex(v)
 
-        if v not in self._settlements:
+        if s is None:
             raise CityUpgradeError(f"{v} not an existing settlement")
 
-        if self._settlements[v].is_city():
+        if s.is_city():
             raise CityUpgradeError(f"settlement located at {v} is already a city, cannot upgrade")
 
-        if self._settlements[v].color() != color:
+        if s.color() != color:
             raise CityUpgradeError(f"settlement is not yours to upgrade!")
 
-        cost = CatanConstants.building_costs["city"]
-        if not p.can_deduct_resources(cost):
+        cost = CatanConstants.building_cost_vectors["city"]
+        if not p.can_deduct_resource_vector(cost):
             raise CityUpgradeError("You cannot afford to upgrade")
 
-        logger.info("%s upgraded a settlement into a city at %s", color, v)
-        self._settlements[v].upgrade()
-        p.deduct_resources(cost)
-        p.upgrade_settlement_to_city(v)
+        p.deduct_resource_vector(cost)
+        self._build_city(self._topology.vertex_ids[v], color)
+        if self._subscribers:
+            self._emit(CityBuilt(color, v))
+
+    def _build_city(self, vid: int, color: str) -> None:
+        '''Upgrade the settlement on vid to a city, without checking or charging for it.'''
+
+        self._settlements[vid].upgrade()
+        self._settlement_bits[color] &= ~(1 << vid)
+        self._city_bits[color] |= 1 << vid
+        self._position_hash ^= self._settlement_keys[color][vid] ^ self._city_keys[color][vid]
+        # a city collects one more of each resource than the settlement did
+        self._add_vertex_yield(vid, color)
+        self._players[color].upgrade_settlement_to_city(self._topology.vertices[vid])
+
+    def _unbuild_city(self, vid: int, color: str) -> None:
+        '''Take back _build_city, turning the city on vid back into a settlement.'''
+
+        self._settlements[vid].downgrade()
+        self._city_bits[color] &= ~(1 << vid)
+        self._settlement_bits[color] |= 1 << vid
+        self._position_hash ^= self._settlement_keys[color][vid] ^ self._city_keys[color][vid]
+        self._add_vertex_yield(vid, color, -1)
+        self._players[color].downgrade_city_to_settlement(self._topology.vertices[vid])
 
     def _create_vertex_set(self) -> None:
         '''Create a set of all vertices (nodes) on the map.
         Used in settlement placement.'''
 
-        self._vertex_set = set(self._vertex_map.keys())
+        self._vertex_set = set(self._topology.vertices)
 
     def get_hexes_for_vertex(self, vertex: Vertex) -> List[Hex]:
-        return self._vertex_map[vertex]
+        return self._vertex_map[self._topology.vertex_ids[vertex]]
 
     def _create_vertex_map(self) -> None:
-        ''' vertex_map maps vertices to list of hexes
+        ''' vertex_map maps vertex IDs to list of hexes
         Used to quickly determine adjacency when settlement is placed. '''
 
-        self._vertex_map = {}
-
-        for row in self._board:
-            for hex in row:
-                for v in hex.get_vertices():
-                    if v not in self._vertex_map:
-                        self._vertex_map[v] = []
-                    self._vertex_map[v].append(hex)
+        self._hex_list = [self._board[row][col] for row, col in self._topology.hex_coords]
+        self._vertex_map = [
+            [self._hex_list[hex_id] for hex_id in hex_ids]
+            for hex_ids in self._topology.vertex_hexes
+        ]
 
     def produce_resources_from_settlement(self, s: Settlement, ignore_robber: bool = False) -> List[str]:
         '''Make the settlement s produce resources.
@@ -761,74 +1404,97 @@ class Game():
 
         l = []
         v = s.vertex()
-        adjacent_hex_list = self._vertex_map[v]
+        adjacent_hex_list = self._vertex_map[self._topology.vertex_ids[v]]
         for hex in adjacent_hex_list:
             if hex != self.get_robber_hex() or ignore_robber:
                 l.append(hex.get_resource())
         self._players[s.color()].add_resources(l)
         return l
 
-    def _produce_resources_from_roll(self, roll: int) -> Dict[str, List[str]]:
-        '''For the given roll, return a map of player color to resources produced.
-        Also distribute those resources to relevant players'''
-        d = {}  # type: Dict[str, List[str]]
-        if roll == 7:
-            return d # no resources ever produced on a seven
-        for hex in self._resource_map[roll]:
-            resource = hex.get_resource()
-            for v in hex.get_vertices():
-                if v in self._settlements:
-                    s = self._settlements[v]
-                    color = s.color()
-                    d.setdefault(color, [])
-                    if s.is_city():
-                        d[color].extend([resource, resource])
-                    else:
-                        d[color].append(resource)
-        # now add these resources to the relevant players
-        for color, r_list in d.items():
-            self._players[color].add_resources(r_list)
-        logger.debug("Produced resources: %s", str(d))
+    def _produce_resources_from_roll(self, roll: int) -> Dict[str, ResourceVector]:
+        '''For the given roll, return a map of player color to the resource vector produced.
+        Also distribute those resources to relevant players.
+        The hex with the robber does not produce.'''
+        d = {}  # type: Dict[str, ResourceVector]
+        # no resources ever produced on a seven, which is never in the table
+        for color, payout in self._payout_table.get(roll, {}).items():
+            self._players[color].add_resource_vector(payout)
+            d[color] = tuple(payout)  # type: ignore
+        if self._subscribers:
+            self._emit(ResourcesProduced(roll, d))
         return d
 
+    def get_payout_table(self) -> Dict[int, Dict[str, ResourceVector]]:
+        '''Return what each roll pays out to each player at the moment, as resource vectors.'''
+
+        return {roll: {color: tuple(payout) for color, payout in payouts.items()}  # type: ignore
+                for roll, payouts in self._payout_table.items()}
+
+    def _create_payout_table(self) -> None:
+        '''Create the empty payout table for the board.
+        Every number on the board gets an entry, so a roll of 7 is the only roll missing from it.'''
+
+        self._hex_yields = [{} for _ in self._hex_list]
+        self._hex_payout_slots = [
+            None if hex.get_resource() == "desert" else (hex.get_number(), RESOURCE_INDEX[hex.get_resource()])
+            for hex in self._hex_list
+        ]
+        self._payout_table = {slot[0]: {} for slot in self._hex_payout_slots if slot is not None}
+
+    def _add_vertex_yield(self, vid: int, color: str, sign: int = 1) -> None:
+        '''The building of the given color on vid now collects one more resource from each adjacent hex.
+        Called once for a new settlement and once more when it is upgraded to a city.
+        With sign=-1, take that back again.'''
+
+        robber_hex_id = self._topology.hex_ids[self._robber_hex]
+        for hex_id in self._topology.vertex_hexes[vid]:
+            hex_yield = self._hex_yields[hex_id]
+            hex_yield[color] = hex_yield.get(color, 0) + sign
+            slot = self._hex_payout_slots[hex_id]
+            if slot is not None and hex_id != robber_hex_id:
+                payouts = self._payout_table[slot[0]]
+                if color not in payouts:
+                    payouts[color] = [0] * len(RESOURCES)
+                payouts[color][slot[1]] += sign
+
+    def _update_hex_payout(self, hex_id: int, sign: int) -> None:
+        '''Add (sign=1) or remove (sign=-1) everything the given hex pays out from the payout table.'''
+
+        slot = self._hex_payout_slots[hex_id]
+        if slot is None:
+            return
+        payouts = self._payout_table[slot[0]]
+        for color, n in self._hex_yields[hex_id].items():
+            if color not in payouts:
+                payouts[color] = [0] * len(RESOURCES)
+            payouts[color][slot[1]] += sign * n
+
     def get_settlement_at_vertex(self, v: Vertex) -> Optional[Settlement]:
         '''If there exists a settlement at this vertex, return the settlement
         Otherwise return null'''
-        return self._settlements.get(v, None)
+        return self._settlements[self._topology.vertex_ids[v]]
 
     def get_adjacent_vertices(self, v: Vertex) -> Set[Vertex]:
         '''Return all vertices adjacent to vertex v.'''
 
-        adjacent_v = set([])
-
-        # first, get tiles that v1 is a member of
-        adjacent_hexes = self._vertex_map[v]
-
-        # adjacent vertices are found only in adjacent tiles
-        for hex in adjacent_hexes:
-            v_set = hex.get_vertices()
-            v_i = v_set.index(v) # we know that this exists
-            # on each tile, adjacent vertices are +1 and -1 index away
-            adjacent_v.update([v_set[v_i - 1], v_set[(v_i + 1) % len(v_set)]])
-
-        return adjacent_v
+        vertices = self._topology.vertices
+        return set([vertices[vid] for vid in self._topology.vertex_vertices[self._topology.vertex_ids[v]]])
 
     def _create_road_set(self) -> None:
         '''Compile a set of tuples, each of which is a valid road.'''
 
         self._road_set = set([])
 
-        for v in self._vertex_set:
-            v_road_set = set([(v, v2) for v2 in self.get_adjacent_vertices(v)])
-            self._road_set.update(v_road_set)
+        for v1, v2 in self._topology.edges:
+            self._road_set.add((v1, v2))
+            self._road_set.add((v2, v1))
 
     def get_roads_from_vertex(self, v: Vertex) -> List[Tuple[Edge, str]]:
         l = []
+        edge_mask = self._topology.vertex_edge_masks[self._topology.vertex_ids[v]]
         for color in self._colors:
-            if v in self._road_graph[color]:
-                for v2 in self._road_graph[color][v]:
-                    road = self._normalize_road(v, v2)
-                    l.append((road, color))
+            for edge_id in iter_bits(self._road_bits[color] & edge_mask):
+                l.append((self._topology.edges[edge_id], color))
         return l
 
     def _get_hex_at_coords(self, row: int, col: int) -> Hex:
@@ -855,18 +1521,14 @@ class Game():
         assert self._state == GameState.ROBBER_PLACEMENT
 
         if not self.can_move_robber(hex_coord):
-            raise Exception("cannot move the robber there")
-        logger.info("%s moved the robber to %d, %d", moving_player, hex_coord[0], hex_coord[1])
+            raise RobberPlacementError(f"Cannot move the robber to {hex_coord}")
         self._set_robber_hex(hex_coord)
+        if self._subscribers:
+            self._emit(RobberMoved(moving_player, hex_coord, steal_from_player))
         if steal_from_player:
-            logger.info("%s stealing from %s", moving_player, steal_from_player)
             r = self._robber_steal(steal_from_player, moving_player)
-            if r:
-                logger.debug("stole %s", r)
-            else:
-                logger.debug("stole nothing")
-        else:
-            logger.info("%s not stealing from anyone", moving_player)
+            if self._subscribers:
+                self._emit(ResourceStolen(moving_player, steal_from_player, r))
         self._state = GameState.GAMEPLAY
 
     def can_move_robber(self, hex_coord: HexCoord) -> bool:
@@ -881,14 +1543,36 @@ class Game():
         Cannot be same as old position.
         '''
         assert hex_coord != self._robber_hex
+        hex_ids = self._topology.hex_ids
+        self._update_hex_payout(hex_ids[self._robber_hex], 1)
+        self._update_hex_payout(hex_ids[hex_coord], -1)
+        self._position_hash ^= self._robber_keys[hex_ids[self._robber_hex]] ^ self._robber_keys[hex_ids[hex_coord]]
         self._robber_hex = hex_coord
 
+    def _save_robber_state(self) -> RobberState:
+        '''Save the state and the robber position, which moving the robber changes, for _restore_robber_state.'''
+
+        return self._state, self._robber_hex
+
+    def _restore_robber_state(self, saved: RobberState) -> None:
+        state, robber_hex = saved
+        self._state = state
+        if robber_hex != self._robber_hex:
+            self._set_robber_hex(robber_hex)
+
+    def discard_resources(self, color: str, resources: List[str]) -> None:
+        '''The player with the given color discards the resources, as when a 7 is rolled.'''
+
+        self._players[color].deduct_resources(resources)
+        if self._subscribers:
+            self._emit(ResourcesDiscarded(color, resources))
+
     def _robber_steal(self, from_player: str, to_player: str) -> Optional[str]:
         '''Robber steals from from_player and gives to to_player.
         Return the resource that was stolen.
         If from_player has no cards, return None.'''
 
-        r = self._players[from_player].steal_resource()
+        r = self._players[from_player].steal_resource(self.get_rng("steal"))
         if r is not None:
            self._players[to_player].add_resources([r])
         return r
@@ -921,6 +1605,56 @@ class Game():
     def get_turn(self) -> int:
         return self._turn
 
+    def get_hash(self) -> int:
+        '''Return a 64-bit Zobrist hash of the state of the game, for example to key a transposition table in a search.
+        Games in the same state have the same hash, whatever moves led there.
+        Only what the players can see is hashed, so the order of the development card deck
+        and the state of the random number generators do not count.
+
+        The board and the players' cards are hashed as they change, so this takes constant time.
+        The turn, the game state and the other small values are mixed in here, when they are read.'''
+
+        h = (self._position_hash ^ self._turn_keys[self._turn] ^ self._state_keys[self._state] ^
+             self._placement_keys[self._placement_count] ^ self._deck_size_keys[len(self._dev_card_deck)])
+        for player in self._players.values():
+            h ^= player.get_hash()
+        if self._player_played_development_card:
+            h ^= self._flag_keys[0]
+        if self._is_game_over:
+            h ^= self._flag_keys[1]
+        road = self._longest_road_player
+        h ^= self._longest_road_keys[road and road.get_color()][self._longest_road_length]
+        army = self._largest_army_player
+        h ^= self._largest_army_keys[army and army.get_color()][self._largest_army_num_knights]
+        return h
+
+    def _create_hash_keys(self) -> None:
+        '''Look up the Zobrist key tables (see zobrist) for this board and these colors. They never change after setup.'''
+
+        topology = self._topology
+        colors = self._colors
+        self._settlement_keys = {
+            color: get_keys(f"settlement/{color}", topology.num_vertices) for color in colors
+        }  # type: Dict[str, List[int]]
+        self._city_keys = {color: get_keys(f"city/{color}", topology.num_vertices) for color in colors}
+        self._road_keys = {color: get_keys(f"road/{color}", topology.num_edges) for color in colors}
+        # by hex ID
+        self._robber_keys = get_keys("robber", len(topology.hex_coords))
+        self._turn_keys = get_keys("turn", len(colors))
+        self._state_keys = dict(zip(GameState, get_keys("state", len(GameState))))
+        self._placement_keys = get_keys("placement", 2 * len(colors) + 1)
+        num_cards = sum(CatanConstants.development_cards.values())
+        self._deck_size_keys = get_keys("deck size", num_cards + 1)
+        # whether the player has played a development card this turn, and whether the game is over
+        self._flag_keys = get_keys("flags", 2)
+        # special card holders (or None if the card is set aside), then the road length or number of knights
+        self._longest_road_keys = {
+            color: get_keys(f"longest road/{color}", topology.num_edges + 1) for color in colors + [None]
+        }  # type: Dict[Optional[str], List[int]]
+        self._largest_army_keys = {
+            color: get_keys(f"largest army/{color}", num_cards + 1) for color in colors + [None]
+        }  # type: Dict[Optional[str], List[int]]
+
     def get_colors(self) -> List[str]:
         return self._colors.copy()
 
@@ -931,3 +1665,228 @@ class Game():
             if player.get_num_vp() >= 10:
                 return color
         raise Exception("no player has won")
+
+    def apply_action(self, color: str, action: Action) -> None:
+        '''Make the given move, as returned by legal_actions, for the player with the given color.'''
+
+        kind, args = action
+        initial_placement = self._state == GameState.INITIAL_PLACEMENT
+        if kind == ActionType.SETTLEMENT:
+            self.add_settlement(args[0], color, initial_placement=initial_placement)
+        elif kind == ActionType.ROAD:
+            self.add_road(args[0], args[1], color, initial_placement=initial_placement)
+        elif kind == ActionType.CITY:
+            self.add_city(args[0], color)
+        elif kind == ActionType.BUY_DEVELOPMENT_CARD:
+            self.buy_development_card(color)
+        elif kind == ActionType.PLAY_DEVELOPMENT_CARD:
+            self.play_development_card(color, args[0], get_development_card_params(args))
+        elif kind == ActionType.MOVE_ROBBER:
+            self.move_robber(args[0], args[1], color)
+        elif kind == ActionType.ROLL_DICE:
+            self.roll_dice()
+        elif kind == ActionType.END_TURN:
+            self.next_turn()
+        else:
+            raise NotImplementedError(kind)
+
+    def legal_actions(self, color: str) -> Iterator[Action]:
+        '''Generate every legal move for the player with the given color in the current state.
+        Only the player whose turn it is has any legal moves.'''
+
+        if color != self.get_current_color() or self._is_game_over:
+            return
+        topology = self._topology
+        if self._state == GameState.INITIAL_PLACEMENT:
+            placement = self._get_initial_placement_step(color)
+            if placement == ActionType.SETTLEMENT:
+                for vid in iter_bits(self._available_settlement_bits):
+                    yield Action(ActionType.SETTLEMENT, (topology.vertices[vid],))
+            elif placement == ActionType.ROAD:
+                for edge_id in iter_bits(self._get_initial_road_bits(color)):
+                    yield Action(ActionType.ROAD, topology.edges[edge_id])
+            else:
+                yield Action(ActionType.END_TURN)
+        elif self._state == GameState.ROLL_DICE:
+            yield Action(ActionType.ROLL_DICE)
+        elif self._state == GameState.ROBBER_PLACEMENT:
+            for move in self._get_robber_moves(color):
+                yield Action(ActionType.MOVE_ROBBER, move)
+        else:
+            yield Action(ActionType.END_TURN)
+            player = self._players[color]
+            costs = CatanConstants.building_cost_vectors
+            if player.can_deduct_resource_vector(costs["settlement"]):
+                for vid in iter_bits(self.get_settlement_frontier_bits(color)):
+                    yield Action(ActionType.SETTLEMENT, (topology.vertices[vid],))
+            if player.can_deduct_resource_vector(costs["city"]):
+                for vid in iter_bits(self._settlement_bits[color]):
+                    yield Action(ActionType.CITY, (topology.vertices[vid],))
+            if player.can_deduct_resource_vector(costs["road"]):
+                for edge_id in iter_bits(self.get_road_frontier_bits(color)):
+                    yield Action(ActionType.ROAD, topology.edges[edge_id])
+            if player.can_deduct_resource_vector(CatanConstants.development_card_cost_vector) and self._dev_card_deck:
+                yield Action(ActionType.BUY_DEVELOPMENT_CARD)
+            if not self._player_played_development_card:
+                cards = player.get_development_cards()
+                if cards.get("knight", 0) > 0:
+                    for move in self._get_robber_moves(color):
+                        yield Action(ActionType.PLAY_DEVELOPMENT_CARD, ("knight",) + move)
+                if cards.get("monopoly", 0) > 0:
+                    for r in RESOURCES:
+                        yield Action(ActionType.PLAY_DEVELOPMENT_CARD, ("monopoly", r))
+                if cards.get("year of plenty", 0) > 0:
+                    for i, r1 in enumerate(RESOURCES):
+                        for r2 in RESOURCES[i:]:
+                            yield Action(ActionType.PLAY_DEVELOPMENT_CARD, ("year of plenty", r1, r2))
+                if cards.get("road building", 0) > 0:
+                    for edge_id, second_bits in self._get_road_building_pairs(color):
+                        for second_id in iter_bits(second_bits):
+                            yield Action(ActionType.PLAY_DEVELOPMENT_CARD,
+                                         ("road building", topology.edges[edge_id], topology.edges[second_id]))
+
+    def count_legal_actions(self, color: str) -> int:
+        '''Return the number of moves legal_actions would generate, without generating them.'''
+
+        if color != self.get_current_color() or self._is_game_over:
+            return 0
+        if self._state == GameState.INITIAL_PLACEMENT:
+            placement = self._get_initial_placement_step(color)
+            if placement == ActionType.SETTLEMENT:
+                return count_bits(self._available_settlement_bits)
+            elif placement == ActionType.ROAD:
+                return count_bits(self._get_initial_road_bits(color))
+            return 1
+        elif self._state == GameState.ROLL_DICE:
+            return 1
+        elif self._state == GameState.ROBBER_PLACEMENT:
+            return self._count_robber_moves(color)
+
+        n = 1
+        player = self._players[color]
+        costs = CatanConstants.building_cost_vectors
+        if player.can_deduct_resource_vector(costs["settlement"]):
+            n += count_bits(self.get_settlement_frontier_bits(color))
+        if player.can_deduct_resource_vector(costs["city"]):
+            n += count_bits(self._settlement_bits[color])
+        if player.can_deduct_resource_vector(costs["road"]):
+            n += count_bits(self.get_road_frontier_bits(color))
+        if player.can_deduct_resource_vector(CatanConstants.development_card_cost_vector) and self._dev_card_deck:
+            n += 1
+        if not self._player_played_development_card:
+            cards = player.get_development_cards()
+            if cards.get("knight", 0) > 0:
+                n += self._count_robber_moves(color)
+            if cards.get("monopoly", 0) > 0:
+                n += len(RESOURCES)
+            if cards.get("year of plenty", 0) > 0:
+                n += len(RESOURCES) * (len(RESOURCES) + 1) // 2
+            if cards.get("road building", 0) > 0:
+                n += sum(count_bits(second_bits) for _, second_bits in self._get_road_building_pairs(color))
+        return n
+
+    def _get_initial_placement_step(self, color: str) -> ActionType:
+        '''During initial placement, return what the current player has to do next:
+        place a settlement, place a road next to that settlement, or end their turn.'''
+
+        player = self._players[color]
+        num_settlements = player.get_num_settlements()
+        if num_settlements < (1 if self._placement_count < len(self._colors) else 2):
+            return ActionType.SETTLEMENT
+        elif player.get_num_roads() < num_settlements:
+            return ActionType.ROAD
+        return ActionType.END_TURN
+
+    def _get_initial_road_bits(self, color: str) -> int:
+        '''Bitboard of the edges next to the settlement the player placed last.'''
+
+        vid = self._topology.vertex_ids[self._players[color].get_settlement(-1).vertex()]
+        return self._topology.vertex_edge_masks[vid] & ~self._all_road_bits
+
+    def get_road_frontier_bits(self, color: str) -> int:
+        '''Bitboard of the edges on which the player may build a road, ignoring the cost.'''
+
+        return self._road_frontier_bits[color]
+
+    def _is_road_source(self, vid: int, color: str) -> bool:
+        '''True iff the player may build a road starting at vid:
+        the player has a building there, or has a road there and nobody else has built there.'''
+
+        if (self._settlement_bits[color] | self._city_bits[color]) >> vid & 1:
+            return True
+        return bool(self._road_vertex_bits[color] >> vid & 1) and not self._building_bits >> vid & 1
+
+    def _update_road_frontier_for_road(self, edge_id: int, color: str) -> None:
+        '''Update the road frontiers after a road of the given color was built on edge_id.'''
+
+        topology = self._topology
+        road_bit = 1 << edge_id
+        for other_color in self._colors:
+            self._road_frontier_bits[other_color] &= ~road_bit
+        self._road_vertex_bits[color] |= topology.edge_vertex_masks[edge_id]
+        self._settlement_frontier_bits[color] |= topology.edge_vertex_masks[edge_id] & self._available_settlement_bits
+        for vid in topology.edge_vertices[edge_id]:
+            if self._is_road_source(vid, color):
+                self._road_frontier_bits[color] |= topology.vertex_edge_masks[vid] & ~self._all_road_bits
+
+    def _update_road_frontier_for_settlement(self, vid: int, color: str) -> None:
+        '''Update the road frontiers after a settlement of the given color was built on vid.'''
+
+        topology = self._topology
+        free_edges = topology.vertex_edge_masks[vid] & ~self._all_road_bits
+        self._road_frontier_bits[color] |= free_edges
+        for other_color in self._colors:
+            if other_color == color or not self._road_vertex_bits[other_color] >> vid & 1:
+                continue
+            # the other player can no longer build on from vid,
+            # so an edge at vid stays in their frontier only if they can reach it from its far end
+            for edge_bit, other in topology.vertex_neighbours[vid]:
+                if free_edges & edge_bit and not self._is_road_source(other, other_color):
+                    self._road_frontier_bits[other_color] &= ~edge_bit
+
+    def get_settlement_frontier_bits(self, color: str) -> int:
+        '''Bitboard of the vertices on which the player may build a settlement after initial placement,
+        ignoring the cost.'''
+
+        return self._settlement_frontier_bits[color]
+
+    def _get_road_building_pairs(self, color: str) -> Iterator[Tuple[int, int]]:
+        '''For the road building card, generate (first edge ID, bitboard of the possible second edges).
+        Each unordered pair of roads comes up once.'''
+
+        topology = self._topology
+        frontier = self.get_road_frontier_bits(color)
+        blocked = self._get_blocking_bits(color)
+        for edge_id in iter_bits(frontier):
+            # the first road opens up the edges at its ends, unless another player has built there
+            second = frontier
+            for vid in topology.edge_vertices[edge_id]:
+                if not (blocked >> vid) & 1:
+                    second |= topology.vertex_edge_masks[vid]
+            second &= ~self._all_road_bits & ~(1 << edge_id)
+            # when both roads could have gone first, only count the pair once
+            second &= ~(frontier & ((1 << edge_id) - 1))
+            yield edge_id, second
+
+    def _get_robber_moves(self, color: str) -> Iterator[Tuple[HexCoord, Optional[str]]]:
+        '''Generate (hex coord, color to steal from) for every place the player could move the robber.
+        When there is nobody to steal from on a hex, the color is None.'''
+
+        topology = self._topology
+        for hex_id, coord in enumerate(topology.hex_coords):
+            if coord == self._robber_hex:
+                continue
+            hex_mask = topology.hex_vertex_masks[hex_id]
+            has_target = False
+            for other in self._colors:
+                if other != color and (self._settlement_bits[other] | self._city_bits[other]) & hex_mask:
+                    has_target = True
+                    yield coord, other
+            if not has_target:
+                yield coord, None
+
+    def _count_robber_moves(self, color: str) -> int:
+        n = 0
+        for _ in self._get_robber_moves(color):
+            n += 1
+        return n
@@ -0,0 +1,181 @@
+'''
+Events that a Game emits as it is played, one type per kind of event.
+Subscribe to a game with Game.subscribe to receive them, for example to log, record or display the game.
+Games only create events while somebody is subscribed, so games nobody listens to pay nothing for them.
+
+log_event writes the events to the log, the way the game engine always has.
+'''
+
+from catan_types import Vertex, HexCoord, ResourceVector
+from typing import Callable, Dict, List, NamedTuple, Optional
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class DiceRolled(NamedTuple):
+	color: str
+	roll: int
+
+
+class ResourcesProduced(NamedTuple):
+	'''What a roll paid out, as a resource vector for each player that got anything.'''
+	roll: int
+	payouts: Dict[str, ResourceVector]
+
+
+class InitialResourcesProduced(NamedTuple):
+	'''The resources a player gets for their second settlement during initial placement.'''
+	color: str
+	resources: List[str]
+
+
+class SettlementBuilt(NamedTuple):
+	color: str
+	vertex: Vertex
+	initial_placement: bool
+
+
+class CityBuilt(NamedTuple):
+	color: str
+	vertex: Vertex
+
+
+class RoadBuilt(NamedTuple):
+	color: str
+	v1: Vertex
+	v2: Vertex
+	initial_placement: bool
+	# longest trail through the road network the road is part of
+	road_length: int
+
+
+class RobberMoved(NamedTuple):
+	color: str
+	hex_coord: HexCoord
+	# the player to steal from, if any
+	target_color: Optional[str]
+
+
+class ResourceStolen(NamedTuple):
+	color: str
+	from_color: str
+	# None if the other player had nothing to steal
+	resource: Optional[str]
+
+
+class ResourcesDiscarded(NamedTuple):
+	color: str
+	resources: List[str]
+
+
+class DevelopmentCardBought(NamedTuple):
+	color: str
+	card: str
+
+
+class DevelopmentCardPlayed(NamedTuple):
+	color: str
+	card: str
+	params: dict
+
+
+class MonopolyTaken(NamedTuple):
+	color: str
+	from_color: str
+	resource: str
+	num_taken: int
+
+
+class LongestRoadChanged(NamedTuple):
+	'''The longest road card changed hands, or its holder made their road longer.'''
+	# None if the card is set aside
+	color: Optional[str]
+	previous_color: Optional[str]
+	length: int
+
+
+class LargestArmyChanged(NamedTuple):
+	'''The largest army card changed hands, or its holder played another knight.'''
+	color: str
+	previous_color: Optional[str]
+	num_knights: int
+
+
+class TurnEnded(NamedTuple):
+	color: str
+	next_color: str
+
+
+class InitialPlacementEnded(NamedTuple):
+	pass
+
+
+class GameOver(NamedTuple):
+	winner: str
+	vp: int
+
+
+# called with every event of the games it subscribed to
+Subscriber = Callable[[NamedTuple], None]
+
+
+def log_event(event: NamedTuple) -> None:
+	'''Subscriber that writes events to the log.'''
+
+	if isinstance(event, DiceRolled):
+		logger.debug("%s rolled %d", event.color, event.roll)
+	elif isinstance(event, ResourcesProduced):
+		logger.debug("Produced resources: %s", event.payouts)
+	elif isinstance(event, InitialResourcesProduced):
+		logger.info("Producing resources from second settlement...")
+	elif isinstance(event, SettlementBuilt):
+		logger.info("%s %s a settlement at %s", event.color, "placed" if event.initial_placement else "built", event.vertex)
+	elif isinstance(event, CityBuilt):
+		logger.info("%s upgraded a settlement into a city at %s", event.color, event.vertex)
+	elif isinstance(event, RoadBuilt):
+		if not event.initial_placement:
+			logger.debug("%s's new road has length %d", event.color, event.road_length)
+		logger.info("%s %s a road from %s to %s", event.color, "placed" if event.initial_placement else "built",
+			event.v1, event.v2)
+	elif isinstance(event, RobberMoved):
+		logger.info("%s moved the robber to %d, %d", event.color, event.hex_coord[0], event.hex_coord[1])
+		if event.target_color:
+			logger.info("%s stealing from %s", event.color, event.target_color)
+		else:
+			logger.info("%s not stealing from anyone", event.color)
+	elif isinstance(event, ResourceStolen):
+		if event.resource:
+			logger.debug("stole %s", event.resource)
+		else:
+			logger.debug("stole nothing")
+	elif isinstance(event, ResourcesDiscarded):
+		logger.debug("%s discarded %s", event.color, event.resources)
+	elif isinstance(event, DevelopmentCardBought):
+		logger.info("%s bought a development card", event.color)
+		logger.debug("development card was %s", event.card)
+	elif isinstance(event, DevelopmentCardPlayed):
+		logger.info("%s played development card %s", event.color, event.card)
+	elif isinstance(event, MonopolyTaken):
+		if event.num_taken > 0:
+			logger.debug("Took %d x %s from %s using monopoly", event.num_taken, event.resource, event.from_color)
+		else:
+			logger.debug("Tried to take %s from %s using monopoly but that player does not have any",
+				event.resource, event.from_color)
+	elif isinstance(event, LongestRoadChanged):
+		if event.previous_color is not None and event.previous_color != event.color:
+			logger.info("%s lost longest road card", event.previous_color)
+		if event.color is not None:
+			logger.info("%s now has longest road card with a road length of %d", event.color, event.length)
+	elif isinstance(event, LargestArmyChanged):
+		if event.previous_color is not None and event.previous_color != event.color:
+			logger.info("%s lost largest army", event.previous_color)
+		if event.previous_color != event.color:
+			logger.info("%s now has the largest army (%d)", event.color, event.num_knights)
+	elif isinstance(event, TurnEnded):
+		logger.debug("%s ended their turn, next turn = %s", event.color, event.next_color)
+	elif isinstance(event, InitialPlacementEnded):
+		logger.debug("Initial placement succeeded, moving to new state")
+	elif isinstance(event, GameOver):
+		logger.warning("Game is over - %s has %d points", event.winner, event.vp)
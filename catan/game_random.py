@@ -0,0 +1,62 @@
+'''
+Random number generators for a single game.
+'''
+
+import random
+from typing import Dict, Optional, Union
+
+
+Seed = Union[int, str]
+
+
+class GameRandom:
+	'''One random number generator per part of the game that needs randomness, all derived from one seed.
+	Each part gets its own stream, so a game is reproducible from its seed
+	and using one stream more or less (say, an AI that thinks differently) leaves the dice and the deck unchanged.
+	Streams are made the first time they are asked for.
+
+	The streams used by the game are "board", "dice", "deck" and "steal",
+	and the AI playing each color gets its own stream, "ai:<color>".'''
+
+	def __init__(self, seed: Optional[Seed] = None) -> None:
+		'''Without a seed, one is drawn from the random module, so random.seed() still decides the game.'''
+
+		if seed is None:
+			seed = random.getrandbits(64)
+		self._seed = seed
+		self._streams = {}  # type: Dict[str, random.Random]
+		# states of streams copied from another GameRandom by clone(), made into streams the first time they are asked for
+		self._states = {}  # type: Dict[str, tuple]
+
+	def get_seed(self) -> Seed:
+		return self._seed
+
+	def get(self, name: str) -> random.Random:
+		'''Return the generator for the given stream.'''
+
+		stream = self._streams.get(name)
+		if stream is None:
+			state = self._states.pop(name, None)
+			if state is None:
+				# string seeds are hashed with SHA-512, so every stream is independent and the same in every process
+				stream = random.Random(f"{self._seed}/{name}")
+			else:
+				# skip seeding from the OS, setstate replaces the whole state anyway
+				stream = random.Random.__new__(random.Random)
+				stream.setstate(state)
+			self._streams[name] = stream
+		return stream
+
+	def clone(self) -> 'GameRandom':
+		'''Return a copy whose streams continue from where these streams are now, independently of them.
+		Only the states of the streams are saved here. The copy makes them into streams when they are first used,
+		since most clones (say, in a search) only ever use a few of them.'''
+
+		other = GameRandom.__new__(GameRandom)
+		other._seed = self._seed
+		other._streams = {}
+		# states are immutable tuples, so the ones that were never made into streams can be shared
+		other._states = self._states.copy()
+		for name, stream in self._streams.items():
+			other._states[name] = stream.getstate()
+		return other
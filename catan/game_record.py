@@ -0,0 +1,340 @@
+'''
+Record games as an append-only stream of events, and replay them to any turn.
+Used to look into games from long batch runs after the fact, without playing them again.
+
+GameRecorder subscribes to a game and appends each event (see game_events) to a binary file as it happens,
+including the outcomes of chance: the dice, stolen cards and bought development cards.
+Every few turns it also writes a checkpoint of the whole game (see serialization).
+GameReplay rebuilds the game at the start of any turn by loading the last checkpoint before it
+and applying the events after it directly to the game state, without checking any rules.
+Turns are counted in calls to Game.next_turn since recording started, including those of initial placement.
+
+All integers are little-endian. Layout (version 1):
+	header: magic "CTR", version
+	records: kind, payload length (uint16), payload
+		kind 0 is a checkpoint: turn (uint16), then the game encoded by serialization.dump_game
+		kind i > 0 is an event of type EVENT_TYPES[i - 1]: one byte per field,
+		colors, vertices, edges, hexes, resources and cards as their index, 255 for None
+A record that was cut off at the end of the file, for example by a crash, is ignored.
+'''
+
+import struct
+from game_engine import Game, GameState
+from game_events import (DiceRolled, ResourcesProduced, InitialResourcesProduced, SettlementBuilt, CityBuilt,
+	RoadBuilt, RobberMoved, ResourceStolen, ResourcesDiscarded, DevelopmentCardBought, DevelopmentCardPlayed,
+	MonopolyTaken, LongestRoadChanged, LargestArmyChanged, TurnEnded, InitialPlacementEnded, GameOver)
+from serialization import dump_game, load_game, SerializationError
+from catan_gen import CatanConstants, RESOURCES
+from catan_types import Lattice
+from topology import BoardTopology
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+
+MAGIC = b"CTR"
+FORMAT_VERSION = 1
+RECORD_SUFFIX = ".ctr"
+DEFAULT_CHECKPOINT_INTERVAL = 20
+
+# the event types in the order of their record kinds, starting at 1
+EVENT_TYPES = [
+	DiceRolled, ResourcesProduced, InitialResourcesProduced, SettlementBuilt, CityBuilt, RoadBuilt,
+	RobberMoved, ResourceStolen, ResourcesDiscarded, DevelopmentCardBought, DevelopmentCardPlayed,
+	MonopolyTaken, LongestRoadChanged, LargestArmyChanged, TurnEnded, InitialPlacementEnded, GameOver,
+]
+
+_HEADER = struct.Struct("<3sB")
+_RECORD = struct.Struct("<BH")
+_CHECKPOINT_TURN = struct.Struct("<H")
+_CHECKPOINT = 0
+_KINDS = {event_type: i + 1 for i, event_type in enumerate(EVENT_TYPES)}
+_NONE = 255
+_DEV_CARDS = list(CatanConstants.development_cards.keys())
+
+
+class _EventCodec:
+	'''Turns events into bytes and back, for the colors and board of one game.'''
+
+	def __init__(self, colors: List[str], topology: BoardTopology) -> None:
+		self._colors = colors
+		self._topology = topology
+
+	def encode(self, event: NamedTuple) -> bytes:
+		colors = self._colors
+		topology = self._topology
+		c = lambda color: _NONE if color is None else colors.index(color)
+		if isinstance(event, DiceRolled):
+			values = [c(event.color), event.roll]
+		elif isinstance(event, ResourcesProduced):
+			values = [event.roll]
+			for color, payout in event.payouts.items():
+				values.append(c(color))
+				values.extend(payout)
+		elif isinstance(event, (InitialResourcesProduced, ResourcesDiscarded)):
+			values = [c(event.color)] + [RESOURCES.index(r) for r in event.resources]
+		elif isinstance(event, SettlementBuilt):
+			values = [c(event.color), topology.vertex_ids[event.vertex], event.initial_placement]
+		elif isinstance(event, CityBuilt):
+			values = [c(event.color), topology.vertex_ids[event.vertex]]
+		elif isinstance(event, RoadBuilt):
+			values = [c(event.color), topology.edge_ids[(event.v1, event.v2)], event.initial_placement, event.road_length]
+		elif isinstance(event, RobberMoved):
+			values = [c(event.color), topology.hex_ids[event.hex_coord], c(event.target_color)]
+		elif isinstance(event, ResourceStolen):
+			values = [c(event.color), c(event.from_color), _NONE if event.resource is None else RESOURCES.index(event.resource)]
+		elif isinstance(event, DevelopmentCardBought):
+			values = [c(event.color), _DEV_CARDS.index(event.card)]
+		elif isinstance(event, DevelopmentCardPlayed):
+			values = [c(event.color), _DEV_CARDS.index(event.card)] + self._encode_params(event.card, event.params)
+		elif isinstance(event, MonopolyTaken):
+			values = [c(event.color), c(event.from_color), RESOURCES.index(event.resource), event.num_taken]
+		elif isinstance(event, LongestRoadChanged):
+			values = [c(event.color), c(event.previous_color), event.length]
+		elif isinstance(event, LargestArmyChanged):
+			values = [c(event.color), c(event.previous_color), event.num_knights]
+		elif isinstance(event, TurnEnded):
+			values = [c(event.color), c(event.next_color)]
+		elif isinstance(event, InitialPlacementEnded):
+			values = []
+		elif isinstance(event, GameOver):
+			values = [c(event.winner), event.vp]
+		else:
+			raise NotImplementedError(type(event))
+		return bytes(values)
+
+	def _encode_params(self, card: str, params: dict) -> List[int]:
+		if card == "knight":
+			target_color = params["target_color"]
+			return [self._topology.hex_ids[params["target_hex"]],
+				_NONE if target_color is None else self._colors.index(target_color)]
+		elif card == "monopoly":
+			return [RESOURCES.index(params["target_resource"])]
+		elif card == "year of plenty":
+			return [RESOURCES.index(r) for r in params["resources"]]
+		elif card == "road building":
+			return [self._topology.edge_ids[road] for road in params["roads"]]
+		else:
+			raise NotImplementedError(card)
+
+	def decode(self, kind: int, payload: bytes) -> NamedTuple:
+		colors = self._colors
+		topology = self._topology
+		c = lambda i: None if i == _NONE else colors[i]
+		event_type = EVENT_TYPES[kind - 1]
+		p = payload
+		if event_type == DiceRolled:
+			return DiceRolled(c(p[0]), p[1])
+		elif event_type == ResourcesProduced:
+			n = len(RESOURCES) + 1
+			return ResourcesProduced(p[0], {c(p[i]): tuple(p[i + 1:i + n]) for i in range(1, len(p), n)})
+		elif event_type in (InitialResourcesProduced, ResourcesDiscarded):
+			return event_type(c(p[0]), [RESOURCES[i] for i in p[1:]])
+		elif event_type == SettlementBuilt:
+			return SettlementBuilt(c(p[0]), topology.vertices[p[1]], bool(p[2]))
+		elif event_type == CityBuilt:
+			return CityBuilt(c(p[0]), topology.vertices[p[1]])
+		elif event_type == RoadBuilt:
+			v1, v2 = topology.edges[p[1]]
+			return RoadBuilt(c(p[0]), v1, v2, bool(p[2]), p[3])
+		elif event_type == RobberMoved:
+			return RobberMoved(c(p[0]), topology.hex_coords[p[1]], c(p[2]))
+		elif event_type == ResourceStolen:
+			return ResourceStolen(c(p[0]), c(p[1]), None if p[2] == _NONE else RESOURCES[p[2]])
+		elif event_type == DevelopmentCardBought:
+			return DevelopmentCardBought(c(p[0]), _DEV_CARDS[p[1]])
+		elif event_type == DevelopmentCardPlayed:
+			card = _DEV_CARDS[p[1]]
+			return DevelopmentCardPlayed(c(p[0]), card, self._decode_params(card, p[2:]))
+		elif event_type == MonopolyTaken:
+			return MonopolyTaken(c(p[0]), c(p[1]), RESOURCES[p[2]], p[3])
+		elif event_type in (LongestRoadChanged, LargestArmyChanged):
+			return event_type(c(p[0]), c(p[1]), p[2])
+		elif event_type == TurnEnded:
+			return TurnEnded(c(p[0]), c(p[1]))
+		elif event_type == InitialPlacementEnded:
+			return InitialPlacementEnded()
+		else:
+			return GameOver(c(p[0]), p[1])
+
+	def _decode_params(self, card: str, p: bytes) -> dict:
+		if card == "knight":
+			return {"target_hex": self._topology.hex_coords[p[0]], "target_color": None if p[1] == _NONE else self._colors[p[1]]}
+		elif card == "monopoly":
+			return {"target_resource": RESOURCES[p[0]]}
+		elif card == "year of plenty":
+			return {"resources": [RESOURCES[i] for i in p]}
+		else:
+			return {"roads": [self._topology.edges[edge_id] for edge_id in p]}
+
+
+class GameRecorder:
+	'''Subscriber that appends the events of a game to a binary file as they happen:
+
+		game.subscribe(GameRecorder(game, open(path, "wb")))
+
+	Recording is best started right after the game is created. The file is flushed at every checkpoint.'''
+
+	def __init__(self, game: Game, out: BinaryIO, checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL) -> None:
+		self._game = game
+		self._out = out
+		self._checkpoint_interval = checkpoint_interval
+		self._codec = _EventCodec(game.get_colors(), game.get_topology())
+		self._num_turns = 0
+		out.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+		self._write_checkpoint()
+
+	def __call__(self, event: NamedTuple) -> None:
+		payload = self._codec.encode(event)
+		self._out.write(_RECORD.pack(_KINDS[type(event)], len(payload)) + payload)
+		if isinstance(event, TurnEnded):
+			self._num_turns += 1
+			if self._num_turns % self._checkpoint_interval == 0:
+				self._write_checkpoint()
+
+	def _write_checkpoint(self) -> None:
+		payload = _CHECKPOINT_TURN.pack(self._num_turns) + dump_game(self._game)
+		self._out.write(_RECORD.pack(_CHECKPOINT, len(payload)) + payload)
+		self._out.flush()
+
+
+class GameReplay:
+	'''A recorded game, which can be rebuilt at the start of any of its turns.'''
+
+	def __init__(self, data: bytes, hex_coord_lattice: Optional[Lattice] = None) -> None:
+		'''Read a game recorded by GameRecorder. The lattice is as in serialization.load_game.
+		Raise SerializationError if the data is not in a format this version can read.'''
+
+		self._data = data
+		self._lattice = hex_coord_lattice
+		try:
+			magic, version = _HEADER.unpack_from(data, 0)
+		except struct.error:
+			raise SerializationError("not a recorded game")
+		if magic != MAGIC:
+			raise SerializationError("not a recorded game")
+		if version != FORMAT_VERSION:
+			raise SerializationError(f"cannot read record format version {version}")
+
+		# (kind, offset of the payload, payload length) of every record
+		self._records = []  # type: List[Tuple[int, int, int]]
+		# for each turn, the index of its first record
+		self._turn_starts = [0]
+		# (turn, record index) of every checkpoint
+		self._checkpoints = []  # type: List[Tuple[int, int]]
+		turn_ended = _KINDS[TurnEnded]
+		offset = _HEADER.size
+		while offset + _RECORD.size <= len(data):
+			kind, length = _RECORD.unpack_from(data, offset)
+			offset += _RECORD.size
+			if offset + length > len(data):
+				break
+			if kind == _CHECKPOINT:
+				self._checkpoints.append((_CHECKPOINT_TURN.unpack_from(data, offset)[0], len(self._records)))
+			elif kind > len(EVENT_TYPES):
+				raise SerializationError(f"unknown record kind {kind}")
+			self._records.append((kind, offset, length))
+			offset += length
+			if kind == turn_ended:
+				self._turn_starts.append(len(self._records))
+		if not self._checkpoints or self._checkpoints[0][0] != 0:
+			raise SerializationError("recorded game does not start with a checkpoint")
+		first = self._load_checkpoint(0)
+		self._codec = _EventCodec(first.get_colors(), first.get_topology())
+
+	@staticmethod
+	def read(path: str, hex_coord_lattice: Optional[Lattice] = None) -> 'GameReplay':
+		with open(path, "rb") as f:
+			return GameReplay(f.read(), hex_coord_lattice)
+
+	def get_num_turns(self) -> int:
+		'''Return the number of turns that were ended while recording.'''
+
+		return len(self._turn_starts) - 1
+
+	def get_game(self, turn: Optional[int] = None) -> Game:
+		'''Rebuild the game as it was at the start of the given turn, or at the end of the record.
+		The game gets fresh random number generators, as in serialization.load_game.'''
+
+		if turn is None:
+			end = len(self._records)
+			turn = self.get_num_turns()
+		elif 0 <= turn <= self.get_num_turns():
+			end = self._turn_starts[turn]
+		else:
+			raise ValueError(f"turn {turn} is not in the record (0 to {self.get_num_turns()})")
+
+		i = max([record_i for checkpoint_turn, record_i in self._checkpoints if checkpoint_turn <= turn])
+		game = self._load_checkpoint(i)
+		for kind, offset, length in self._records[i + 1:end]:
+			if kind != _CHECKPOINT:
+				apply_event(game, self._codec.decode(kind, self._data[offset:offset + length]))
+		return game
+
+	def iter_events(self, turn: int = 0) -> Iterator[NamedTuple]:
+		'''Yield the recorded events from the start of the given turn on.'''
+
+		for kind, offset, length in self._records[self._turn_starts[turn]:]:
+			if kind != _CHECKPOINT:
+				yield self._codec.decode(kind, self._data[offset:offset + length])
+
+	def _load_checkpoint(self, record_i: int) -> Game:
+		kind, offset, length = self._records[record_i]
+		return load_game(self._data[offset + _CHECKPOINT_TURN.size:offset + length], self._lattice)
+
+
+def apply_event(game: Game, event: NamedTuple) -> None:
+	'''Change the game state the way the event did when it happened, without checking that it is allowed.'''
+
+	topology = game.get_topology()
+	if isinstance(event, DiceRolled):
+		game._state = GameState.ROBBER_PLACEMENT if event.roll == 7 else GameState.GAMEPLAY
+	elif isinstance(event, ResourcesProduced):
+		for color, payout in event.payouts.items():
+			game.get_player(color).add_resource_vector(payout)
+	elif isinstance(event, InitialResourcesProduced):
+		game.get_player(event.color).add_resources(event.resources)
+	elif isinstance(event, SettlementBuilt):
+		if not event.initial_placement:
+			game.get_player(event.color).deduct_resource_vector(CatanConstants.building_cost_vectors["settlement"])
+		game._build_settlement(topology.vertex_ids[event.vertex], event.color)
+	elif isinstance(event, CityBuilt):
+		game.get_player(event.color).deduct_resource_vector(CatanConstants.building_cost_vectors["city"])
+		game._build_city(topology.vertex_ids[event.vertex], event.color)
+	elif isinstance(event, RoadBuilt):
+		if not event.initial_placement:
+			game.get_player(event.color).deduct_resource_vector(CatanConstants.building_cost_vectors["road"])
+		game._build_road(topology.edge_ids[(event.v1, event.v2)], event.color)
+	elif isinstance(event, RobberMoved):
+		if event.hex_coord != game.get_robber_hex_coords():
+			game._set_robber_hex(event.hex_coord)
+		game._state = GameState.GAMEPLAY
+	elif isinstance(event, ResourceStolen):
+		if event.resource is not None:
+			game.get_player(event.from_color).deduct_resources([event.resource])
+			game.get_player(event.color).add_resources([event.resource])
+	elif isinstance(event, ResourcesDiscarded):
+		game.get_player(event.color).deduct_resources(event.resources)
+	elif isinstance(event, DevelopmentCardBought):
+		player = game.get_player(event.color)
+		player.deduct_resource_vector(CatanConstants.development_card_cost_vector)
+		game._dev_card_deck.pop()
+		player.add_development_card(event.card)
+	elif isinstance(event, DevelopmentCardPlayed):
+		# what the card does comes in the events after this one, except for year of plenty
+		game.get_player(event.color).play_development_card(event.card)
+		game._player_played_development_card = True
+		if event.card == "year of plenty":
+			game.get_player(event.color).add_resources(event.params["resources"])
+	elif isinstance(event, MonopolyTaken):
+		game.get_player(event.from_color).take_all_of_resource(event.resource)
+		game.get_player(event.color).add_resource(event.resource, event.num_taken)
+	elif isinstance(event, LongestRoadChanged):
+		army = game._largest_army_player
+		game._set_special_card_holders(event.color, event.length,
+			army and army.get_color(), game._largest_army_num_knights)
+	elif isinstance(event, LargestArmyChanged):
+		road = game._longest_road_player
+		game._set_special_card_holders(road and road.get_color(), game._longest_road_length,
+			event.color, event.num_knights)
+	elif isinstance(event, TurnEnded):
+		game.next_turn()
+	# InitialPlacementEnded and GameOver come from the turn ending, which next_turn takes care of
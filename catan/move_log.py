@@ -0,0 +1,176 @@
+'''
+Apply moves to a Game and undo them again in place.
+Meant for tree search, where cloning the whole game for every node is too slow.
+'''
+
+from game_engine import (Game, GameState, Action, ActionType, get_development_card_params,
+	DevelopmentCardError, RobberPlacementError, RoadPlacementError)
+from catan_types import Vertex, HexCoord, ResourceVector
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MoveLog:
+	'''Applies moves to a game and remembers how to undo each of them.
+	Each move records only the part of the game state it can change, before changing it,
+	with the save and restore methods that Game has next to the code of each move.
+	While a log is in use, every move on the game must go through it, otherwise undo() restores the wrong state.
+	Undoing a move does not rewind the random number generator.'''
+
+	def __init__(self, game: Game) -> None:
+		self._game = game
+		# stack of (undo function, state saved before the move)
+		self._undo_stack = []  # type: List[Tuple[Callable[[Any], None], Any]]
+
+	def __len__(self) -> int:
+		'''Return the number of moves that can be undone.'''
+
+		return len(self._undo_stack)
+
+	def get_game(self) -> Game:
+		return self._game
+
+	def undo(self) -> None:
+		'''Undo the most recent move.'''
+
+		undo, saved = self._undo_stack.pop()
+		undo(saved)
+
+	def undo_all(self) -> None:
+		'''Undo every move in the log.'''
+
+		while self._undo_stack:
+			self.undo()
+
+	def apply_action(self, color: str, action: Action) -> None:
+		'''Make the given move, as returned by Game.legal_actions, so that it can be undone.'''
+
+		kind, args = action
+		initial_placement = self._game.get_state() == GameState.INITIAL_PLACEMENT
+		if kind == ActionType.SETTLEMENT:
+			self.add_settlement(args[0], color, initial_placement=initial_placement)
+		elif kind == ActionType.ROAD:
+			self.add_road(args[0], args[1], color, initial_placement=initial_placement)
+		elif kind == ActionType.CITY:
+			self.add_city(args[0], color)
+		elif kind == ActionType.BUY_DEVELOPMENT_CARD:
+			self.buy_development_card(color)
+		elif kind == ActionType.PLAY_DEVELOPMENT_CARD:
+			self.play_development_card(color, args[0], get_development_card_params(args))
+		elif kind == ActionType.MOVE_ROBBER:
+			self.move_robber(args[0], args[1], color)
+		elif kind == ActionType.ROLL_DICE:
+			self.roll_dice()
+		elif kind == ActionType.END_TURN:
+			self.next_turn()
+		else:
+			raise NotImplementedError(kind)
+
+	def add_settlement(self, v: Vertex, color: str, initial_placement: bool = False) -> None:
+		game = self._game
+		saved = (
+			v, color, self._save_hand(color), game._save_settlement_state(), game._get_special_card_holders()
+		)
+		game.add_settlement(v, color, initial_placement=initial_placement)
+		self._undo_stack.append((self._undo_settlement, saved))
+
+	def add_city(self, v: Vertex, color: str) -> None:
+		saved = (v, color, self._save_hand(color))
+		self._game.add_city(v, color)
+		self._undo_stack.append((self._undo_city, saved))
+
+	def add_road(self, v1: Vertex, v2: Vertex, color: str, initial_placement: bool = False) -> None:
+		game = self._game
+		saved = (color, self._save_hand(color), game._save_road_state(color), game._get_special_card_holders())
+		game.add_road(v1, v2, color, initial_placement=initial_placement)
+		self._undo_stack.append((self._undo_road, saved))
+
+	def buy_development_card(self, color: str) -> str:
+		hand = self._save_hand(color)
+		card = self._game.buy_development_card(color)
+		self._undo_stack.append((self._undo_development_card_purchase, (color, hand, card)))
+		return card
+
+	def play_development_card(self, color: str, card: str, params: dict) -> None:
+		'''Play the card. If playing it fails part of the way through, the game is put back as it was.'''
+
+		game = self._game
+		saved = (
+			color, game._save_development_card_state(color), self._save_hands(),
+			game._save_road_state(color), game._get_special_card_holders()
+		)
+		try:
+			game.play_development_card(color, card, params)
+		except (DevelopmentCardError, RobberPlacementError, RoadPlacementError):
+			self._undo_development_card(saved)
+			raise
+		self._undo_stack.append((self._undo_development_card, saved))
+
+	def move_robber(self, hex_coord: HexCoord, steal_from_player: Optional[str], moving_player: str) -> None:
+		game = self._game
+		saved = (game._save_robber_state(), self._save_hands())
+		game.move_robber(hex_coord, steal_from_player, moving_player)
+		self._undo_stack.append((self._undo_robber, saved))
+
+	def roll_dice(self) -> int:
+		saved = (self._game._save_turn_state(), self._save_hands())
+		roll = self._game.roll_dice()
+		self._undo_stack.append((self._undo_roll, saved))
+		return roll
+
+	def next_turn(self) -> None:
+		saved = self._game._save_turn_state()
+		self._game.next_turn()
+		self._undo_stack.append((self._game._restore_turn_state, saved))
+
+	def _save_hand(self, color: str) -> ResourceVector:
+		return self._game.get_player(color).get_resource_vector()
+
+	def _save_hands(self) -> Dict[str, ResourceVector]:
+		return {color: self._save_hand(color) for color in self._game.get_colors()}
+
+	def _restore_hands(self, hands: Dict[str, ResourceVector]) -> None:
+		for color, hand in hands.items():
+			self._game.get_player(color).set_resource_vector(hand)
+
+	def _undo_settlement(self, saved: tuple) -> None:
+		game = self._game
+		v, color, hand, settlement_state, special_cards = saved
+		game._unbuild_settlement(game.get_vertex_id(v), color, settlement_state)
+		game._set_special_card_holders(*special_cards)
+		game.get_player(color).set_resource_vector(hand)
+
+	def _undo_city(self, saved: tuple) -> None:
+		game = self._game
+		v, color, hand = saved
+		game._unbuild_city(game.get_vertex_id(v), color)
+		game.get_player(color).set_resource_vector(hand)
+
+	def _undo_road(self, saved: tuple) -> None:
+		game = self._game
+		color, hand, roads, special_cards = saved
+		game._restore_road_state(color, roads)
+		game._set_special_card_holders(*special_cards)
+		game.get_player(color).set_resource_vector(hand)
+
+	def _undo_development_card_purchase(self, saved: tuple) -> None:
+		color, hand, card = saved
+		self._game._unbuy_development_card(color, card)
+		self._game.get_player(color).set_resource_vector(hand)
+
+	def _undo_development_card(self, saved: tuple) -> None:
+		game = self._game
+		color, card_state, hands, roads, special_cards = saved
+		game._restore_development_card_state(color, card_state)
+		self._restore_hands(hands)
+		game._restore_road_state(color, roads)
+		game._set_special_card_holders(*special_cards)
+
+	def _undo_robber(self, saved: tuple) -> None:
+		robber_state, hands = saved
+		self._game._restore_robber_state(robber_state)
+		self._restore_hands(hands)
+
+	def _undo_roll(self, saved: tuple) -> None:
+		turn_state, hands = saved
+		self._game._restore_turn_state(turn_state)
+		self._restore_hands(hands)
@@ -1,8 +1,9 @@
 import random
 from settlement import Settlement
-from typing import List, Dict, Optional, Set
-from catan_types import Vertex, Edge
-from catan_gen import CatanConstants
+from typing import List, Dict, Optional, FrozenSet, Set
+from catan_types import Vertex, Edge, ResourceVector
+from catan_gen import CatanConstants, RESOURCES, RESOURCE_INDEX, to_resource_vector
+from zobrist import get_key, get_keys
 import logging
 
 
@@ -19,7 +20,8 @@ class Player:
 	def __init__(self, color) -> None:
 		'''Create a new Catan player.'''
 
-		self._resources = {}  # type: Dict[str, int]
+		# number of each resource in the player's hand, ordered like RESOURCES
+		self._resources = [0] * len(RESOURCES)  # type: List[int]
 		self._color = color
 
 		# this variable stores the *permanent* victory points
@@ -30,41 +32,71 @@ class Player:
 		self._settlements = {}  # type: Dict[Vertex, Settlement]
 		self._settlement_order = []  # type: List[Settlement]
 		self._roads = []  # type: List[Edge]
+		# number of this player's roads that end at each vertex
+		self._road_vertex_counts = {}  # type: Dict[Vertex, int]
+		# cached view of the keys of _road_vertex_counts, reset whenever a road is added
+		self._road_vertices = None  # type: Optional[FrozenSet[Vertex]]
 
 		self._dev_cards = {}  #type: Dict[str, int]
 		self._special_cards = set([])  # type: Set[str]
 		self._num_knights_played = 0
 
+		# Zobrist keys of the hand, by resource index and then number of cards
+		self._hand_keys = [get_keys(f"hand/{color}/{r}", 0) for r in RESOURCES]
+		# Zobrist hashes (see get_hash) of the hand and of the development cards, kept up to date as they change
+		self._hand_hash = self._get_hand_hash()
+		self._dev_card_hash = self._get_dev_card_hash()
+
+	def clone(self, settlements: Dict[Vertex, Settlement]) -> 'Player':
+		'''Return an independent copy of this player.
+		settlements maps each of this player's settlement vertices to the copy of the settlement to use.'''
+
+		p = Player.__new__(Player)
+		p.__dict__.update(self.__dict__)
+		p._resources = self._resources.copy()
+		p._settlements = {v: settlements[v] for v in self._settlements}
+		p._settlement_order = [settlements[s.vertex()] for s in self._settlement_order]
+		p._roads = self._roads.copy()
+		p._road_vertex_counts = self._road_vertex_counts.copy()
+		# _road_vertices is immutable, so it can be shared
+		p._dev_cards = self._dev_cards.copy()
+		p._special_cards = self._special_cards.copy()
+		return p
+
 	def get_color(self) -> str:
 		return self._color
 
 	def get_num_resources(self) -> int:
 		'''Return the number of resources in the player's hand.'''
 
-		return sum([v for v in self._resources.values()])
+		return sum(self._resources)
 
 	def can_deduct_resources(self, r_list: List[str]) -> bool:
 		'''Return True iff can deduct all resources in r_list from this player.'''
 
-		for r in set(r_list):
-			num = r_list.count(r)
-			if r not in self._resources or self._resources[r] < num:
-				# logger.warning("Cannot deduct resources %s from player %s", r_list, self._color)
-				return False
-		return True
+		return self.can_deduct_resource_vector(to_resource_vector(r_list))
+
+	def can_deduct_resource_vector(self, cost: ResourceVector) -> bool:
+		'''Return True iff can deduct the resource vector cost from this player.'''
+
+		hand = self._resources
+		return (hand[0] >= cost[0] and hand[1] >= cost[1] and hand[2] >= cost[2] and
+			hand[3] >= cost[3] and hand[4] >= cost[4])
 
 	def deduct_resources(self, r_list: List[str]) -> None:
 		'''Deduct the given resources from the player. If not possible, throw Exception.'''
 
-		if not self.can_deduct_resources(r_list):
+		self.deduct_resource_vector(to_resource_vector(r_list))
+
+	def deduct_resource_vector(self, cost: ResourceVector) -> None:
+		'''Deduct the resource vector cost from the player. If not possible, throw Exception.'''
+
+		if not self.can_deduct_resource_vector(cost):
 			raise Exception("Cannot deduct these resources")
 
-		for r in r_list:
-			self._resources[r] -= 1
-			# if this part is disabled, will have zeroes as values for some resources
-			# if enabled, then some resources will not be in the dict
-			#if self._resources[r] == 0:
-			#	del(self._resources[r])
+		for i, n in enumerate(cost):
+			if n:
+				self._change_resource(i, -n)
 
 	def add_settlement(self, v: Vertex, s: Settlement) -> None:
 		'''Add the given settlement to the list of settlements for this player.'''
@@ -73,6 +105,14 @@ class Player:
 		self._settlement_order.append(s)
 		self._vp += 1
 
+	def remove_settlement(self, v: Vertex) -> None:
+		'''Remove the most recently added settlement, which is at v. Only used to undo a move.'''
+
+		s = self._settlement_order.pop()
+		assert s.vertex() == v
+		del self._settlements[v]
+		self._vp -= 1
+
 	def get_settlement(self, i: int) -> Settlement:
 		return self._settlement_order[i]
 
@@ -83,10 +123,35 @@ class Player:
 		assert self.has_settlement_at(vertex)
 		self._vp += 1
 
+	def downgrade_city_to_settlement(self, vertex: Vertex) -> None:
+		'''Take back upgrade_settlement_to_city. Only used to undo a move.'''
+
+		assert self.has_settlement_at(vertex)
+		self._vp -= 1
+
 	def add_road(self, v1: Vertex, v2: Vertex) -> None:
 		'''Add a road.'''
 
 		self._roads.append((v1, v2))
+		for v in (v1, v2):
+			self._road_vertex_counts[v] = self._road_vertex_counts.get(v, 0) + 1
+		self._road_vertices = None
+
+	def remove_last_road(self) -> Edge:
+		'''Remove the most recently added road and return it. Only used to undo a move.'''
+
+		road = self._roads.pop()
+		for v in road:
+			self._road_vertex_counts[v] -= 1
+			if self._road_vertex_counts[v] == 0:
+				del self._road_vertex_counts[v]
+		self._road_vertices = None
+		return road
+
+	def get_roads(self) -> List[Edge]:
+		'''Return the roads of this player in the order they were built.'''
+
+		return self._roads
 
 	def get_num_roads(self) -> int:
 		'''Return number of roads built by this player.'''
@@ -113,18 +178,90 @@ class Player:
 
 		for r in resource_list:
 			assert r != "desert"
-			if r not in self._resources:
-				self._resources[r] = 0
-			self._resources[r] += 1
-
-		#self._resources.extend(resource_list)
+			self._change_resource(RESOURCE_INDEX[r], 1)
+
+	def set_resource_vector(self, resources: ResourceVector) -> None:
+		'''Replace the player's hand with the resources in the given vector.'''
+
+		self._resources[:] = resources
+		self._hand_hash = self._get_hand_hash()
+
+	def add_resource(self, resource: str, n: int = 1) -> None:
+		'''Collect n of a single resource.'''
+
+		self._change_resource(RESOURCE_INDEX[resource], n)
+
+	def add_resource_vector(self, resources: ResourceVector) -> None:
+		'''Collect the resources in the given vector.
+		This is how dice rolls pay out, so _change_resource is written out here.'''
+
+		hand = self._resources
+		h = self._hand_hash
+		for i, n in enumerate(resources):
+			if n:
+				count = hand[i]
+				keys = self._hand_keys[i]
+				if count + n >= len(keys):
+					keys = self._grow_hand_keys(i, count + n)
+				h ^= keys[count] ^ keys[count + n]
+				hand[i] = count + n
+		self._hand_hash = h
+
+	def take_all_of_resource(self, resource: str) -> int:
+		'''Remove every card of the given resource from the hand and return how many there were.'''
+
+		i = RESOURCE_INDEX[resource]
+		n = self._resources[i]
+		self._change_resource(i, -n)
+		return n
+
+	def _change_resource(self, i: int, n: int) -> None:
+		'''Add n (possibly negative) to the count of the resource with index i and update the hash.'''
+
+		count = self._resources[i]
+		keys = self._hand_keys[i]
+		if count + n >= len(keys):
+			keys = self._grow_hand_keys(i, count + n)
+		self._hand_hash ^= keys[count] ^ keys[count + n]
+		self._resources[i] = count + n
+
+	def _grow_hand_keys(self, i: int, count: int) -> List[int]:
+		'''Make the table of hand keys of the resource with index i cover count cards, and return it.'''
+
+		# twice as many as needed, so that a growing hand does not remake the table on every card
+		keys = get_keys(f"hand/{self._color}/{RESOURCES[i]}", 2 * (count + 1))
+		self._hand_keys[i] = keys
+		return keys
+
+	def _get_hand_hash(self) -> int:
+		h = 0
+		for r, count in zip(RESOURCES, self._resources):
+			h ^= get_key(f"hand/{self._color}/{r}", count)
+		return h
+
+	def _get_dev_card_hash(self) -> int:
+		'''Unlike the hand, this is recomputed whenever the development cards change, which is rare.'''
+
+		h = get_key(f"knights/{self._color}", self._num_knights_played)
+		for card, count in self._dev_cards.items():
+			if count:
+				h ^= get_key(f"dev card/{self._color}/{card}", count)
+		return h
+
+	def get_hash(self) -> int:
+		'''Return the Zobrist hash of the player's hand, development cards and knights played.
+		The other things a player holds are hashed by the game, see Game.get_hash.'''
+
+		return self._hand_hash ^ self._dev_card_hash
 
 	def get_printable_hand(self) -> str:
 		'''Return resources in the player's hand.'''
 
 		s = ""
 
-		for r, n in self._resources.items():
+		for r, n in zip(RESOURCES, self._resources):
+			if n == 0:
+				continue
 			s += "{} x {}, ".format(r, n)
 
 		return s[:-2]
@@ -141,8 +278,8 @@ class Player:
 
 		return s[:-2]
 
-	def steal_resource(self) -> Optional[str]:
-		'''Return (discard) random resource.
+	def steal_resource(self, rng: random.Random) -> Optional[str]:
+		'''Return (discard) random resource, chosen with the given random number generator.
 		If the player has no resources, return None.'''
 
 		num_resources = self.get_num_resources()
@@ -150,15 +287,15 @@ class Player:
 		if num_resources == 0:
 			return None
 
-		n = random.randint(0, num_resources - 1)
+		n = rng.randint(0, num_resources - 1)
 		i = 0
 
-		for k in self._resources:
-			if i <= n and n < i + self._resources[k]:
-				self._resources[k] -= 1
-				return k
+		for k, count in enumerate(self._resources):
+			if i <= n and n < i + count:
+				self._change_resource(k, -1)
+				return RESOURCES[k]
 			else:
-				i += self._resources[k]
+				i += count
 		raise Exception("Fail")
 
 	def get_num_vp(self) -> int:
@@ -183,16 +320,32 @@ class Player:
 
 		self._dev_cards.setdefault(card, 0)
 		self._dev_cards[card] += 1
+		self._dev_card_hash = self._get_dev_card_hash()
 		if card == "VP":
 			self._vp += 1
 			self._dev_card_vp += 1
 
+	def remove_development_card(self, card: str) -> None:
+		'''Take back add_development_card. Only used to undo a move.'''
+
+		self._dev_cards[card] -= 1
+		self._dev_card_hash = self._get_dev_card_hash()
+		if card == "VP":
+			self._vp -= 1
+			self._dev_card_vp -= 1
+
 	def get_development_card_vp(self) -> int:
 		return self._dev_card_vp
 
 	def get_num_knights_played(self) -> int:
 		return self._num_knights_played
 
+	def set_num_knights_played(self, num_knights_played: int) -> None:
+		'''Set the number of knights this player has played, say when loading a saved game.'''
+
+		self._num_knights_played = num_knights_played
+		self._dev_card_hash = self._get_dev_card_hash()
+
 	def play_development_card(self, card: str) -> None:
 		'''Remove the given development card from development cards
 		This development card is not a VP card.
@@ -204,6 +357,15 @@ class Player:
 		self._dev_cards[card] -= 1
 		if card == "knight":
 			self._num_knights_played += 1
+		self._dev_card_hash = self._get_dev_card_hash()
+
+	def restore_played_development_cards(self, dev_cards: Dict[str, int], num_knights_played: int) -> None:
+		'''Put back the development cards in hand and the number of knights played,
+		as saved from get_development_cards() and get_num_knights_played(). Only used to undo a move.'''
+
+		self._dev_cards = dev_cards.copy()
+		self._num_knights_played = num_knights_played
+		self._dev_card_hash = self._get_dev_card_hash()
 
 	def get_development_cards(self) -> Dict[str, int]:
 		'''Return development cards for this player.'''
@@ -211,23 +373,31 @@ class Player:
 		return self._dev_cards
 
 	def get_hand(self) -> Dict[str, int]:
-		'''Return the resources in the player's hand (copy).'''
-		return self._resources.copy()
+		'''Return the resources in the player's hand (copy).
+		Every resource is present, even if the player has none of it.'''
+		return dict(zip(RESOURCES, self._resources))
+
+	def get_resource_vector(self) -> ResourceVector:
+		'''Return the resources in the player's hand as a vector ordered like RESOURCES.'''
+		return tuple(self._resources)  # type: ignore
 
 	def has_road_to(self, v: Vertex) -> bool:
 		'''Return True iff this player has a road leading to vertex v.'''
 
-		for road in self._roads:
-			if v in road:
-				return True
-		return False
+		return v in self._road_vertex_counts
+
+	def get_num_roads_at(self, v: Vertex) -> int:
+		'''Return the number of this player's roads that end at vertex v.'''
+
+		return self._road_vertex_counts.get(v, 0)
 
 	def has_settlement_at(self, v: Vertex) -> bool:
 		return v in self._settlements
 
-	def get_road_vertices(self) -> Set[Vertex]:
-		vs = set([])
-		for road in self._roads:
-			vs.add(road[0])
-			vs.add(road[1])
-		return vs
+	def get_road_vertices(self) -> FrozenSet[Vertex]:
+		'''Return the vertices at the ends of this player's roads.
+		The same immutable set is returned until the next road is added.'''
+
+		if self._road_vertices is None:
+			self._road_vertices = frozenset(self._road_vertex_counts)
+		return self._road_vertices
@@ -0,0 +1,149 @@
+'''
+Exact production statistics of every vertex and every pair of vertices on a board, computed with NumPy.
+Meant for placement AIs and board analysis, which need the same statistics over and over.
+
+All arrays are indexed by vertex ID (and hex ID) from the board topology,
+and resources are in the order of catan_gen.RESOURCES.
+Income is counted in resource cards per dice roll, for a settlement; a city gets twice as much.
+'''
+
+from game_engine import Game
+from catan_gen import CatanConstants, RESOURCES, RESOURCE_INDEX, PORT_TYPES
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+
+# dice totals that produce resources, and the chance of each
+ROLLS = np.array([roll for roll in range(2, 13) if roll != 7])
+ROLL_PROBABILITIES = (6 - np.abs(7 - ROLLS)) / 36.0
+_ROLL_INDEX = {roll: i for i, roll in enumerate(ROLLS.tolist())}
+
+# pair income, pair variance and pair dry probability, as in ProductionModel
+PairStatistics = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class ProductionModel:
+	'''Production statistics of a board.
+	The board does not change during a game, so this only has to be made once per game.
+	Buildings are not taken into account: the numbers are what a settlement on each vertex would get.
+
+	Arrays (V vertices, H hexes, R = 10 producing rolls, 5 resources):
+		hex_production: (H, R, 5) cards a settlement on the hex gets on each roll
+		vertex_hexes: (V, H) 1 where the vertex is a corner of the hex
+		vertex_production: (V, R, 5) cards a settlement on the vertex gets on each roll
+		vertex_income: (V, 5) expected cards of each resource per roll
+		vertex_dots: (V,) total token dots around the vertex, 36 times the expected cards per roll
+		blocked_vertex_income: (H, V, 5) expected cards per roll with the robber on each hex
+		pair_income: (V, V, 5) expected cards per roll of settlements on both vertices
+		pair_variance: (V, V) variance of the total number of cards per roll of settlements on both vertices
+		pair_dry_probability: (V, V) chance that a roll gives settlements on both vertices nothing
+		port_access: (V, 6) whether the vertex is on a port of each type in catan_gen.PORT_TYPES
+		pair_port_access: (V, V, 6) whether either vertex is on a port of each type
+	The diagonal of the pair arrays is a single settlement on the vertex.
+	The pair arrays are made when first used, since they take far longer than the rest.
+	The pair statistics with the robber on a hex come from get_pair_income, get_pair_variance
+	and get_pair_dry_probability, which work them out for one robber hex at a time.'''
+
+	def __init__(self, game: Game) -> None:
+		topology = game.get_topology()
+		layout = game.get_board_layout()
+		num_hexes = len(layout.resources)
+		num_vertices = topology.num_vertices
+
+		# filled in with one assignment each, since indexing NumPy arrays one element at a time is slow
+		producing = [(hex_id, _ROLL_INDEX[CatanConstants.token_map[token]], RESOURCE_INDEX[resource])
+			for hex_id, (resource, token) in enumerate(zip(layout.resources, layout.tokens)) if token is not None]
+		self.hex_production = np.zeros((num_hexes, len(ROLLS), len(RESOURCES)))
+		self.hex_production[tuple(zip(*producing))] = 1
+
+		corners = [(vid, hex_id) for vid, hex_ids in enumerate(topology.vertex_hexes) for hex_id in hex_ids]
+		self.vertex_hexes = np.zeros((num_vertices, num_hexes))
+		self.vertex_hexes[tuple(zip(*corners))] = 1
+
+		self.vertex_production = np.einsum("vh,hrk->vrk", self.vertex_hexes, self.hex_production)
+		self.vertex_income = np.einsum("r,vrk->vk", ROLL_PROBABILITIES, self.vertex_production)
+		self.vertex_dots = np.rint(self.vertex_income.sum(axis=1) * 36).astype(int)
+
+		hex_income = np.einsum("r,hrk->hk", ROLL_PROBABILITIES, self.hex_production)
+		self.blocked_vertex_income = (
+			self.vertex_income[np.newaxis, :, :] - self.vertex_hexes.T[:, :, np.newaxis] * hex_income[:, np.newaxis, :]
+		)
+
+		# pair statistics without the robber (under None) and with the robber on each hex, by hex ID,
+		# made when first asked for
+		self._pair_statistics = {}  # type: Dict[Optional[int], PairStatistics]
+
+		self.port_access = np.zeros((num_vertices, len(PORT_TYPES)), dtype=bool)
+		for location, port_type in zip(game.get_port_locations(), layout.ports):
+			for v in location:
+				self.port_access[topology.vertex_ids[v], PORT_TYPES.index(port_type)] = True
+		self._pair_port_access = None  # type: Optional[np.ndarray]
+
+	@property
+	def pair_income(self) -> np.ndarray:
+		return self._get_pair_statistics(None)[0]
+
+	@property
+	def pair_variance(self) -> np.ndarray:
+		return self._get_pair_statistics(None)[1]
+
+	@property
+	def pair_dry_probability(self) -> np.ndarray:
+		return self._get_pair_statistics(None)[2]
+
+	@property
+	def pair_port_access(self) -> np.ndarray:
+		if self._pair_port_access is None:
+			self._pair_port_access = self.port_access[:, np.newaxis] | self.port_access[np.newaxis, :]
+		return self._pair_port_access
+
+	def get_vertex_income(self, robber_hex_id: Optional[int] = None) -> np.ndarray:
+		'''Expected cards of each resource per roll for every vertex, with the robber on the given hex (if any).'''
+
+		if robber_hex_id is None:
+			return self.vertex_income
+		return self.blocked_vertex_income[robber_hex_id]
+
+	def get_pair_income(self, robber_hex_id: Optional[int] = None) -> np.ndarray:
+		'''Like pair_income, with the robber on the given hex (if any).'''
+
+		return self._get_pair_statistics(robber_hex_id)[0]
+
+	def get_pair_variance(self, robber_hex_id: Optional[int] = None) -> np.ndarray:
+		'''Like pair_variance, with the robber on the given hex (if any).'''
+
+		return self._get_pair_statistics(robber_hex_id)[1]
+
+	def get_pair_dry_probability(self, robber_hex_id: Optional[int] = None) -> np.ndarray:
+		'''Like pair_dry_probability, with the robber on the given hex (if any).'''
+
+		return self._get_pair_statistics(robber_hex_id)[2]
+
+	def _get_pair_statistics(self, robber_hex_id: Optional[int]) -> PairStatistics:
+		statistics = self._pair_statistics.get(robber_hex_id)
+		if statistics is None:
+			if robber_hex_id is None:
+				production = self.vertex_production
+			else:
+				production = self.vertex_production - (
+					self.vertex_hexes[:, robber_hex_id, np.newaxis, np.newaxis] * self.hex_production[robber_hex_id]
+				)
+			statistics = _get_pair_statistics(production)
+			self._pair_statistics[robber_hex_id] = statistics
+		return statistics
+
+
+def _get_pair_statistics(vertex_production: np.ndarray) -> PairStatistics:
+	'''Work out the pair statistics from the (V, R, 5) cards a settlement on each vertex gets on each roll.'''
+
+	# a pair of settlements, as the sum of the two; the diagonal is a single settlement rather than two
+	pair_production = vertex_production[:, np.newaxis] + vertex_production[np.newaxis, :]
+	diagonal = np.arange(len(vertex_production))
+	pair_production[diagonal, diagonal] = vertex_production
+	pair_income = np.einsum("r,uvrk->uvk", ROLL_PROBABILITIES, pair_production)
+	pair_cards = pair_production.sum(axis=3)
+	mean_cards = pair_cards @ ROLL_PROBABILITIES
+	# rolls of 7 give nothing and still count in the variance
+	pair_variance = (pair_cards ** 2) @ ROLL_PROBABILITIES - mean_cards ** 2
+	pair_dry_probability = 1 - (pair_cards > 0) @ ROLL_PROBABILITIES
+	return pair_income, pair_variance, pair_dry_probability
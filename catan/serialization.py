@@ -0,0 +1,197 @@
+'''
+Compact binary encoding of a whole game, for storing large numbers of positions.
+The board, buildings, hands, development cards, deck and turn are all kept,
+so a loaded game plays on exactly like the one that was saved.
+The state of the random number generators is not kept: a loaded game gets fresh ones from the seed given to load_game,
+or without a seed, from the encoded game itself, so loading the same bytes twice gives the same game.
+Loading never draws from the random module.
+
+All integers are little-endian. Layout (version 1):
+	header: magic "CTN", version, number of colors, number of hexes, number of ports
+	each color: length, then the name in UTF-8
+	board: resource of each hex, token of each hex (255 for the desert), type of each port
+	state: turn, game state, placement count, flags, robber hex,
+		longest road holder and length, largest army holder and size, deck size, then the deck
+	each player: hand (5 x uint16), development cards in hand, knights played,
+		settlements in the order built (vertex ID, high bit set for a city), roads in the order built (edge ID)
+'''
+
+import hashlib
+import struct
+from game_engine import Game, GameState, BoardLayout
+from game_random import Seed
+from catan_gen import CatanConstants, TILE_TYPES, TOKENS, PORT_TYPES
+from catan_types import Lattice
+from topology import get_default_lattice
+from typing import Dict, List, Optional
+
+
+MAGIC = b"CTN"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<3sBBBB")
+_STATE = struct.Struct("<BBBBBBBBBB")
+_HAND = struct.Struct("<5H")
+_PLAYER_CARDS = struct.Struct("<%dBB" % len(CatanConstants.development_cards))
+
+# value for "nobody" or "nothing" wherever a byte holds an index
+_NONE = 255
+_CITY_BIT = 0x80
+
+_DEV_CARDS = list(CatanConstants.development_cards.keys())
+_STATES = list(GameState)
+
+# empty games on recently loaded boards, by the encoded colors and board
+# positions from the same game share a board, so loading them only has to copy the empty game
+_prototypes = {}  # type: Dict[bytes, Game]
+_MAX_PROTOTYPES = 64
+
+
+class SerializationError(Exception):
+	pass
+
+
+def dump_game(game: Game) -> bytes:
+	'''Encode the game as bytes.'''
+
+	colors = game.get_colors()
+	layout = game.get_board_layout()
+	topology = game.get_topology()
+	parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(colors), len(layout.resources), len(layout.ports))]
+	for color in colors:
+		name = color.encode("utf-8")
+		parts.append(bytes([len(name)]) + name)
+
+	parts.append(bytes([TILE_TYPES.index(r) for r in layout.resources]))
+	parts.append(bytes([_NONE if t is None else TOKENS.index(t) for t in layout.tokens]))
+	parts.append(bytes([PORT_TYPES.index(p) for p in layout.ports]))
+
+	deck = game.get_development_card_deck()
+	flags = int(game.get_player_played_development_card()) | int(game.is_game_over) << 1
+	longest_road_player = game._longest_road_player
+	largest_army_player = game._largest_army_player
+	parts.append(_STATE.pack(
+		game.get_turn(), _STATES.index(game.get_state()), game._placement_count, flags,
+		topology.hex_ids[game.get_robber_hex_coords()],
+		_NONE if longest_road_player is None else colors.index(longest_road_player.get_color()),
+		game._longest_road_length,
+		_NONE if largest_army_player is None else colors.index(largest_army_player.get_color()),
+		game._largest_army_num_knights,
+		len(deck)
+	))
+	parts.append(bytes([_DEV_CARDS.index(card) for card in deck]))
+
+	for color in colors:
+		player = game.get_player(color)
+		parts.append(_HAND.pack(*player.get_resource_vector()))
+		dev_cards = player.get_development_cards()
+		parts.append(_PLAYER_CARDS.pack(
+			*[dev_cards.get(card, 0) for card in _DEV_CARDS], player.get_num_knights_played()))
+		settlements = player.get_settlements()
+		parts.append(bytes([len(settlements)] + [
+			topology.vertex_ids[s.vertex()] | (_CITY_BIT if s.is_city() else 0) for s in settlements
+		]))
+		roads = player.get_roads()
+		parts.append(bytes([len(roads)] + [topology.edge_ids[road] for road in roads]))
+	return b"".join(parts)
+
+
+def load_game(data: bytes, hex_coord_lattice: Optional[Lattice] = None, seed: Optional[Seed] = None) -> Game:
+	'''Decode a game encoded by dump_game.
+	The lattice only decides the vertex coordinates and defaults to the standard one.
+	The seed is for the random number generators of the loaded game, as in Game().
+	Without a seed, the generators are seeded from the data, never from the random module.
+	Loading many positions played on the same board is fastest with the default lattice,
+	because the empty game for each board is kept and copied.
+	Raise SerializationError if the data is not in a format this version can read.'''
+
+	try:
+		return _load_game(memoryview(data), hex_coord_lattice, seed)
+	except (struct.error, IndexError, KeyError, ValueError) as e:
+		raise SerializationError(f"corrupt game data: {e}")
+
+
+def _load_game(data: memoryview, hex_coord_lattice: Optional[Lattice], seed: Optional[Seed]) -> Game:
+	magic, version, num_colors, num_hexes, num_ports = _HEADER.unpack_from(data, 0)
+	if magic != MAGIC:
+		raise SerializationError("not an encoded game")
+	if version != FORMAT_VERSION:
+		raise SerializationError(f"cannot read format version {version}")
+	offset = _HEADER.size
+
+	colors = []  # type: List[str]
+	for _ in range(num_colors):
+		n = data[offset]
+		colors.append(bytes(data[offset + 1:offset + 1 + n]).decode("utf-8"))
+		offset += 1 + n
+	board_key = bytes(data[_HEADER.size:offset + 2 * num_hexes + num_ports])
+
+	prototype = _prototypes.get(board_key) if hex_coord_lattice is None else None
+	if prototype is None:
+		resources = tuple([TILE_TYPES[i] for i in data[offset:offset + num_hexes]])
+		tokens = tuple([None if i == _NONE else TOKENS[i] for i in data[offset + num_hexes:offset + 2 * num_hexes]])
+		ports = tuple([PORT_TYPES[i] for i in data[offset + 2 * num_hexes:offset + 2 * num_hexes + num_ports]])
+		layout = BoardLayout(resources, tokens, ports)
+		# the prototype's seed and deck are never used, since every game copied from it gets its own,
+		# but without a seed it would draw one from the random module, and with an empty deck there is nothing to shuffle
+		if hex_coord_lattice is not None:
+			prototype = Game(colors[0], colors, hex_coord_lattice, board=layout, seed=0)
+		else:
+			prototype = Game(colors[0], colors, get_default_lattice(), board=layout, seed=0)
+			if len(_prototypes) >= _MAX_PROTOTYPES:
+				_prototypes.clear()
+			_prototypes[board_key] = prototype
+		prototype.set_development_card_deck([])
+	offset += 2 * num_hexes + num_ports
+	if seed is None:
+		seed = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+	game = prototype.clone(seed)
+	topology = game.get_topology()
+
+	(turn, state, placement_count, flags, robber_hex_id, longest_road_holder, longest_road_length,
+		largest_army_holder, largest_army_num_knights, deck_size) = _STATE.unpack_from(data, offset)
+	offset += _STATE.size
+	game.set_development_card_deck([_DEV_CARDS[i] for i in data[offset:offset + deck_size]])
+	offset += deck_size
+
+	# settlements go down before roads, so that every road is added with the final buildings in place
+	# and the road networks come out the same no matter what order things were built in
+	players_roads = []
+	for color in colors:
+		player = game.get_player(color)
+		hand = _HAND.unpack_from(data, offset)
+		offset += _HAND.size
+		cards = _PLAYER_CARDS.unpack_from(data, offset)
+		offset += _PLAYER_CARDS.size
+		for card, n in zip(_DEV_CARDS, cards):
+			for _ in range(n):
+				player.add_development_card(card)
+		player.set_num_knights_played(cards[-1])
+
+		n = data[offset]
+		for b in data[offset + 1:offset + 1 + n]:
+			vid = b & ~_CITY_BIT
+			game._build_settlement(vid, color)
+			if b & _CITY_BIT:
+				game._build_city(vid, color)
+		offset += 1 + n
+		n = data[offset]
+		players_roads.append((color, bytes(data[offset + 1:offset + 1 + n])))
+		offset += 1 + n
+		player.set_resource_vector(hand)
+
+	for color, roads in players_roads:
+		for edge_id in roads:
+			game._build_road(edge_id, color)
+	if offset != len(data):
+		raise SerializationError("trailing data after encoded game")
+
+	robber_hex = topology.hex_coords[robber_hex_id]
+	if robber_hex != game.get_robber_hex_coords():
+		game._set_robber_hex(robber_hex)
+	game._set_special_card_holders(
+		None if longest_road_holder == _NONE else colors[longest_road_holder], longest_road_length,
+		None if largest_army_holder == _NONE else colors[largest_army_holder], largest_army_num_knights
+	)
+	game._restore_turn_state((turn, _STATES[state], placement_count, bool(flags & 1), bool(flags & 2)))
+	return game
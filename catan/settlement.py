@@ -21,6 +21,11 @@ class Settlement():
 
         self._city = True
 
+    def downgrade(self) -> None:
+        '''Turn this city back into a settlement. Only used to undo an upgrade.'''
+
+        self._city = False
+
     def vertex(self) -> Tuple[int, int]:
         '''Return the vertex at which this city/settlement is placed.'''
 
@@ -30,3 +35,10 @@ class Settlement():
         '''Return the color of this city/settlement.'''
 
         return self._color
+
+    def clone(self) -> 'Settlement':
+        '''Return an independent copy of this settlement.'''
+
+        s = Settlement(self._vertex, self._color)
+        s._city = self._city
+        return s
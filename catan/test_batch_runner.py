@@ -0,0 +1,54 @@
+from batch_runner import make_jobs, run_batch, write_results, to_csv_row, get_csv_fields, BatchSummary
+from ai.dummy_ai import DummyAI
+from ai.smart_placement_ai import SmartPlacementAI
+import csv
+import io
+import json
+
+
+AI_CLASSES = [SmartPlacementAI, DummyAI, DummyAI, DummyAI]
+
+
+def test_make_jobs_rotates_seats():
+	"""With rotate, every AI gets every seat"""
+	jobs = list(make_jobs(AI_CLASSES, 4, first_seed=10, rotate=True))
+	assert [job.seed for job in jobs] == [10, 11, 12, 13]
+	seats = [list(job.ai_classes.values()).index(SmartPlacementAI) for job in jobs]
+	assert seats == [0, 3, 2, 1]
+
+
+def test_batch_is_reproducible():
+	"""A batch gives the same results in one process as across several"""
+	jobs = list(make_jobs(AI_CLASSES, 6, rotate=True))
+	results = list(run_batch(jobs, num_workers=1))
+	assert list(run_batch(jobs, num_workers=2, chunksize=1)) == results
+	assert [result.seed for result in results] == list(range(6))
+
+	summary = BatchSummary()
+	for result in results:
+		assert result.error is None
+		summary.add(result)
+		if result.winner is not None:
+			assert result.vp[result.winner]["vp"] >= 10
+	assert summary.num_games == 6
+	assert sum(summary.wins_by_ai.values()) == 6 - summary.num_unfinished
+	assert summary.games_by_ai["DummyAI"] == 18
+
+
+def test_write_results():
+	"""Results are written as one CSV row or JSON line per game"""
+	results = list(run_batch(make_jobs(AI_CLASSES, 2)))
+	out = io.StringIO()
+	assert list(write_results(results, out, "csv", 4)) == results
+	rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+	assert list(rows[0].keys()) == get_csv_fields(4)
+	assert [row["seed"] for row in rows] == ["0", "1"]
+	assert rows[0]["seat0_ai"] == "SmartPlacementAI"
+	assert rows[1]["winner"] == (results[1].winner or "")
+
+	out = io.StringIO()
+	list(write_results(results, out, "jsonl", 4))
+	lines = [json.loads(line) for line in out.getvalue().splitlines()]
+	assert [line["num_turns"] for line in lines] == [result.num_turns for result in results]
+	assert lines[0]["vp"] == results[0].vp
+	assert to_csv_row(results[0])["num_turns"] == results[0].num_turns
@@ -0,0 +1,53 @@
+from game_engine import Game
+from board_generator import (generate_boards, iter_boards, assign_tokens, get_board_layout, to_batch,
+	make_game, get_token_numbers, NO_TOKEN, SPIRAL)
+from catan_gen import CatanConstants, TILE_TYPES, PORT_TYPES
+from topology import get_default_lattice, get_topology
+import numpy as np
+
+
+LATTICE = get_default_lattice()
+COLORS = ["orange", "yellow", "green", "red"]
+
+
+def test_spiral_matches_topology():
+	topology = get_topology(LATTICE)
+	assert [topology.hex_coords[hex_id] for hex_id in SPIRAL] == Game.get_token_spiral()
+	assert sorted(SPIRAL.tolist()) == list(range(len(topology.hex_coords)))
+
+
+def test_tokens_follow_game_rules():
+	"""Tokens are placed the way Game places them on its own random boards"""
+	layouts = [Game(COLORS[0], COLORS, LATTICE, seed=seed).get_board_layout() for seed in range(50)]
+	batch = to_batch(layouts)
+	assert np.array_equal(assign_tokens(batch.resources), batch.tokens)
+	assert [get_board_layout(batch, i) for i in range(len(layouts))] == layouts
+
+
+def test_generated_boards():
+	"""Every board has the right tiles, tokens and ports, and the same seed gives the same boards"""
+	batch = generate_boards(1000, 3)
+	for i, r in enumerate(TILE_TYPES):
+		assert np.all((batch.resources == i).sum(axis=1) == CatanConstants.resource_distribution[r])
+	for i, p in enumerate(PORT_TYPES):
+		assert np.all((batch.ports == i).sum(axis=1) == CatanConstants.port_distribution[p])
+	desert = batch.resources == TILE_TYPES.index("desert")
+	assert np.array_equal(batch.tokens == NO_TOKEN, desert)
+	numbers = get_token_numbers(batch.tokens)
+	assert np.array_equal(np.sort(numbers, axis=1)[0], sorted([0] + list(CatanConstants.token_map.values())))
+	# the desert moves around
+	assert desert.sum(axis=0).min() > 0
+
+	again = list(iter_boards(1000, batch_size=300, rng=3))
+	assert [len(b.resources) for b in again] == [300, 300, 300, 100]
+	assert np.array_equal(again[0].resources, generate_boards(300, 3).resources)
+	assert all([np.array_equal(a.tokens, b.tokens) for a, b in zip(again, iter_boards(1000, batch_size=300, rng=3))])
+
+
+def test_make_game():
+	batch = generate_boards(5, 4)
+	for i in range(5):
+		game = make_game(batch, i, COLORS[0], COLORS, LATTICE)
+		assert game.get_board_layout() == get_board_layout(batch, i)
+		robber_hex = game.get_robber_hex()
+		assert robber_hex.get_resource() == "desert"
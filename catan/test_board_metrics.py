@@ -0,0 +1,65 @@
+from game_engine import Game
+from board_generator import generate_boards, make_game
+from board_metrics import score_boards, score_game, rank_boards, get_balance_penalty, BalanceScoreConstraint
+from topology import get_default_lattice, get_topology
+import numpy as np
+
+
+LATTICE = get_default_lattice()
+COLORS = ["orange", "yellow", "green", "red"]
+
+
+def get_dots(hex) -> int:
+	return 0 if hex.get_resource() == "desert" else hex.get_num_dots()
+
+
+def test_metrics_match_board():
+	"""The vectorized metrics agree with counting on the Game board itself"""
+	topology = get_topology(LATTICE)
+	batch = generate_boards(30, 11)
+	metrics = score_boards(batch)
+	for i in range(30):
+		game = make_game(batch, i, COLORS[0], COLORS, LATTICE)
+		hexes = [game.get_board()[coord] for coord in topology.hex_coords]
+		high = 0
+		for a in range(len(hexes)):
+			for b in range(a + 1, len(hexes)):
+				if len(set(hexes[a].get_vertices()) & set(hexes[b].get_vertices())) == 2:
+					high += get_dots(hexes[a]) >= 4 and get_dots(hexes[b]) >= 4
+		assert metrics.high_adjacencies[i] == high
+
+		synergy = 0
+		for location, port_type in zip(game.get_port_locations(), game.get_board_layout().ports):
+			at_port = set([hex_id for v in location for hex_id in topology.vertex_hexes[topology.vertex_ids[v]]])
+			synergy += sum([get_dots(hexes[h]) for h in at_port if hexes[h].get_resource() == port_type])
+		assert metrics.port_synergy[i] == synergy
+
+		assert metrics.resource_dots[i].sum() == sum([get_dots(hex) for hex in hexes])
+		single = score_game(game)
+		assert np.array_equal(single.opening_values[0], metrics.opening_values[i])
+
+
+def test_openings():
+	"""The first seat picks the best vertex, and the spread is between the best and worst seat"""
+	batch = generate_boards(100, 12)
+	metrics = score_boards(batch)
+	assert np.all(metrics.opening_values > 0)
+	assert np.array_equal(metrics.opening_spread, metrics.opening_values.max(axis=1) - metrics.opening_values.min(axis=1))
+
+
+def test_rank_boards():
+	metrics = score_boards(generate_boards(500, 13))
+	ranking = rank_boards(metrics)
+	penalty = get_balance_penalty(metrics)
+	assert sorted(ranking.tolist()) == list(range(500))
+	assert np.all(np.diff(penalty[ranking]) >= 0)
+	# with only one metric, the ranking follows it
+	ranking = rank_boards(metrics, {"opening_spread": 1.0})
+	assert np.all(np.diff(metrics.opening_spread[ranking]) >= 0)
+
+
+def test_balance_score_constraint():
+	"""A board generated with a balance constraint has a penalty in the range"""
+	for seed in range(3):
+		game = Game(COLORS[0], COLORS, LATTICE, seed=seed, board_constraints=[BalanceScoreConstraint(1.0, 3.5)])
+		assert 1.0 <= get_balance_penalty(score_game(game))[0] <= 3.5
@@ -0,0 +1,52 @@
+from game_engine import Game
+from board_search import (NoNeighbouringNumbers, NoSameNumberNeighbours, NoSameResourceNeighbours,
+	BoardConstraint, BoardGenerationError, PartialBoard, get_hex_neighbours, search_board)
+from catan_gen import CatanConstants
+from topology import get_default_lattice, get_topology
+from collections import Counter
+import random
+import pytest
+
+
+LATTICE = get_default_lattice()
+COLORS = ["orange", "yellow", "green", "red"]
+
+
+def get_neighbouring_pairs(values: list) -> list:
+	neighbours = get_hex_neighbours(get_topology(LATTICE))
+	return [(values[a], values[b]) for a in range(len(values)) for b in neighbours[a] if a < b]
+
+
+def test_constraints_hold():
+	"""Boards generated with constraints follow them and still have the usual tiles, tokens and ports"""
+	constraints = [NoNeighbouringNumbers(), NoSameResourceNeighbours(), NoSameNumberNeighbours()]
+	for seed in range(10):
+		game = Game(COLORS[0], COLORS, LATTICE, seed=seed, board_constraints=constraints)
+		layout = game.get_board_layout()
+		numbers = [None if t is None else CatanConstants.token_map[t] for t in layout.tokens]
+		for a, b in get_neighbouring_pairs(numbers):
+			assert not (a in [6, 8] and b in [6, 8])
+			assert a is None or a != b
+		for a, b in get_neighbouring_pairs(list(layout.resources)):
+			assert a != b
+
+		assert Counter(layout.resources) == Counter(CatanConstants.resource_distribution)
+		assert Counter(layout.ports) == Counter(CatanConstants.port_distribution)
+		assert sorted([t for t in layout.tokens if t is not None]) == sorted(CatanConstants.token_map.keys())
+		assert [t is None for t in layout.tokens] == [r == "desert" for r in layout.resources]
+		assert game.get_robber_hex().get_resource() == "desert"
+
+	# the board comes from the game's seed
+	boards = [Game(COLORS[0], COLORS, LATTICE, seed=3, board_constraints=constraints).get_board_layout() for _ in range(2)]
+	assert boards[0] == boards[1]
+
+
+class NoBoard(BoardConstraint):
+	def allows_board(self, board: PartialBoard) -> bool:
+		return False
+
+
+def test_impossible_constraints():
+	"""The search gives up after its step budget"""
+	with pytest.raises(BoardGenerationError):
+		search_board(get_topology(LATTICE), [NoBoard()], random.Random(1), max_steps=2000, steps_per_restart=500)
@@ -1,10 +1,10 @@
 from ai.dummy_ai import DummyAI
 from game_engine import Game
-from catan_tk import CatanApp
+from topology import get_default_lattice
 import logging
 
 
-LATTICE = CatanApp.get_hex_coord_lattice()
+LATTICE = get_default_lattice()
 COLORS = ["red", "white", "blue"]
 logging.basicConfig(level=logging.DEBUG)
 
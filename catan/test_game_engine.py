@@ -1,9 +1,12 @@
 from game_engine import Game, GameState
+from player import Player
+from catan_gen import CatanConstants
 import random
-from catan_tk import CatanApp, get_hex_lattice
+from topology import get_default_lattice, get_hex_lattice, iter_bits
 from typing import List
 from ai.dummy_ai import DummyAI
 from ai.smart_placement_ai import SmartPlacementAI
+from test_helpers import random_playout
 import math
 from unittest import mock
 # import catan_cli_draw
@@ -11,7 +14,7 @@ import logging
 
 
 COLORS = ["orange", "yellow", "green", "red"]
-LATTICE = CatanApp.get_hex_coord_lattice()
+LATTICE = get_default_lattice()
 logging.basicConfig(level=logging.DEBUG)
 
 
@@ -126,7 +129,7 @@ def test_play_knight_card():
 
 	# this is done so 7 is not rolled
 	m = mock.MagicMock(return_value=1)
-	with mock.patch("random.randint", m):
+	with mock.patch.object(game.get_rng("dice"), "randint", m):
 		roll = game.roll_dice()
 		assert roll == 2
 
@@ -167,7 +170,7 @@ def test_play_monopoly_card():
 
 	# this is done so 7 is not rolled
 	m = mock.MagicMock(return_value=1)
-	with mock.patch("random.randint", m):
+	with mock.patch.object(game.get_rng("dice"), "randint", m):
 		roll = game.roll_dice()
 		assert roll == 2
 
@@ -227,7 +230,7 @@ def test_play_road_building_card():
 
 	# this is done so 7 is not rolled
 	m = mock.MagicMock(return_value=1)
-	with mock.patch("random.randint", m):
+	with mock.patch.object(game.get_rng("dice"), "randint", m):
 		roll = game.roll_dice()
 		assert roll == 2
 
@@ -283,7 +286,7 @@ def test_play_year_of_plenty():
 
 	# this is done so 7 is not rolled
 	m = mock.MagicMock(return_value=1)
-	with mock.patch("random.randint", m):
+	with mock.patch.object(game.get_rng("dice"), "randint", m):
 		roll = game.roll_dice()
 		assert roll == 2
 
@@ -327,7 +330,7 @@ def test_largest_army():
 	for i in range(3 * len(COLORS)):
 		# make sure 7 not rolled
 		m = mock.MagicMock(return_value=1)
-		with mock.patch("random.randint", m):
+		with mock.patch.object(game.get_rng("dice"), "randint", m):
 			roll = game.roll_dice()
 			assert roll == 2
 
@@ -366,7 +369,7 @@ def test_add_city():
 	player = game.get_player(color)
 
 	m = mock.MagicMock(return_value=1)
-	with mock.patch("random.randint", m):
+	with mock.patch.object(game.get_rng("dice"), "randint", m):
 		roll = game.roll_dice()
 		assert roll == 2
 
@@ -419,7 +422,7 @@ def test_longest_road():
 	assert player.get_num_vp() == 2
 
 	m = mock.MagicMock(return_value=1)
-	with mock.patch("random.randint", m):
+	with mock.patch.object(game.get_rng("dice"), "randint", m):
 		roll = game.roll_dice()
 		assert roll == 2
 
@@ -453,12 +456,284 @@ def test_longest_road():
 
 
 def test_get_road_length_initial():
-	random.seed(42)
-	game = Game(COLORS[0], COLORS, LATTICE)
+	# with this seed, no player's two initial roads touch
+	game = Game(COLORS[0], COLORS, LATTICE, seed=42)
 	ais = { color: DummyAI(color, game) for color in COLORS }
 	_automate_placement(ais, game, COLORS)
 
 	for color in COLORS:
 		p = game.get_player(color)
 		for v in p.get_settlement_vertices():
-			assert game.get_road_length(v, color) == 1
\ No newline at end of file
+			assert game.get_road_length(v, color) == 1
+
+
+def test_bitboards_match_placement():
+	random.seed(42)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	ais = { color: DummyAI(color, game) for color in COLORS }
+	_automate_placement(ais, game, COLORS)
+	topology = game.get_topology()
+
+	occupied = set([])
+	for color in COLORS:
+		player = game.get_player(color)
+		settlement_vs = set([topology.vertex_ids[v] for v in player.get_settlement_vertices()])
+		assert set(iter_bits(game.get_settlement_bits(color))) == settlement_vs
+		road_ids = set([topology.get_edge_id(*road) for road in player._roads])
+		assert set(iter_bits(game.get_road_bits(color))) == road_ids
+		occupied.update(settlement_vs)
+
+	# distance rule: nothing can be built on or next to an existing settlement
+	for vid in range(topology.num_vertices):
+		blocked = vid in occupied or any([u in occupied for u in topology.vertex_vertices[vid]])
+		assert game.can_place_settlement(topology.vertices[vid]) == (not blocked)
+
+
+def test_longest_road_loop():
+	"""A ring of roads around a hex counts every road in the ring"""
+	random.seed(42)
+	color = COLORS[0]
+	game = Game(color, COLORS, LATTICE)
+	hex = game.get_board()[(0, 0)]
+	game.add_settlement(hex.get_vertex(5), color, initial_placement=True)
+	for i in range(6):
+		game.add_road(hex.get_vertex(i - 1), hex.get_vertex(i), color, initial_placement=True)
+	assert game.get_longest_road_length(color) == 6
+
+	# a spur off the ring extends the trail: around the ring, then out along the spur
+	v = hex.get_vertex(0)
+	spur = [v2 for v2 in game.get_adjacent_vertices(v) if not game.has_road(v, v2)]
+	assert len(spur) == 1
+	game.add_road(v, spur[0], color, initial_placement=True)
+	assert game.get_longest_road_length(color) == 7
+	assert game.get_road_length(spur[0], color) == 7
+
+
+def test_settlement_cuts_longest_road():
+	"""An opponent settlement in the middle of a road splits it and can take away the longest road card"""
+	random.seed(42)
+	color, other_color = COLORS[0], COLORS[1]
+	game = Game(color, COLORS, LATTICE)
+	path = [game.get_board()[(0, 0)].get_vertex(0)]
+	while len(path) < 7:
+		path.append([v for v in game.get_adjacent_vertices(path[-1]) if v not in path][0])
+	game.add_settlement(path[0], color, initial_placement=True)
+	for v1, v2 in zip(path, path[1:]):
+		game.add_road(v1, v2, color, initial_placement=True)
+	assert game.get_longest_road_length(color) == 6
+	assert game.get_player(color).has_special_card("longest road")
+
+	game.add_settlement(path[4], other_color, initial_placement=True)
+	assert game.get_longest_road_length(color) == 4
+	assert game.get_road_length(path[1], color) == 4
+	assert game.get_road_length(path[6], color) == 2
+	assert not game.get_player(color).has_special_card("longest road")
+
+
+def test_player_road_vertex_index():
+	"""The player's road vertex index follows the roads that get built"""
+	random.seed(42)
+	color = COLORS[0]
+	game = Game(color, COLORS, LATTICE)
+	player = game.get_player(color)
+	hex = game.get_board()[(0, 0)]
+	v0, v1, v2 = hex.get_vertex(0), hex.get_vertex(1), hex.get_vertex(2)
+	assert not player.has_road_to(v0)
+	assert player.get_road_vertices() == frozenset()
+
+	game.add_settlement(v0, color, initial_placement=True)
+	game.add_road(v0, v1, color, initial_placement=True)
+	vertices = player.get_road_vertices()
+	assert vertices == frozenset([v0, v1])
+	assert player.get_road_vertices() is vertices
+
+	game.add_road(v1, v2, color, initial_placement=True)
+	assert player.get_road_vertices() == frozenset([v0, v1, v2])
+	assert player.has_road_to(v2)
+	assert player.get_num_roads_at(v1) == 2
+	assert player.get_num_roads_at(v0) == 1
+
+
+def test_resource_vectors():
+	"""Hands and costs are kept as vectors of brick, ore, sheep, wood and wheat"""
+	assert CatanConstants.building_cost_vectors["road"] == (1, 0, 0, 1, 0)
+	assert CatanConstants.building_cost_vectors["city"] == (0, 3, 0, 0, 2)
+	assert CatanConstants.development_card_cost_vector == (0, 1, 1, 0, 1)
+
+	player = Player("red")
+	player.add_resources(["wheat", "ore", "wheat"])
+	player.add_resource("ore", 2)
+	assert player.get_resource_vector() == (0, 3, 0, 0, 2)
+	assert player.get_hand() == {"brick": 0, "ore": 3, "sheep": 0, "wood": 0, "wheat": 2}
+	assert player.can_deduct_resource_vector(CatanConstants.building_cost_vectors["city"])
+	assert not player.can_deduct_resources(["brick"])
+
+	player.deduct_resources(["ore", "wheat"])
+	assert not player.can_deduct_resource_vector(CatanConstants.building_cost_vectors["city"])
+	assert player.take_all_of_resource("ore") == 2
+	assert player.get_resource_vector() == (0, 0, 0, 0, 1)
+	assert player.get_num_resources() == 1
+
+
+def test_payout_table():
+	"""The payout table follows settlements, cities and the robber"""
+	random.seed(42)
+	color = COLORS[0]
+	game = Game(color, COLORS, LATTICE)
+	hex = [h for h in game.get_board().values() if h.get_resource() != "desert"][0]
+	roll = hex.get_number()
+	v = hex.get_vertex(0)
+	index = ["brick", "ore", "sheep", "wood", "wheat"].index(hex.get_resource())
+
+	def payout() -> int:
+		return game.get_payout_table()[roll].get(color, (0,) * 5)[index]
+
+	assert payout() == 0
+	game.add_settlement(v, color, initial_placement=True)
+	assert payout() >= 1
+	n = payout()
+	game.get_player(color).add_resources(["wheat"] * 2 + ["ore"] * 3)
+	game.add_city(v, color)
+	assert payout() == 2 * n
+
+	# the robber stops the hex from producing
+	game._state = GameState.ROBBER_PLACEMENT
+	game.move_robber(hex.get_coord(), None, color)
+	assert payout() == 2 * (n - 1)
+
+	before = game.get_player(color).get_resource_vector()
+	game._produce_resources_from_roll(roll)
+	after = game.get_player(color).get_resource_vector()
+	assert after[index] - before[index] == 2 * (n - 1)
+
+
+def test_clone_is_independent():
+	"""A cloned game shares the board but not the game state"""
+	random.seed(42)
+	color = COLORS[0]
+	game = Game(color, COLORS, LATTICE)
+	hex = game.get_board()[(0, 0)]
+	v0, v1 = hex.get_vertex(0), hex.get_vertex(1)
+	game.add_settlement(v0, color, initial_placement=True)
+	game.get_player(color).add_resources(["wheat"] * 2 + ["ore"] * 3 + ["brick", "wood"])
+
+	clone = game.clone()
+	assert clone.get_board() is game.get_board()
+	assert clone.get_player(color) is not game.get_player(color)
+
+	game.add_road(v0, v1, color)
+	game.add_city(v0, color)
+	assert clone.get_road_bits(color) == 0
+	assert not clone.get_settlement_at_vertex(v0).is_city()
+	assert clone.get_player(color).get_num_resources() == 7
+	assert clone.get_payout_table() != game.get_payout_table()
+
+	# restoring the snapshot undoes everything done since
+	game.restore(clone)
+	assert not game.has_road(v0, v1)
+	assert not game.get_settlement_at_vertex(v0).is_city()
+	assert game.get_player(color).get_num_resources() == 7
+	assert game.get_payout_table() == clone.get_payout_table()
+	assert clone.get_settlement_at_vertex(v0) is not game.get_settlement_at_vertex(v0)
+
+
+def test_legal_actions():
+	"""Every legal action can be applied, and the count matches the actions"""
+	random.seed(42)
+	game = Game(COLORS[0], COLORS, LATTICE)
+
+	def check() -> None:
+		color = game.get_current_color()
+		actions = list(game.legal_actions(color))
+		assert len(actions) == game.count_legal_actions(color)
+		assert len(set(actions)) == len(actions)
+		for other in COLORS:
+			if other != color:
+				assert list(game.legal_actions(other)) == []
+
+	check()
+	for _ in random_playout(game, random, 200):
+		check()
+	assert game.get_state() != GameState.INITIAL_PLACEMENT
+
+
+def test_road_frontier_is_maintained():
+	"""The road frontier of each player always matches can_place_road"""
+	random.seed(7)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	edges = game.get_topology().edges
+
+	def check() -> None:
+		for color in COLORS:
+			expected = set([e for e in edges if game.can_place_road(e[0], e[1], color)])
+			assert set([edges[i] for i in iter_bits(game.get_road_frontier_bits(color))]) == expected
+
+	check()
+	for _ in random_playout(game, random, 300):
+		check()
+
+
+def test_settlement_frontier_is_maintained():
+	"""The settlement frontier of each player is their road ends that are still available"""
+	random.seed(7)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	vertices = game.get_topology().vertices
+
+	def check() -> None:
+		for color in COLORS:
+			expected = game.get_player(color).get_road_vertices().intersection(game.available_settlement_set)
+			assert set([vertices[i] for i in iter_bits(game.get_settlement_frontier_bits(color))]) == expected
+
+	check()
+	for _ in random_playout(game, random, 300):
+		check()
+
+
+def test_seed_decides_game():
+	"""Games with the same seed play out the same, even when played interleaved"""
+	def play_turns(game: Game, ais: dict, num_turns: int) -> None:
+		for _ in range(num_turns):
+			color = game.get_current_color()
+			if game.roll_dice() == 7:
+				for ai in ais.values():
+					ai.robber_discard(game)
+				steal_from, hex_coord = ais[color].get_robber_placement(game)
+				game.move_robber(hex_coord, steal_from, color)
+			game.next_turn()
+
+	games = [Game(COLORS[0], COLORS, LATTICE, seed=1234) for _ in range(2)]
+	assert games[0].get_board_layout() == games[1].get_board_layout()
+	assert games[0]._dev_card_deck == games[1]._dev_card_deck
+	all_ais = [{color: DummyAI(color, game) for color in COLORS} for game in games]
+	for game, ais in zip(games, all_ais):
+		_automate_placement(ais, game, COLORS)
+	for _ in range(10):
+		for game, ais in zip(games, all_ais):
+			play_turns(game, ais, 3)
+		# drawing from the global generator or another stream does not change the dice
+		random.random()
+		games[1].get_rng("unused").random()
+		for color in COLORS:
+			assert games[0].get_player(color).get_hand() == games[1].get_player(color).get_hand()
+	assert games[0].get_robber_hex_coords() == games[1].get_robber_hex_coords()
+
+	# a clone continues the random streams from where the original is
+	clone = games[0].clone()
+	assert [clone.get_rng("dice").random() for _ in range(5)] == [games[0].get_rng("dice").random() for _ in range(5)]
+	assert Game(COLORS[0], COLORS, LATTICE, seed=1235).get_board_layout() != games[0].get_board_layout()
+
+
+def test_clone_copies_random_streams_lazily():
+	"""A clone only makes the random streams it uses, and a clone with its own seed copies none"""
+	game = Game(COLORS[0], COLORS, LATTICE, seed=1234)
+	game.get_rng("dice").random()
+	with mock.patch.object(random.Random, "getstate", side_effect=AssertionError):
+		game.clone(seed=1)
+	with mock.patch.object(random.Random, "setstate", side_effect=AssertionError):
+		clone = game.clone()
+		clone_of_clone = clone.clone()
+
+	expected = [game.get_rng("dice").random() for _ in range(5)]
+	assert [clone.get_rng("dice").random() for _ in range(5)] == expected
+	assert [clone_of_clone.get_rng("dice").random() for _ in range(5)] == expected
+	assert clone.get_rng("deck").random() == clone_of_clone.get_rng("deck").random()
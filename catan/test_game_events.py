@@ -0,0 +1,110 @@
+from catan_cli import CatanCLI
+from game_events import (log_event, DiceRolled, SettlementBuilt, CityBuilt, RoadBuilt, TurnEnded,
+	InitialPlacementEnded, LongestRoadChanged, GameOver, DevelopmentCardPlayed)
+from game_engine import GameState, DevelopmentCardError, RobberPlacementError, RoadPlacementError
+from serialization import dump_game
+from ai.dummy_ai import DummyAI
+from ai.smart_placement_ai import SmartPlacementAI
+from collections import Counter
+from unittest import mock
+import logging
+import pytest
+
+
+COLORS = ["orange", "yellow", "green", "red"]
+AI_CLASSES = {"orange": SmartPlacementAI, "yellow": DummyAI, "green": DummyAI, "red": DummyAI}
+logging.basicConfig(level=logging.DEBUG)
+
+
+def test_events_follow_game():
+	"""The events of a whole game add up to the final state of the game"""
+	cli = CatanCLI(COLORS, AI_CLASSES, 5, silent=True)
+	game = cli.get_game()
+	events = []
+	game.subscribe(events.append)
+	game.subscribe(log_event)
+	cli.initial_placement()
+	cli.play_game()
+
+	kinds = Counter([type(event) for event in events])
+	assert kinds[InitialPlacementEnded] == 1
+	assert kinds[DiceRolled] == cli.get_num_turns()
+	assert kinds[TurnEnded] == 2 * len(COLORS) + cli.get_num_turns()
+	for color in COLORS:
+		player = game.get_player(color)
+		built = [e for e in events if isinstance(e, SettlementBuilt) and e.color == color]
+		upgraded = [e for e in events if isinstance(e, CityBuilt) and e.color == color]
+		assert len(built) == player.get_num_settlements() + player.get_num_cities()
+		assert len(upgraded) == player.get_num_cities()
+		roads = [e for e in events if isinstance(e, RoadBuilt) and e.color == color]
+		assert len(roads) == player.get_num_roads()
+
+	changes = [e for e in events if isinstance(e, LongestRoadChanged)]
+	holder = changes[-1].color if changes else None
+	assert holder == (game._longest_road_player and game._longest_road_player.get_color())
+	if game.is_game_over:
+		assert events[-2] == GameOver(game.get_winning_player(), game.get_player_vp(game.get_winning_player()))
+
+
+def test_subscribers():
+	"""Clones start without subscribers, restoring keeps them, and without subscribers no events are created"""
+	cli = CatanCLI(COLORS, AI_CLASSES, 6, silent=True)
+	game = cli.get_game()
+	snapshot = game.clone()
+	events = []
+	game.subscribe(events.append)
+	clone = game.clone()
+	with mock.patch("game_engine.SettlementBuilt") as event_type:
+		cli._game = clone
+		cli.initial_placement()
+		assert event_type.call_count == 0
+	assert events == []
+
+	game.restore(snapshot)
+	color = game.get_current_color()
+	v = cli._ais[color].get_settlement_placement(game)
+	game.add_settlement(v, color, initial_placement=True)
+	assert events == [SettlementBuilt(color, v, True)]
+	game.unsubscribe(events.append)
+	game.next_turn()
+	assert len(events) == 1
+
+
+def test_failed_development_card_play():
+	"""Playing a card the player does not have, or with a robber move or roads that are not allowed,
+	changes nothing and emits nothing"""
+	cli = CatanCLI(COLORS, AI_CLASSES, 7, silent=True)
+	game = cli.get_game()
+	cli.initial_placement()
+	game._state = GameState.GAMEPLAY
+	color = game.get_current_color()
+	player = game.get_player(color)
+	events = []
+	game.subscribe(events.append)
+	before = dump_game(game)
+	with pytest.raises(DevelopmentCardError):
+		game.play_development_card(color, "monopoly", {"target_resource": "ore"})
+	assert dump_game(game) == before
+
+	player.add_development_card("knight")
+	before = dump_game(game)
+	with pytest.raises(RobberPlacementError):
+		game.play_development_card(color, "knight", {"target_hex": game.get_robber_hex_coords(), "target_color": None})
+	assert dump_game(game) == before
+
+	player.add_development_card("road building")
+	before = dump_game(game)
+	edges = game.get_topology().edges
+	road = [e for e in edges if game.can_place_road(e[0], e[1], color)][0]
+	unreachable = [e for e in edges if not set(e) & player.get_road_vertices()][0]
+	with pytest.raises(RoadPlacementError):
+		game.play_development_card(color, "road building", {"roads": [road, unreachable]})
+	assert dump_game(game) == before
+	assert events == []
+
+	# the second road may build on from the first
+	following = [e for e in edges if e != road and set(e) & set(road) and
+		not game.can_place_road(e[0], e[1], color) and not game.has_road(e[0], e[1])][0]
+	game.play_development_card(color, "road building", {"roads": [road, following]})
+	assert isinstance(events[0], DevelopmentCardPlayed)
+	assert [type(event) for event in events[1:]] == [RoadBuilt, RoadBuilt]
@@ -0,0 +1,64 @@
+from catan_cli import CatanCLI
+from game_record import GameRecorder, GameReplay
+from game_events import TurnEnded, DevelopmentCardBought
+from serialization import dump_game, SerializationError
+from batch_runner import make_jobs, run_batch
+from ai.dummy_ai import DummyAI
+from ai.smart_placement_ai import SmartPlacementAI
+import io
+import os
+import pytest
+
+
+COLORS = ["orange", "yellow", "green", "red"]
+AI_CLASSES = {"orange": SmartPlacementAI, "yellow": DummyAI, "green": DummyAI, "red": DummyAI}
+
+
+def record_game(seed: int, checkpoint_interval: int) -> tuple:
+	'''Play a game while recording it, and return the record along with the encoded game at the start of each turn.'''
+	cli = CatanCLI(COLORS, AI_CLASSES, seed, silent=True)
+	game = cli.get_game()
+	out = io.BytesIO()
+	game.subscribe(GameRecorder(game, out, checkpoint_interval))
+	turns = [dump_game(game)]
+	game.subscribe(lambda event: isinstance(event, TurnEnded) and turns.append(dump_game(game)))
+	cli.initial_placement()
+	cli.play_game()
+	return out.getvalue(), turns, game
+
+
+def test_replay_every_turn():
+	"""The replayed game at the start of every turn is the game as it was played"""
+	data, turns, game = record_game(5, checkpoint_interval=7)
+	replay = GameReplay(data)
+	assert replay.get_num_turns() == len(turns) - 1
+	for turn in range(len(turns)):
+		assert dump_game(replay.get_game(turn)) == turns[turn]
+	assert dump_game(replay.get_game()) == dump_game(game)
+	bought = [event for event in replay.iter_events(8) if isinstance(event, DevelopmentCardBought)]
+	assert sum([sum(game.get_player(color).get_development_cards().values()) for color in COLORS]) <= len(bought)
+	with pytest.raises(ValueError):
+		replay.get_game(len(turns))
+
+
+def test_cut_off_record():
+	"""A record cut off in the middle is read up to the last whole event"""
+	data, turns, _ = record_game(6, checkpoint_interval=10)
+	replay = GameReplay(data[:len(data) * 2 // 3 - 1])
+	assert 0 < replay.get_num_turns() < len(turns) - 1
+	for turn in [0, replay.get_num_turns() // 2, replay.get_num_turns()]:
+		assert dump_game(replay.get_game(turn)) == turns[turn]
+
+	with pytest.raises(SerializationError):
+		GameReplay(b"CTN" + data[3:])
+	with pytest.raises(SerializationError):
+		GameReplay(data[:10])
+
+
+def test_batch_records_games(tmp_path):
+	jobs = list(make_jobs([SmartPlacementAI, DummyAI, DummyAI, DummyAI], 2, first_seed=3, record_dir=str(tmp_path)))
+	for result in run_batch(jobs):
+		replay = GameReplay.read(os.path.join(tmp_path, f"{result.seed}.ctr"))
+		game = replay.get_game()
+		assert {color: game.get_player(color).get_num_vp() for color in result.vp} == \
+			{color: vp["vp"] for color, vp in result.vp.items()}
@@ -0,0 +1,21 @@
+from game_engine import Game, Action, ActionType
+from typing import Callable, Iterator, Optional, Tuple
+import random
+
+
+def random_playout(game: Game, rng: random.Random, num_moves: int,
+		apply_action: Optional[Callable[[str, Action], None]] = None) -> Iterator[Tuple[str, Action]]:
+	'''Make num_moves random legal moves, or fewer if the game ends, never ending the turn while anything else is possible,
+	and yield the color and action of each move after making it.
+	Moves are made with apply_action if given (say, MoveLog.apply_action), otherwise with game.apply_action.'''
+
+	apply_action = apply_action or game.apply_action
+	for _ in range(num_moves):
+		if game.is_game_over:
+			return
+		color = game.get_current_color()
+		actions = list(game.legal_actions(color))
+		building = [a for a in actions if a.kind != ActionType.END_TURN]
+		action = rng.choice(building or actions)
+		apply_action(color, action)
+		yield color, action
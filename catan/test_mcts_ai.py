@@ -0,0 +1,95 @@
+from ai.mcts_ai import MCTSAI, ParallelMCTSAI, shutdown_pools
+from ai import mcts_ai
+from ai.dummy_ai import DummyAI
+from catan_cli import CatanCLI
+from game_engine import GameState, ActionType
+from serialization import dump_game
+import logging
+
+
+COLORS = ["red", "white", "blue"]
+logging.basicConfig(level=logging.DEBUG)
+
+
+def make_cli(seed: int, iterations: int) -> CatanCLI:
+	ai_classes = {color: DummyAI for color in COLORS}
+	cli = CatanCLI(COLORS, ai_classes, seed, silent=True)
+	cli._ais["red"] = MCTSAI("red", cli.get_game(), iterations=iterations, max_rollout_turns=20)
+	return cli
+
+
+def test_search_leaves_game_alone():
+	"""Searching returns a legal move and changes nothing in the game, not even its dice"""
+	cli = make_cli(1, 30)
+	game = cli.get_game()
+	before = dump_game(game)
+	dice = game.get_rng("dice").getstate()
+	action = cli._ais["red"].search(game)
+	assert action in list(game.legal_actions("red"))
+	assert dump_game(game) == before
+	assert game.get_rng("dice").getstate() == dice
+
+	# the same seed gives the same move
+	assert make_cli(1, 30)._ais["red"].search(make_cli(1, 30).get_game()) == action
+
+
+def test_plays_legal_moves():
+	"""The AI gets through initial placement and some turns, including the robber"""
+	cli = make_cli(2, 10)
+	cli.initial_placement()
+	game = cli.get_game()
+	assert game.get_player("red").get_num_settlements() == 2
+	ai = cli._ais["red"]
+	red = game.get_player("red")
+	num_pieces = red.get_num_roads() + red.get_num_settlements()
+	for _ in range(2 * len(COLORS)):
+		color = game.get_current_color()
+		game.get_player(color).add_resources(["wheat", "ore", "sheep", "brick", "wood"] * 2)
+		if game.roll_dice() == 7:
+			cli._process_robber(color)
+		cli._ais[color].do_turn(game)
+		game.next_turn()
+	# with plenty of cards, the AI builds
+	assert red.get_num_roads() + red.get_num_settlements() + red.get_num_cities() > num_pieces
+
+	game._state = GameState.ROBBER_PLACEMENT
+	target_color, hex_coord = ai.get_robber_placement(game)
+	game.move_robber(hex_coord, target_color, "red")
+	game.get_player("red").add_resources(["ore"] * 12)
+	discarded = ai.robber_discard(game)
+	assert game.get_player("red").get_num_resources() == 7
+	assert "ore" in discarded
+
+
+def test_takes_winning_move():
+	"""With 9 points and the cards for a city, the AI builds the city that wins the game"""
+	cli = make_cli(3, 100)
+	cli.initial_placement()
+	game = cli.get_game()
+	while game.get_current_color() != "red":
+		game.roll_dice()
+		game._state = GameState.GAMEPLAY
+		game.next_turn()
+	player = game.get_player("red")
+	for _ in range(5):
+		player.add_development_card("VP")
+	game._set_special_card_holders("red", 5, None, 0)
+	assert player.get_num_vp() == 9
+	player.set_resource_vector((0, 3, 0, 0, 2))
+	game._state = GameState.GAMEPLAY
+	assert cli._ais["red"].search(game).kind == ActionType.CITY
+
+
+def test_parallel_search():
+	"""Each worker searches the position with the full budget, and the results do not depend on timing"""
+	results = []
+	for _ in range(2):
+		game = make_cli(4, 1).get_game()
+		ai = ParallelMCTSAI("red", game, num_workers=2, iterations=20, max_rollout_turns=10)
+		visits = ai.get_root_visits(game)
+		assert sum(visits.values()) == 2 * 20
+		assert all([action in list(game.legal_actions("red")) for action in visits])
+		results.append((visits, ai.search(game)))
+		shutdown_pools()
+		assert mcts_ai._pools == {}
+	assert results[0] == results[1]
@@ -0,0 +1,114 @@
+from game_engine import Game, GameState
+from move_log import MoveLog
+from topology import get_default_lattice
+from test_helpers import random_playout
+import random
+import logging
+
+
+LATTICE = get_default_lattice()
+COLORS = ["orange", "yellow", "green", "red"]
+logging.basicConfig(level=logging.DEBUG)
+
+
+def get_state(game: Game) -> tuple:
+	'''Everything about the game that the moves in these tests can change.'''
+
+	players = []
+	for color in COLORS:
+		player = game.get_player(color)
+		players.append((
+			player.get_resource_vector(), player.get_num_vp(), player.get_num_roads(),
+			sorted(player.get_road_vertices()), player.get_num_settlements(), player.get_num_cities(),
+			game.get_settlement_bits(color), game.get_city_bits(color), game.get_road_bits(color),
+			game.get_longest_road_length(color), player.has_special_card("longest road"),
+			sorted((card, n) for card, n in player.get_development_cards().items() if n > 0),
+		))
+	payouts = {
+		roll: {color: payout for color, payout in d.items() if any(payout)}
+		for roll, d in game.get_payout_table().items()
+	}
+	return (game.get_turn(), game.get_state(), game.get_robber_hex_coords(),
+		game.get_available_settlement_bits(), str(payouts), players)
+
+
+def test_undo_placement_and_building():
+	"""Undoing every move puts the game back the way it was after each move"""
+	random.seed(42)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	game.get_player(COLORS[0]).add_resources(["wheat"] * 2 + ["ore"] * 3)
+	log = MoveLog(game)
+	states = [get_state(game)]
+
+	def check(n: int) -> None:
+		for _ in range(n):
+			log.undo()
+			states.pop()
+			assert get_state(game) == states[-1]
+
+	color = COLORS[0]
+	hex = game.get_board()[(0, 0)]
+	path = [hex.get_vertex(0)]
+	while len(path) < 7:
+		path.append([v for v in game.get_adjacent_vertices(path[-1]) if v not in path][0])
+
+	log.add_settlement(path[0], color, initial_placement=True)
+	states.append(get_state(game))
+	for v1, v2 in zip(path, path[1:]):
+		log.add_road(v1, v2, color, initial_placement=True)
+		states.append(get_state(game))
+	assert game.get_player(color).has_special_card("longest road")
+
+	# another player cuts the road and takes the longest road card away
+	log.add_settlement(path[4], COLORS[1], initial_placement=True)
+	states.append(get_state(game))
+	assert not game.get_player(color).has_special_card("longest road")
+
+	log.add_city(path[0], color)
+	states.append(get_state(game))
+
+	check(2)
+	assert game.get_player(color).has_special_card("longest road")
+	check(len(log))
+	assert len(log) == 0
+
+
+def test_undo_turns_and_rolls():
+	"""Rolling, moving the robber and ending the turn can be undone"""
+	random.seed(42)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	log = MoveLog(game)
+	while game.get_state() == GameState.INITIAL_PLACEMENT:
+		color = game.get_current_color()
+		v = sorted(game.available_settlement_set)[0]
+		log.add_settlement(v, color, initial_placement=True)
+		v2 = [v2 for v2 in game.get_adjacent_vertices(v) if game.can_place_road(v, v2, color)][0]
+		log.add_road(v, v2, color, initial_placement=True)
+		log.next_turn()
+
+	start = get_state(game)
+	n = len(log)
+	for _ in range(20):
+		roll = log.roll_dice()
+		if roll == 7:
+			coord = [h.get_coord() for h in game.get_board().values() if h.get_coord() != game.get_robber_hex_coords()][0]
+			log.move_robber(coord, None, game.get_current_color())
+		log.next_turn()
+	assert get_state(game) != start
+	while len(log) > n:
+		log.undo()
+	assert get_state(game) == start
+
+
+def test_undo_legal_actions():
+	"""Any sequence of legal actions can be undone"""
+	random.seed(42)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	log = MoveLog(game)
+	states = [get_state(game)]
+	for _ in random_playout(game, random, 300, log.apply_action):
+		states.append(get_state(game))
+	while len(log) > 0:
+		log.undo()
+		states.pop()
+		assert get_state(game) == states[-1]
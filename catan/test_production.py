@@ -0,0 +1,80 @@
+from game_engine import Game
+from production import ProductionModel, PORT_TYPES
+from catan_gen import RESOURCE_INDEX
+from topology import get_default_lattice
+import numpy as np
+
+
+LATTICE = get_default_lattice()
+COLORS = ["orange", "yellow", "green", "red"]
+
+
+def get_income(game: Game, vids: list, robber_hex_id: int = -1) -> np.ndarray:
+	'''Expected cards of each resource per roll for settlements on the given vertices, one hex at a time.'''
+
+	topology = game.get_topology()
+	income = np.zeros(5)
+	for vid in vids:
+		for hex_id in topology.vertex_hexes[vid]:
+			hex = game.get_board()[topology.hex_coords[hex_id]]
+			if hex.get_resource() != "desert" and hex_id != robber_hex_id:
+				income[RESOURCE_INDEX[hex.get_resource()]] += hex.get_num_dots() / 36
+	return income
+
+
+def test_income_matches_board():
+	"""The vectorized income is the sum over the hexes around each vertex"""
+	game = Game(COLORS[0], COLORS, LATTICE, seed=5)
+	model = ProductionModel(game)
+	topology = game.get_topology()
+	assert model.vertex_income.shape == (topology.num_vertices, 5)
+	for vid in range(topology.num_vertices):
+		assert np.allclose(model.vertex_income[vid], get_income(game, [vid]))
+		assert model.vertex_dots[vid] == round(get_income(game, [vid]).sum() * 36)
+		for hex_id in [0, 9, 18]:
+			assert np.allclose(model.get_vertex_income(hex_id)[vid], get_income(game, [vid], hex_id))
+	for u, v in [(0, 1), (3, 40), (20, 20)]:
+		vids = [u] if u == v else [u, v]
+		assert np.allclose(model.pair_income[u, v], get_income(game, vids))
+	assert np.array_equal(model.pair_income, model.pair_income.transpose(1, 0, 2))
+	for hex_id in [0, 9, 18]:
+		for u, v in [(0, 1), (3, 40), (20, 20)]:
+			vids = [u] if u == v else [u, v]
+			assert np.allclose(model.get_pair_income(hex_id)[u, v], get_income(game, vids, hex_id))
+	assert model.get_pair_income() is model.pair_income
+
+
+def test_roll_statistics():
+	"""Variance and chance of no production follow from the single rolls"""
+	game = Game(COLORS[0], COLORS, LATTICE, seed=6)
+	model = ProductionModel(game)
+	# a 7 never produces anything
+	assert np.all(model.pair_dry_probability >= 6 / 36 - 1e-9)
+	assert np.all(model.pair_variance >= -1e-9)
+	# with one hex, the cards per roll are 1 with probability p and 0 otherwise
+	topology = game.get_topology()
+	for vid in range(topology.num_vertices):
+		p = model.vertex_income[vid].sum()
+		if len(topology.vertex_hexes[vid]) == 1:
+			assert np.isclose(model.pair_variance[vid, vid], p * (1 - p))
+			assert np.isclose(model.pair_dry_probability[vid, vid], 1 - p)
+
+	# with the robber on the only hex of a vertex, it gets nothing
+	vid = [vid for vid in range(topology.num_vertices) if len(topology.vertex_hexes[vid]) == 1][0]
+	hex_id = list(topology.vertex_hexes[vid])[0]
+	assert model.get_pair_variance(hex_id)[vid, vid] == 0
+	assert model.get_pair_dry_probability(hex_id)[vid, vid] == 1
+	assert np.all(model.get_pair_dry_probability(hex_id) >= model.pair_dry_probability - 1e-9)
+
+
+def test_port_access():
+	"""Every port location gives access to its port type"""
+	game = Game(COLORS[0], COLORS, LATTICE, seed=7)
+	model = ProductionModel(game)
+	vertex_ids = game.get_topology().vertex_ids
+	ports = game.get_board_layout().ports
+	assert model.port_access.sum() == 2 * len(ports)
+	for location, port_type in zip(game.get_port_locations(), ports):
+		u, v = [vertex_ids[vertex] for vertex in location]
+		assert model.port_access[u, PORT_TYPES.index(port_type)]
+		assert model.pair_port_access[u, 0].tolist() == (model.port_access[u] | model.port_access[0]).tolist()
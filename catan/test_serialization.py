@@ -0,0 +1,79 @@
+from game_engine import Game
+from serialization import dump_game, load_game, SerializationError, FORMAT_VERSION
+from topology import get_default_lattice
+from test_helpers import random_playout
+import random
+import logging
+import pytest
+
+
+LATTICE = get_default_lattice()
+COLORS = ["orange", "yellow", "green", "red"]
+logging.basicConfig(level=logging.DEBUG)
+
+
+def get_state(game: Game) -> tuple:
+	players = []
+	for color in COLORS:
+		player = game.get_player(color)
+		players.append((
+			player.get_resource_vector(), player.get_num_vp(), sorted(player.get_road_vertices()),
+			game.get_settlement_bits(color), game.get_city_bits(color), game.get_road_bits(color),
+			game.get_longest_road_length(color), player.get_num_knights_played(),
+			sorted((card, n) for card, n in player.get_development_cards().items() if n > 0),
+			player.has_special_card("longest road"), player.has_special_card("largest army"),
+		))
+	return (game.get_turn(), game.get_state(), game.get_robber_hex_coords(), game.get_board_layout(),
+		game.get_available_settlement_bits(), game.get_development_card_deck(), players)
+
+
+def test_round_trip():
+	"""A loaded game has the same state as the saved one and encodes to the same bytes"""
+	random.seed(7)
+	rng = random.Random(7)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	for _ in range(6):
+		data = dump_game(game)
+		loaded = load_game(data)
+		assert get_state(loaded) == get_state(game)
+		assert dump_game(loaded) == data
+		list(random_playout(game, rng, 60))
+
+
+def test_loaded_game_is_independent():
+	"""Two games loaded from the same bytes share no state"""
+	random.seed(3)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	list(random_playout(game, random.Random(3), 40))
+	data = dump_game(game)
+	first = load_game(data)
+	list(random_playout(first, random.Random(4), 40))
+	assert get_state(load_game(data)) == get_state(game)
+
+
+def test_load_leaves_random_alone():
+	"""Loading does not draw from the random module, and loading the same bytes without a seed gives the same game"""
+	game = Game(COLORS[0], COLORS, LATTICE, seed=5)
+	list(random_playout(game, random.Random(5), 40))
+	data = dump_game(game)
+	random.seed(6)
+	before = random.getstate()
+	first = load_game(data)
+	second = load_game(data)
+	assert random.getstate() == before
+	assert first.get_seed() == second.get_seed()
+	assert first.get_rng("dice").random() == second.get_rng("dice").random()
+	assert load_game(data, seed=1).get_seed() == 1
+
+
+def test_bad_data():
+	"""Data in the wrong format or version is rejected"""
+	data = dump_game(Game(COLORS[0], COLORS, LATTICE))
+	with pytest.raises(SerializationError):
+		load_game(b"XYZ" + data[3:])
+	with pytest.raises(SerializationError):
+		load_game(data[:3] + bytes([FORMAT_VERSION + 1]) + data[4:])
+	with pytest.raises(SerializationError):
+		load_game(data[:len(data) // 2])
+	with pytest.raises(SerializationError):
+		load_game(data + b"\0")
@@ -1,8 +1,8 @@
 from ai.smart_placement_ai import SmartPlacementAI
 from game_engine import Game
-from catan_tk import CatanApp
+from topology import get_default_lattice
 
-LATTICE = CatanApp.get_hex_coord_lattice()
+LATTICE = get_default_lattice()
 COLORS = ["red", "orange", "green", "blue"]
 
 
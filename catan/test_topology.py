@@ -0,0 +1,51 @@
+import subprocess
+import sys
+import os
+from catan_gen import CatanConstants
+from topology import get_default_lattice, get_hex_lattice, get_topology
+
+
+def test_default_lattice_shape():
+	lattice = get_default_lattice()
+	assert [len(row) for row in lattice] == list(CatanConstants.tile_layout)
+	vertices = set([v for row in lattice for hex in row for v in hex])
+	assert len(vertices) == 54
+
+
+def test_headless_import():
+	"""The engine and the CLI must be usable on machines without Tk"""
+	code = "import sys, catan_cli; assert 'tkinter' not in sys.modules"
+	subprocess.run(
+		[sys.executable, "-c", code],
+		cwd=os.path.dirname(os.path.abspath(__file__)),
+		check=True
+	)
+
+
+def test_topology_tables():
+	topology = get_topology(get_default_lattice())
+	assert topology.num_vertices == 54
+	assert topology.num_edges == 72
+	for vid, neighbours in enumerate(topology.vertex_vertices):
+		assert len(neighbours) in [2, 3]
+		assert len(topology.vertex_edges[vid]) == len(neighbours)
+		for u in neighbours:
+			assert vid in topology.vertex_vertices[u]
+	for edge_id, (a, b) in enumerate(topology.edge_vertices):
+		assert edge_id in topology.vertex_edges[a]
+		assert edge_id in topology.vertex_edges[b]
+		v1, v2 = topology.edges[edge_id]
+		assert topology.get_edge_id(v2, v1) == edge_id
+	for hex_id, vids in enumerate(topology.hex_vertices):
+		for vid in vids:
+			assert hex_id in topology.vertex_hexes[vid]
+
+
+def test_topology_numbering_independent_of_scale():
+	"""Lattices with the same layout but different distances get the same numbering"""
+	a = get_topology(get_default_lattice())
+	b = get_topology(get_hex_lattice(x_0=21, y_0=7, minor_horiz_dist=3, major_horiz_dist=6, minor_vert_dist=5))
+	assert a is not b
+	assert a.vertex_vertices == b.vertex_vertices
+	assert a.edge_vertices == b.edge_vertices
+	assert get_topology(get_default_lattice()) is a
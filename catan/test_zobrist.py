@@ -0,0 +1,73 @@
+from game_engine import Game
+from move_log import MoveLog
+from serialization import dump_game, load_game
+from topology import get_default_lattice
+from zobrist import get_keys, MIN_KEYS
+from test_helpers import random_playout
+import random
+import logging
+
+
+LATTICE = get_default_lattice()
+COLORS = ["orange", "yellow", "green", "red"]
+logging.basicConfig(level=logging.DEBUG)
+
+
+def test_hash_follows_the_game():
+	"""After every move, the hash is that of the same game built from scratch, and undoing a move restores it"""
+	random.seed(7)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	log = MoveLog(game)
+	hashes = [game.get_hash()]
+	for _ in random_playout(game, random, 300, log.apply_action):
+		hashes.append(game.get_hash())
+		assert load_game(dump_game(game), LATTICE).get_hash() == hashes[-1]
+		assert game.clone(seed=1).get_hash() == hashes[-1]
+	# hardly any move leaves the game the way it was
+	assert len(set(hashes)) > 250
+	while len(log) > 0:
+		log.undo()
+		hashes.pop()
+		assert game.get_hash() == hashes[-1]
+
+
+def test_transposition():
+	"""Building the same things in another order gives the same hash, and different things a different one"""
+	random.seed(8)
+	game = Game(COLORS[0], COLORS, LATTICE)
+	color = COLORS[0]
+	hex = game.get_board()[(0, 0)]
+	v = [hex.get_vertex(i) for i in range(3)]
+
+	first = game.clone()
+	first.add_settlement(v[0], color, initial_placement=True)
+	first.add_road(v[0], v[1], color, initial_placement=True)
+	first.add_road(v[1], v[2], color, initial_placement=True)
+	first.get_player(color).add_resources(["wheat", "ore"])
+
+	second = game.clone()
+	second.get_player(color).add_resources(["ore", "wheat"])
+	second.add_settlement(v[0], color, initial_placement=True)
+	second.add_road(v[0], v[1], color, initial_placement=True)
+	second.add_road(v[1], v[2], color, initial_placement=True)
+	assert first.get_hash() == second.get_hash()
+
+	second.get_player(color).deduct_resources(["ore"])
+	second.get_player(color).add_resources(["brick"])
+	assert first.get_hash() != second.get_hash()
+	first.add_settlement(hex.get_vertex(3), COLORS[1], initial_placement=True)
+	second.add_settlement(hex.get_vertex(3), COLORS[2], initial_placement=True)
+	assert first.get_hash() != second.get_hash()
+
+
+def test_key_tables_grow():
+	"""A hand bigger than the key tables makes them grow, keeping the keys they had"""
+	keys = get_keys("hand/orange/ore", 0).copy()
+	game = Game(COLORS[0], COLORS, LATTICE, seed=9)
+	player = game.get_player(COLORS[0])
+	before = game.get_hash()
+	player.add_resources(["ore"] * (MIN_KEYS + 5))
+	assert get_keys("hand/orange/ore", 0)[:len(keys)] == keys
+	assert load_game(dump_game(game), LATTICE).get_hash() == game.get_hash()
+	player.deduct_resources(["ore"] * (MIN_KEYS + 5))
+	assert game.get_hash() == before
@@ -0,0 +1,233 @@
+'''
+Board geometry with no dependency on any GUI toolkit.
+Vertices are identified by their pixel coordinates, so the same lattice is consumed
+by the game engine and by the renderers.
+'''
+
+from catan_gen import CatanConstants
+from catan_types import Lattice, Vertices, Vertex, Edge, HexCoord
+from typing import List, Dict, Tuple, Iterator
+
+
+# distances used to lay out the default board
+# the Tk renderer draws the board using exactly these values
+MINOR_HORIZ_DIST = 30
+MAJOR_HORIZ_DIST = 60
+MINOR_VERT_DIST = 50
+RENDER_START = (200, MINOR_VERT_DIST + 20)
+
+
+def get_hex_coords(x_0: int, y_0: int,
+                   minor_horiz_dist: int, major_horiz_dist: int, minor_vert_dist: int) -> Vertices:
+	'''Given certain parameters for the hexagon, return tuple of vertices for hexagon.'''
+
+	# hex coordinates are always in the same order
+	# starting with middle-left and going counter-clockwise
+	# assume that +y == down and -y == up
+	return (
+		(x_0, y_0),
+		(x_0 + minor_horiz_dist, y_0 + minor_vert_dist),
+		(x_0 + minor_horiz_dist + major_horiz_dist, y_0 + minor_vert_dist),
+		(x_0 + 2 * minor_horiz_dist + major_horiz_dist, y_0),
+		(x_0 + minor_horiz_dist + major_horiz_dist, y_0 - minor_vert_dist),
+		(x_0 + minor_horiz_dist, y_0 - minor_vert_dist),
+	)
+
+
+def get_hex_row(x_0, y_0, minor_horiz_dist, major_horiz_dist, minor_vert_dist, num) -> List[Vertices]:
+	'''Return list of hex row coordinates. num is the number of hexes in this row.'''
+
+	hexes = []  # type: List[Vertices]
+
+	for i in range(num):
+		if len(hexes) > 0:
+			x_0, y_0 = hexes[-1][3]
+			x_0 += major_horiz_dist
+		hexes.append(get_hex_coords(x_0, y_0, minor_horiz_dist, major_horiz_dist, minor_vert_dist))
+	return hexes
+
+
+def get_hex_lattice(x_0: int, y_0: int,
+                    minor_horiz_dist: int, major_horiz_dist: int, minor_vert_dist: int) -> Lattice:
+	'''Return a list of lists of hex coords.'''
+
+	rows = []  # type: Lattice
+	decr_set = set([1, 2, 4, 6])
+	incr = minor_horiz_dist + major_horiz_dist
+
+	for row_num, num_cols in enumerate(CatanConstants.tile_layout):
+		if len(rows) > 0:
+			x_0, y_0 = rows[-1][0][0]
+			y_0 += minor_vert_dist
+
+			if row_num in decr_set:
+				x_0 -= incr
+			else:
+				x_0 += incr
+
+		rows.append(get_hex_row(x_0, y_0, minor_horiz_dist, major_horiz_dist, minor_vert_dist, num_cols))
+
+	return rows
+
+
+def get_default_lattice() -> Lattice:
+	'''Return the lattice for the default board layout.'''
+
+	return get_hex_lattice(
+		RENDER_START[0],
+		RENDER_START[1],
+		MINOR_HORIZ_DIST,
+		MAJOR_HORIZ_DIST,
+		MINOR_VERT_DIST
+	)
+
+
+class BoardTopology():
+	'''Dense integer numbering of the vertices, edges and hexes of a lattice,
+	together with static adjacency tables between them.
+
+	IDs are handed out in lattice order (row, column, then vertex index on the hex),
+	so two lattices with the same layout get the same numbering regardless of their pixel distances.
+	Instances never change after construction and are shared between games on the same lattice.'''
+
+	def __init__(self, lattice: Lattice) -> None:
+		# id -> coordinates
+		self.vertices = []  # type: List[Vertex]
+		self.edges = []  # type: List[Edge]
+		self.hex_coords = []  # type: List[HexCoord]
+
+		# coordinates -> id
+		# edges can be looked up in either direction
+		self.vertex_ids = {}  # type: Dict[Vertex, int]
+		self.edge_ids = {}  # type: Dict[Edge, int]
+		self.hex_ids = {}  # type: Dict[HexCoord, int]
+
+		# adjacency tables, all indexed by id
+		self.hex_vertices = []  # type: List[Tuple[int, ...]]
+		self.vertex_hexes = []  # type: List[Tuple[int, ...]]
+		self.vertex_vertices = []  # type: List[Tuple[int, ...]]
+		self.vertex_edges = []  # type: List[Tuple[int, ...]]
+		self.edge_vertices = []  # type: List[Tuple[int, int]]
+
+		# bitmasks over vertex / edge IDs, indexed by vertex ID
+		# bit i of a vertex mask is set iff vertex i is included, same for edge masks
+		self.vertex_edge_masks = []  # type: List[int]
+		# the vertex itself and all of its neighbours (distance rule for settlements)
+		self.vertex_closed_masks = []  # type: List[int]
+		# indexed by edge ID, the two endpoints of the edge
+		self.edge_vertex_masks = []  # type: List[int]
+		# indexed by hex ID, the corners of the hex
+		self.hex_vertex_masks = []  # type: List[int]
+		# indexed by vertex ID, (edge bit, other endpoint) for each incident edge
+		self.vertex_neighbours = []  # type: List[Tuple[Tuple[int, int], ...]]
+
+		self._build(lattice)
+
+	def _build(self, lattice: Lattice) -> None:
+		vertex_hexes = []  # type: List[List[int]]
+		vertex_vertices = []  # type: List[List[int]]
+		vertex_edges = []  # type: List[List[int]]
+
+		for row_i, row in enumerate(lattice):
+			for col_i, hex_vertices in enumerate(row):
+				hex_id = len(self.hex_coords)
+				self.hex_coords.append((row_i, col_i))
+				self.hex_ids[(row_i, col_i)] = hex_id
+				ids = []
+				for v in hex_vertices:
+					if v not in self.vertex_ids:
+						self.vertex_ids[v] = len(self.vertices)
+						self.vertices.append(v)
+						vertex_hexes.append([])
+						vertex_vertices.append([])
+						vertex_edges.append([])
+					ids.append(self.vertex_ids[v])
+					vertex_hexes[self.vertex_ids[v]].append(hex_id)
+				self.hex_vertices.append(tuple(ids))
+
+				# on each hex, adjacent vertices are +1 and -1 index away
+				for i, a in enumerate(ids):
+					b = ids[(i + 1) % len(ids)]
+					if (self.vertices[a], self.vertices[b]) in self.edge_ids:
+						continue
+					if self.vertices[a][0] > self.vertices[b][0]:
+						a, b = b, a
+					edge_id = len(self.edges)
+					edge = (self.vertices[a], self.vertices[b])
+					self.edges.append(edge)
+					self.edge_ids[edge] = edge_id
+					self.edge_ids[(edge[1], edge[0])] = edge_id
+					self.edge_vertices.append((a, b))
+					vertex_vertices[a].append(b)
+					vertex_vertices[b].append(a)
+					vertex_edges[a].append(edge_id)
+					vertex_edges[b].append(edge_id)
+
+		self.vertex_hexes = [tuple(l) for l in vertex_hexes]
+		self.vertex_vertices = [tuple(l) for l in vertex_vertices]
+		self.vertex_edges = [tuple(l) for l in vertex_edges]
+
+		for vid in range(len(self.vertices)):
+			self.vertex_edge_masks.append(to_mask(self.vertex_edges[vid]))
+			self.vertex_closed_masks.append(to_mask(self.vertex_vertices[vid]) | (1 << vid))
+			self.vertex_neighbours.append(tuple([
+				(1 << edge_id, self.edge_vertices[edge_id][0] + self.edge_vertices[edge_id][1] - vid)
+				for edge_id in self.vertex_edges[vid]
+			]))
+		self.edge_vertex_masks = [to_mask(vids) for vids in self.edge_vertices]
+		self.hex_vertex_masks = [to_mask(vids) for vids in self.hex_vertices]
+
+	@property
+	def num_vertices(self) -> int:
+		return len(self.vertices)
+
+	@property
+	def num_edges(self) -> int:
+		return len(self.edges)
+
+	def get_edge_id(self, v1: Vertex, v2: Vertex) -> int:
+		'''Return the ID of the edge between v1 and v2 (in either order).'''
+
+		return self.edge_ids[(v1, v2)]
+
+
+def to_mask(ids) -> int:
+	'''Return the bitmask with the bits for the given IDs set.'''
+
+	mask = 0
+	for i in ids:
+		mask |= 1 << i
+	return mask
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+	'''Yield the IDs of the set bits of a mask, lowest first.'''
+
+	while mask:
+		low = mask & -mask
+		yield low.bit_length() - 1
+		mask ^= low
+
+
+def count_bits(mask: int) -> int:
+	'''Return the number of set bits in the mask.'''
+
+	return bin(mask).count("1")
+
+
+if hasattr(int, "bit_count"):
+	# much faster, Python 3.10+
+	count_bits = int.bit_count  # type: ignore  # noqa: F811
+
+
+_topology_cache = {}  # type: Dict[tuple, BoardTopology]
+
+
+def get_topology(lattice: Lattice) -> BoardTopology:
+	'''Return the topology for the given lattice.
+	Topologies are built once per distinct lattice and then reused.'''
+
+	key = tuple(tuple(row) for row in lattice)
+	if key not in _topology_cache:
+		_topology_cache[key] = BoardTopology(lattice)
+	return _topology_cache[key]
@@ -0,0 +1,36 @@
+'''
+Random 64-bit keys for Zobrist hashing of games (see Game.get_hash).
+The hash of a game is the XOR of the keys of everything in it, such as a road of some color on some edge,
+so adding or removing one thing updates the hash with a single XOR, and the order of the moves does not matter.
+
+Keys come in tables, a list per kind of thing indexed by an integer such as the edge ID or the number of cards.
+Games and players look their tables up once and keep them, so updating the hash is a list index and an XOR.
+'''
+
+import random
+from typing import Dict, List
+
+
+# tables are made with at least this many keys, so that counts of cards seldom outgrow them
+MIN_KEYS = 64
+
+_tables = {}  # type: Dict[str, List[int]]
+
+
+def get_keys(name: str, n: int) -> List[int]:
+	'''Return the table of keys with the given name, for example "road/red", with at least n keys.
+	Tables are made from a string seed, so they are the same in every process,
+	and a table made again with more keys starts with the same keys as before.'''
+
+	keys = _tables.get(name)
+	if keys is None or len(keys) < n:
+		rng = random.Random("zobrist/" + name)
+		keys = [rng.getrandbits(64) for _ in range(max(n, MIN_KEYS))]
+		_tables[name] = keys
+	return keys
+
+
+def get_key(name: str, i: int) -> int:
+	'''Return key i of the table with the given name.'''
+
+	return get_keys(name, i + 1)[i]